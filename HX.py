@@ -1,6 +1,7 @@
 import cantera as ct
+from mechanism import get_gas
 
-def heat_exchanger_effectiveness(T_hot_in, T_hot_out, T_cold_in, H_hot_in, H_hot_out, H_cold_in, x_hot, x_cold_in, m_hot, m_cold_in, nsp):
+def heat_exchanger_effectiveness(T_hot_in, T_hot_out, T_cold_in, H_hot_in, H_hot_out, H_cold_in, x_hot, x_cold_in, m_hot, m_cold_in, nsp, gas=None):
     """
     Calculate the effectiveness of a heat exchanger.
 
@@ -16,12 +17,14 @@ def heat_exchanger_effectiveness(T_hot_in, T_hot_out, T_cold_in, H_hot_in, H_hot
     m_hot (float): Mass flow rate of the hot stream (kg/s).
     m_cold_in (float): Mass flow rate of the cold stream (kg/s).
     nsp (int): Number of species for the gas model.
+    gas (Cantera.Solution, optional): Gas object to use; defaults to the shared GRI-Mech 3.0 gas.
 
     Returns:
     tuple: effectiveness, T_cold_out, H_cold_out
     """
-    # Initialize Cantera gas object
-    gas = ct.Solution('gri30.yaml')  # Using GRI-Mech 3.0
+    # Cantera gas object (GRI-Mech 3.0), loaded once per process
+    if gas is None:
+        gas = get_gas('gri30.yaml')
 
     # Calculate enthalpy change
     deltaH = H_hot_in - H_hot_out
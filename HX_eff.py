@@ -5,90 +5,233 @@ Created on Tue Dec 24 02:23:15 2024
 @author: 82108
 """
 
-def Hx_eff_SOFC(eff_HX, T2, T3, P2, P3, x2, x3, m2, m3):
-    from cantera import Solution
-
-    # Cantera SOFC specific gas file
-    gas = Solution('gri30.yaml')  # Ensure you have the correct Cantera input file
-    N = gas.n_species
-    iH2 = gas.species_index('H2')
-    iH2O = gas.species_index('H2O')
-    iO2 = gas.species_index('O2')
-    iN2 = gas.species_index('N2')
-    M = gas.molecular_weights
+import warnings
+
+import cantera as ct
+import numpy as np
+
+from mechanism import get_reduced_gas, to_reduced
+from nasa_props import (nasa_coefficients, mixture_properties, mole_to_mass_fractions,
+                        species_thermo, temperature_from_enthalpy)
+
+
+def _mixture_cp(coeffs, T, Y_W):
+    """cp_mass and d(cp_mass)/dT for rows of Y/MW at temperatures T."""
+    cp_R, dcp_R = species_thermo(coeffs, T, ('cp', 'dcp'))
+    return ct.gas_constant * (Y_W * cp_R).sum(axis=1), ct.gas_constant * (Y_W * dcp_R).sum(axis=1)
+
+
+def _mole_fractions(gas, x, index):
+    """Mole fraction rows in the species of `gas`; dicts and strings are parsed by Cantera."""
+    if isinstance(x, (str, dict)):
+        gas.X = x
+        return gas.X[None, :]
+    return np.atleast_2d(to_reduced(x, index))
+
+
+def _solve_hx(coeffs, eff_HX, T2, T3, P2, P3, Y2, Y3, m2, m3, rtol, max_iter):
+    """
+    Newton iteration on the transferred heat Q for arrays of operating points.
+
+    Q is the root of F(Q) = Q - eff_HX * C_min(T1(Q), T4(Q)) * (T2 - T3), where
+    C_min uses cp at the stream mean temperatures and T1, T4 follow from the
+    outlet enthalpies. dF/dQ is evaluated analytically from d(cp)/dT.
+    """
+    n = len(T2)
+    props2 = mixture_properties(coeffs, T2, P2, Y2, normalize=False)
+    props3 = mixture_properties(coeffs, T3, P3, Y3, normalize=False)
+    h2 = props2['h']
+    h3 = props3['h']
+
+    # Inlet heat capacity rates and first estimate of Q
+    Ch = m2 * props2['cp']
+    Cc = m3 * props3['cp']
+    C_min = np.where(Ch > Cc, Cc, Ch)
+    dT_in = T2 - T3
+    Q = C_min * dT_in * eff_HX
+
+    Y2_W = Y2 / coeffs['MW']
+    Y3_W = Y3 / coeffs['MW']
+    T1 = T2 - Q / Ch
+    T4 = T3 + Q / Cc
+    converged = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=int)
+
+    for _ in range(max_iter):
+        active = ~converged
+        if not active.any():
+            break
+        a = active
+        # Outlet temperatures from the energy balance
+        T1_new, ok1 = temperature_from_enthalpy(coeffs, h2[a] - Q[a] / m2[a], Y2[a], T1[a])
+        T4_new, ok4 = temperature_from_enthalpy(coeffs, h3[a] + Q[a] / m3[a], Y3[a], T4[a])
+
+        # Capacity rates at the mean stream temperatures
+        cp_m1, dcp_m1 = _mixture_cp(coeffs, 0.5 * (T1_new + T2[a]), Y2_W[a])
+        cp_m2, dcp_m2 = _mixture_cp(coeffs, 0.5 * (T3[a] + T4_new), Y3_W[a])
+        Ch_m = m2[a] * cp_m1
+        Cc_m = m3[a] * cp_m2
+        hot_min = Ch_m <= Cc_m
+        C_min_a = np.where(hot_min, Ch_m, Cc_m)
+
+        # dT1/dQ = -1/(m2 cp(T1)), dT4/dQ = 1/(m3 cp(T4))
+        cp_1, _ = _mixture_cp(coeffs, T1_new, Y2_W[a])
+        cp_4, _ = _mixture_cp(coeffs, T4_new, Y3_W[a])
+        dCh_dQ = m2[a] * dcp_m1 * 0.5 * (-1.0 / (m2[a] * cp_1))
+        dCc_dQ = m3[a] * dcp_m2 * 0.5 * (1.0 / (m3[a] * cp_4))
+        dCmin_dQ = np.where(hot_min, dCh_dQ, dCc_dQ)
+
+        F = Q[a] - eff_HX[a] * C_min_a * dT_in[a]
+        dF = 1.0 - eff_HX[a] * dT_in[a] * dCmin_dQ
+        dQ = F / dF
+
+        done = ((np.abs(T1_new - T1[a]) <= rtol * np.abs(T1_new))
+                & (np.abs(T4_new - T4[a]) <= rtol * np.abs(T4_new))
+                & (np.abs(dQ) <= rtol * np.maximum(np.abs(Q[a]), 1e-300))
+                & ok1 & ok4)
+
+        T1[a] = T1_new
+        T4[a] = T4_new
+        C_min[a] = C_min_a
+        Q[a] = Q[a] - np.where(done, 0.0, dQ)
+        iterations[a] += 1
+        converged[a] = done
+
+    return {
+        'T1': T1,
+        'T4': T4,
+        'Cc': Cc,
+        'Ch': Ch,
+        'C_min': C_min,
+        'Q': Q,
+        'converged': converged,
+        'iterations': iterations,
+    }
+
+
+def _cp_and_slope(gas, T, P, x, dT=1e-2):
+    """cp_mass at T and its forward-difference temperature derivative."""
+    gas.TPX = T + dT, P, x
+    cp_plus = gas.cp_mass
+    gas.TPX = T, P, x
+    cp = gas.cp_mass
+    return cp, (cp_plus - cp) / dT
+
+
+def Hx_eff_SOFC(eff_HX, T2, T3, P2, P3, x2, x3, m2, m3, gas=None, rtol=1e-8, max_iter=50,
+                full_output=False):
+    """
+    Outlet temperatures of a counter-flow recuperator of given effectiveness.
+
+    Stream 2 (hot) enters at T2 and leaves at T1; stream 3 (cold) enters at T3
+    and leaves at T4. The heat duty Q uses C_min at the mean stream
+    temperatures and is found by Newton iteration on
+    F(Q) = Q - eff_HX * C_min(T1(Q), T4(Q)) * (T2 - T3).
+
+    Parameters:
+    eff_HX (float): Heat exchanger effectiveness.
+    T2, T3 (float): Hot / cold inlet temperatures (K).
+    P2, P3 (float): Hot / cold pressures (Pa).
+    x2, x3 (array): Hot / cold mole fractions (gri30 index space).
+    m2, m3 (float): Hot / cold mass flow rates (kg/s).
+    gas (Cantera.Solution, optional): Gas object defining the species of x2/x3.
+    rtol (float): Relative tolerance on T1, T4 and the heat duty.
+    max_iter (int): Maximum number of Newton iterations.
+    full_output (bool): Also return a dict with 'converged', 'iterations' and 'Q'.
+
+    Returns:
+    tuple: T1_f, T4_f, Cc, Ch, C_min (, info)
+    """
+    # Cantera SOFC specific gas: thermo-only phase with the species in x2/x3
+    if gas is None:
+        gas, index = get_reduced_gas(x2, x3, name='gri30.yaml')
+    else:
+        index = slice(None)
+    x2 = to_reduced(x2, index)
+    x3 = to_reduced(x3, index)
 
     # Set properties for stream 2
     gas.TPX = T2, P2, x2
-    cp_h = gas.cp_mass
-    Ch = m2 * cp_h
-    h2 = gas.enthalpy_mass
-    H2 = h2 * m2
+    Ch = m2 * gas.cp_mass
+    H2 = gas.enthalpy_mass * m2
 
     # Set properties for stream 3
     gas.TPX = T3, P3, x3
-    cp_c = gas.cp_mass
-    Cc = m3 * cp_c
-    h3 = gas.enthalpy_mass
-    H3 = h3 * m3
-
-    # Calculate C_min
-    if Ch > Cc:
-        C_min = Cc
-    else:
-        C_min = Ch
-
-    q_max = C_min * (T2 - T3)
-    q = q_max * eff_HX
-
-    # Energy balance for T1 and T4
-    H1 = H2 - q
-    h1 = H1 / m2
-    gas.HP = h1, P2
-    T1 = [gas.T]
-
-    H4 = H3 + q
-    h4 = H4 / m3
-    gas.HP = h4, P3
-    T4 = [gas.T]
-
-    # Iterative solution for temperature updates
-    i = 0
-    while True:
-        Tm1 = (T1[i] + T2) / 2
-        Tm2 = (T3 + T4[i]) / 2
-
-        gas.TPX = Tm1, gas.P, x2
-        cp_m1 = gas.cp_mass
+    Cc = m3 * gas.cp_mass
+    H3 = gas.enthalpy_mass * m3
+
+    # First estimate of the heat duty from the inlet capacity rates
+    C_min = Cc if Ch > Cc else Ch
+    Q = C_min * (T2 - T3) * eff_HX
+
+    T1 = T4 = None
+    converged = False
+    for iteration in range(1, max_iter + 1):
+        # Energy balance for T1 and T4
+        gas.HPX = (H2 - Q) / m2, P2, x2
+        T1_new = gas.T
+        cp_1 = gas.cp_mass
+        gas.HPX = (H3 + Q) / m3, P3, x3
+        T4_new = gas.T
+        cp_4 = gas.cp_mass
+
+        # Capacity rates at the mean stream temperatures
+        cp_m1, dcp_m1 = _cp_and_slope(gas, (T1_new + T2) / 2, P2, x2)
+        cp_m2, dcp_m2 = _cp_and_slope(gas, (T3 + T4_new) / 2, P3, x3)
         Ch_m = m2 * cp_m1
-
-        gas.TPX = Tm2, gas.P, x3
-        cp_m2 = gas.cp_mass
         Cc_m = m3 * cp_m2
-
         if Ch_m > Cc_m:
             C_min = Cc_m
+            dCmin_dQ = m3 * dcp_m2 * 0.5 / (m3 * cp_4)
         else:
             C_min = Ch_m
+            dCmin_dQ = -m2 * dcp_m1 * 0.5 / (m2 * cp_1)
 
-        Q_max_temp = C_min * (T2 - T3)
-        Q_temp = Q_max_temp * eff_HX
+        # Newton step on F(Q)
+        F = Q - eff_HX * C_min * (T2 - T3)
+        dQ = F / (1.0 - eff_HX * (T2 - T3) * dCmin_dQ)
 
-        i += 1
+        if T1 is not None and abs(T1_new - T1) <= rtol * abs(T1_new) \
+                and abs(T4_new - T4) <= rtol * abs(T4_new) and abs(dQ) <= rtol * abs(Q):
+            T1, T4 = T1_new, T4_new
+            converged = True
+            break
+        T1, T4 = T1_new, T4_new
+        Q -= dQ
 
-        H1 = H2 - Q_temp
-        h1 = H1 / m2
-        gas.HP = h1, P2
-        T1.append(gas.T)
+    if not converged:
+        warnings.warn(f"Hx_eff_SOFC did not converge in {max_iter} iterations.")
 
-        H4 = H3 + Q_temp
-        h4 = H4 / m3
-        gas.HP = h4, P3
-        T4.append(gas.T)
+    if full_output:
+        return T1, T4, Cc, Ch, C_min, {'converged': converged, 'iterations': iteration, 'Q': Q}
+    return T1, T4, Cc, Ch, C_min
 
-        if abs((T1[i] - T1[i-1]) / T1[i]) < 0.001 and abs((T4[i] - T4[i-1]) / T4[i]) < 0.001:
-            break
 
-    T1_f = T1[-1]
-    T4_f = T4[-1]
+def Hx_eff_SOFC_batch(eff_HX, T2, T3, P2, P3, x2, x3, m2, m3, gas=None, rtol=1e-8, max_iter=50):
+    """
+    Vectorized Hx_eff_SOFC over arrays of operating points.
 
-    return T1_f, T4_f, Cc, Ch, C_min
+    All scalar inputs broadcast to a common length n; x2 and x3 are (k,) or
+    (n, k) mole fractions in the gri30 index space (or in the species of `gas`).
+
+    Returns:
+    dict: 'T1', 'T4', 'Cc', 'Ch', 'C_min', 'Q', 'converged', 'iterations', arrays of shape (n,).
+    """
+    # Cantera SOFC specific gas: thermo-only phase with the species in x2/x3
+    if gas is None:
+        gas, index = get_reduced_gas(x2, x3, name='gri30.yaml')
+    else:
+        index = slice(None)
+    coeffs = nasa_coefficients(gas)
+    X2 = _mole_fractions(gas, x2, index)
+    X3 = _mole_fractions(gas, x3, index)
+
+    eff_HX, T2, T3, P2, P3, m2, m3 = (np.atleast_1d(np.asarray(v, dtype=float))
+                                      for v in (eff_HX, T2, T3, P2, P3, m2, m3))
+    n = max(len(v) for v in (eff_HX, T2, T3, P2, P3, m2, m3, X2, X3))
+    eff_HX, T2, T3, P2, P3, m2, m3 = (np.broadcast_to(v, (n,)).copy()
+                                      for v in (eff_HX, T2, T3, P2, P3, m2, m3))
+    Y2 = np.broadcast_to(mole_to_mass_fractions(coeffs, X2), (n, X2.shape[1]))
+    Y3 = np.broadcast_to(mole_to_mass_fractions(coeffs, X3), (n, X3.shape[1]))
+
+    return _solve_hx(coeffs, eff_HX, T2, T3, P2, P3, Y2, Y3, m2, m3, rtol, max_iter)
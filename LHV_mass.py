@@ -7,16 +7,32 @@ Created on Wed Dec 25 13:50:45 2024
 
 import cantera as ct
 
-def LHV_mass(gas):
+from equilibrium_table import equilibrate_TP
+from heating_value import lhv_mass
+
+def LHV_mass(gas, method='formation', tabulate=False, table=None):
     """
     Calculate the Lower Heating Value (LHV) based on the mass of the input gas.
 
     Parameters:
     gas (Cantera.Solution): Cantera gas object with fuel composition.
+    method (str): 'formation' uses species formation enthalpies (complete
+                  combustion to CO2, H2O(g), N2); 'equilibrium' equilibrates the
+                  gas itself at the reference state (validation mode; equals the
+                  LHV only if the gas holds at least stoichiometric O2).
+    tabulate (bool): For 'equilibrium', take the products from the equilibrium
+                     table (ISAT) cache instead of a direct gas.equilibrate('TP')
+                     (mole fractions then carry errors up to about table.tol).
+    table (EquilibriumTable, optional): Table to use; defaults to the shared one.
 
     Returns:
     float: LHV in J/kg.
     """
+    if method == 'formation':
+        return lhv_mass(gas)
+    if method != 'equilibrium':
+        raise ValueError(f"Unknown method '{method}'.")
+
     # Save initial state
     initial_state = (gas.T, gas.P, gas.X)
 
@@ -29,7 +45,10 @@ def LHV_mass(gas):
     h_react = gas.enthalpy_mass
 
     # Equilibrate to find products
-    gas.equilibrate('TP')
+    if tabulate:
+        equilibrate_TP(gas, table)
+    else:
+        gas.equilibrate('TP')
     h_prod = gas.enthalpy_mass
 
     # Calculate LHV
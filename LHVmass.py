@@ -5,14 +5,20 @@ Created on Tue Dec 24 03:04:34 2024
 @author: 82108
 """
 
-import cantera as ct
+import numpy as np
+from heating_value import lhv_mass
+from mechanism import get_gas
 
-def LHVmass(gas):
+def LHVmass(gas, mix=None, method='formation'):
     """
     Calculate the Low Heating Value (LHV) based on mass for the input gas.
 
     Parameters:
         gas: Cantera.Solution object representing the input gas.
+        mix: Cantera.Solution used for the fuel/O2 mixture (optional, 'equilibrium' only).
+             Defaults to the shared gri60.xml gas.
+        method: 'formation' uses species formation enthalpies; 'equilibrium'
+                burns the gas in 1000 parts O2 by equilibrium (validation mode).
 
     Returns:
         LHVmass: Low Heating Value in J/kg.
@@ -21,21 +27,27 @@ def LHVmass(gas):
     T_ref = 300  # K
     P_ref = 101325  # Pa
 
-    # Create Oxygen gas
-    O2 = ct.Solution('gri60.xml')  # Use gri60.xml for SOFC modeling
-    N = O2.n_species
-    iO2 = O2.species_index('O2')
-
-    # Set oxygen composition
-    xO2 = [0.0] * N
-    xO2[iO2] = 1.0
-    O2.X = xO2
-    O2.TP = T_ref, P_ref
+    if method == 'formation':
+        return lhv_mass(gas, T_ref=T_ref)
+    if method != 'equilibrium':
+        raise ValueError(f"Unknown method '{method}'.")
 
     # Mix input gas with Oxygen gas
-    mix = ct.Solution('gri60.xml')
+    if mix is None:
+        mix = get_gas('gri60.xml')  # Use gri60.xml for SOFC modeling
+    N = mix.n_species
+    iO2 = mix.species_index('O2')
+
+    # Oxygen composition (pure O2, no separate gas object needed)
+    mF_O2 = np.zeros(N)
+    mF_O2[iO2] = 1.0
+    MW_O2 = mix.molecular_weights[iO2]
+
     mF_gas = gas.X
-    mF_O2 = O2.X
+    MW_gas = gas.mean_molecular_weight
+
+    # The shared mixture gas may be the caller's own object; keep its state
+    initial_state = mix.TPX if mix is gas else None
 
     # Assume 1000 mole of O2 per 1 mole of gas
     mF_mix = mF_gas + 1001 * mF_O2
@@ -43,13 +55,16 @@ def LHVmass(gas):
     mix.TP = T_ref, P_ref
 
     # Mass fraction of gas in mixture
-    massF_gas = gas.mean_molecular_weight / (gas.mean_molecular_weight + 1000 * O2.mean_molecular_weight)
+    massF_gas = MW_gas / (MW_gas + 1000 * MW_O2)
 
     # Enthalpy calculations
     h_react = mix.enthalpy_mass  # Enthalpy of reactants
     mix.equilibrate('TP')  # Equilibrate mixture (combustion)
     h_prod = mix.enthalpy_mass  # Enthalpy of products
 
+    if initial_state is not None:
+        mix.TPX = initial_state
+
     # Calculate LHV
     LHVmass = (h_react - h_prod) / massF_gas  # J/kg
     return LHVmass
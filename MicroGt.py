@@ -5,40 +5,83 @@ Created on Tue Dec 24 03:25:04 2024
 @author: 82108
 """
 
-import cantera as ct
-
-def MicroSOFC(x_ci, P_ci, m_ci):
+import warnings
+
+import numpy as np
+from scipy.optimize import brentq
+
+from LHV_mass import LHV_mass
+from heating_value import lhv_mass
+from mechanism import get_gas, get_reduced_gas, to_reduced
+from nasa_props import (nasa_coefficients, mixture_properties, mole_to_mass_fractions,
+                        temperature_from_enthalpy, temperature_from_entropy)
+from root_finding import bracketed_root
+
+T_CI_MIN = 250  # lower end of the compressor inlet temperature search (K)
+
+
+def _turbine_inlet_composition(x_co, iH2, iH2O, iCO, iCO2):
+    """Turbine inlet mole fractions: H2 -> H2O and CO -> CO2, renormalized (rows of x_co)."""
+    x_ti = np.array(x_co, dtype=float)
+    x_ti[..., iH2O] = x_ti[..., iH2]
+    x_ti[..., iH2] = 0
+    x_ti[..., iCO2] += x_ti[..., iCO]
+    x_ti[..., iCO] = 0
+    return x_ti / x_ti.sum(axis=-1, keepdims=True)
+
+
+def MicroSOFC(x_ci, P_ci, m_ci, gas=None, method='brentq', xtol=1e-6, max_iter=100,
+              rp_c=4.8, T_ti=1200, eff_turb=0.84, eff_comp=0.8, fallback=False):
+    """
+    Micro gas turbine downstream of the SOFC.
+
+    The compressor inlet temperature T_ci is the one at which the isentropic
+    compressor efficiency equals eff_comp, for a compressor outlet enthalpy
+    equal to the turbine inlet enthalpy.
+
+    Parameters:
+    x_ci (array): Compressor inlet mole fractions (gri30 index space).
+    P_ci (float): Compressor inlet pressure (Pa).
+    m_ci (float): Mass flow rate (kg/s).
+    gas (Cantera.Solution, optional): Gas object; defaults to the shared gri30 gas.
+    method (str): 'brentq' solves for T_ci to xtol; 'scan' is the original 1 K scan.
+    xtol (float): Absolute tolerance on T_ci (K) for 'brentq'.
+    max_iter (int): Maximum number of iterations for 'brentq'.
+    rp_c (float): Compressor pressure ratio.
+    T_ti (float): Turbine inlet temperature (K).
+    eff_turb (float): Turbine isentropic efficiency.
+    eff_comp (float): Target compressor isentropic efficiency.
+    fallback (bool): For 'brentq', if eff_comp is not reached between T_CI_MIN
+                     and T_co, warn and use the end point with the smaller
+                     residual instead of raising.
+
+    Returns:
+    tuple: T_ci, T_to, W_gt, eff_gt, W_turb, W_comp, T_co
+
+    Raises:
+    ValueError: The efficiency target is not bracketed (method 'brentq' and
+                fallback is False).
+    """
     # Ideal gas mixture setup
-    gas = ct.Solution('gri30.xml')  # SOFC의 연료 조성에 맞게 사용
-    N = gas.n_species
-    M = gas.molecular_weights
-    
+    if gas is None:
+        gas = get_gas('gri30.xml')  # SOFC의 연료 조성에 맞게 사용
+
     # Component indices
     iCO2 = gas.species_index('CO2')
-    iCH4 = gas.species_index('CH4')
+    iCO = gas.species_index('CO')
     iH2O = gas.species_index('H2O')
     iH2 = gas.species_index('H2')
-    iO2 = gas.species_index('O2')
-    iN2 = gas.species_index('N2')
-    
+
     # Compressor
+    x_ci = np.asarray(x_ci, dtype=float)
     x_co = x_ci
     m_co = m_ci
-    rp_c = 4.8  # 압축비
-    P_co = rp_c * P_ci
+    P_co = rp_c * P_ci  # 압축비
 
-    # Turbine inlet conditions
-    T_ti = 1200  # SOFC의 높은 작동 온도 반영 (K)
+    # Turbine inlet conditions (SOFC의 높은 작동 온도 반영)
     P_ti = P_co
     P_to = P_ci
-    
-    x_ti = x_co.copy()
-    x_ti[iH2O] = x_co[iH2]
-    x_ti[iH2] = 0
-    x_ti[iCO2] += x_co[iCO]
-    x_ti[iCO] = 0
-
-    x_ti /= sum(x_ti)
+    x_ti = _turbine_inlet_composition(x_co, iH2, iH2O, iCO, iCO2)
 
     gas.TPX = T_ti, P_ti, x_ti
     h_ti = gas.enthalpy_mass
@@ -47,7 +90,7 @@ def MicroSOFC(x_ci, P_ci, m_ci):
     gas.SPX = s_ti, P_to, x_ti
     h_to_s = gas.enthalpy_mass
 
-    h_to = h_ti - (h_ti - h_to_s) * 0.84
+    h_to = h_ti - (h_ti - h_to_s) * eff_turb
     gas.HPX = h_to, P_to, x_ti
     T_to = gas.T
 
@@ -57,29 +100,135 @@ def MicroSOFC(x_ci, P_ci, m_ci):
     gas.HPX = h_ti, P_co, x_co
     T_co = gas.T
 
-    # Iteratively find T_ci
-    h_ci_temp = []
-    err = []
-    T_ci_range = range(250, int(T_co))  # T_ci range (K)
-    
-    for T_ci_temp in T_ci_range:
+    def compressor_efficiency(T_ci_temp):
         gas.TPX = T_ci_temp, P_ci, x_ci
         h_ci = gas.enthalpy_mass
         s_ci = gas.entropy_mass
 
         gas.SPX = s_ci, P_co, x_co
         h_co_s = gas.enthalpy_mass
-
-        eff_temp = (h_co_s - h_ci) / (h_ti - h_ci)
-        h_ci_temp.append(h_ci)
-        err.append(abs(eff_temp - 0.8))
-
-    T_ci = T_ci_range[err.index(min(err))]
-    h_ci = h_ci_temp[err.index(min(err))]
+        return (h_co_s - h_ci) / (h_ti - h_ci), h_ci
+
+    if method == 'brentq':
+        # Efficiency rises monotonically towards T_co, so [T_CI_MIN, T_co) brackets the target
+        def residual(T_ci_temp):
+            return compressor_efficiency(T_ci_temp)[0] - eff_comp
+
+        T_hi = T_co * (1 - 1e-9)
+        f_lo = residual(T_CI_MIN)
+        f_hi = residual(T_hi)
+        if f_lo * f_hi > 0:
+            if not fallback:
+                raise ValueError(f"Compressor efficiency target {eff_comp} is not bracketed by "
+                                 f"T_ci in [{T_CI_MIN}, {T_hi:.1f}] K (residuals {f_lo:.3g}, {f_hi:.3g}).")
+            warnings.warn("Compressor efficiency target is not bracketed; using the closest end point.")
+            T_ci = T_CI_MIN if abs(f_lo) < abs(f_hi) else T_hi
+        else:
+            T_ci = brentq(residual, T_CI_MIN, T_hi, xtol=xtol, maxiter=max_iter)
+        h_ci = compressor_efficiency(T_ci)[1]
+    elif method == 'scan':
+        # Iteratively find T_ci
+        h_ci_temp = []
+        err = []
+        T_ci_range = range(T_CI_MIN, int(T_co))  # T_ci range (K)
+
+        for T_ci_temp in T_ci_range:
+            eff_temp, h_ci = compressor_efficiency(T_ci_temp)
+            h_ci_temp.append(h_ci)
+            err.append(abs(eff_temp - eff_comp))
+
+        T_ci = T_ci_range[err.index(min(err))]
+        h_ci = h_ci_temp[err.index(min(err))]
+    else:
+        raise ValueError(f"Unknown method '{method}'.")
 
     W_comp = m_ci * (h_ti - h_ci)
-    LHV_ci = m_ci * gas.standard_enthalpy_reaction
+    gas.TPX = T_ci, P_ci, x_ci
+    LHV_ci = m_ci * LHV_mass(gas)
     W_gt = W_turb - W_comp
     eff_gt = W_gt / LHV_ci
 
     return T_ci, T_to, W_gt, eff_gt, W_turb, W_comp, T_co
+
+
+def MicroSOFC_sweep(x_ci, P_ci, m_ci, xtol=1e-6, max_iter=100,
+                    rp_c=4.8, T_ti=1200, eff_turb=0.84, eff_comp=0.8, fallback=False):
+    """
+    Vectorized MicroSOFC for part-load sweeps.
+
+    All scalar inputs broadcast to a common length n; x_ci is (k,) or (n, k)
+    in the gri30 index space. Properties come from the NASA-7 engine and T_ci
+    from a vectorized bracketed (Illinois) solve.
+
+    Points whose efficiency target is not bracketed get NaN T_ci, W_comp,
+    W_gt and eff_gt (the closest end point with fallback=True) and are listed
+    in 'failed'.
+
+    Returns:
+    dict: 'T_ci', 'T_to', 'W_gt', 'eff_gt', 'W_turb', 'W_comp', 'T_co', 'converged', arrays of shape (n,),
+          and 'failed' (indices).
+    """
+    full = get_gas('gri30.xml')
+    iCO2 = full.species_index('CO2')
+    iCO = full.species_index('CO')
+    iH2O = full.species_index('H2O')
+    iH2 = full.species_index('H2')
+
+    x_ci = np.atleast_2d(np.asarray(x_ci, dtype=float))
+    x_ti_full = _turbine_inlet_composition(x_ci, iH2, iH2O, iCO, iCO2)
+    gas, index = get_reduced_gas(x_ci, x_ti_full, name='gri30.xml')
+    coeffs = nasa_coefficients(gas)
+
+    P_ci, m_ci, rp_c, T_ti, eff_turb, eff_comp = (np.atleast_1d(np.asarray(v, dtype=float))
+                                                  for v in (P_ci, m_ci, rp_c, T_ti, eff_turb, eff_comp))
+    n = max(len(v) for v in (x_ci, P_ci, m_ci, rp_c, T_ti, eff_turb, eff_comp))
+    P_ci, m_ci, rp_c, T_ti, eff_turb, eff_comp = (np.broadcast_to(v, (n,))
+                                                  for v in (P_ci, m_ci, rp_c, T_ti, eff_turb, eff_comp))
+    Y_ci = np.broadcast_to(mole_to_mass_fractions(coeffs, to_reduced(x_ci, index)), (n, len(index)))
+    Y_ti = np.broadcast_to(mole_to_mass_fractions(coeffs, to_reduced(x_ti_full, index)), (n, len(index)))
+    P_co = rp_c * P_ci
+
+    # Turbine
+    ti = mixture_properties(coeffs, T_ti, P_co, Y_ti, normalize=False)
+    h_ti = ti['h']
+    T_to_s, _ = temperature_from_entropy(coeffs, ti['s'], P_ci, Y_ti, T_guess=T_ti)
+    h_to_s = mixture_properties(coeffs, T_to_s, P_ci, Y_ti, normalize=False)['h']
+    h_to = h_ti - (h_ti - h_to_s) * eff_turb
+    T_to, _ = temperature_from_enthalpy(coeffs, h_to, Y_ti, T_guess=T_to_s)
+    W_turb = m_ci * (h_ti - h_to)
+
+    # Compressor outlet conditions
+    T_co, _ = temperature_from_enthalpy(coeffs, h_ti, Y_ci, T_guess=T_ti)
+
+    def residual(T_ci, i):
+        ci = mixture_properties(coeffs, T_ci, P_ci[i], Y_ci[i], normalize=False)
+        T_co_s, _ = temperature_from_entropy(coeffs, ci['s'], P_co[i], Y_ci[i], T_guess=T_co[i])
+        h_co_s = mixture_properties(coeffs, T_co_s, P_co[i], Y_ci[i], normalize=False)['h']
+        return (h_co_s - ci['h']) / (h_ti[i] - ci['h']) - eff_comp[i]
+
+    root = bracketed_root(residual, np.full(n, float(T_CI_MIN)), T_co * (1 - 1e-9),
+                          xtol=xtol, max_iter=max_iter)
+    T_ci = root['x']
+    failed = np.flatnonzero(~root['bracketed'])
+    if len(failed):
+        warnings.warn(f"Compressor efficiency target is not bracketed at {len(failed)} point(s).")
+        if not fallback:
+            T_ci = np.where(root['bracketed'], T_ci, np.nan)
+    h_ci = mixture_properties(coeffs, T_ci, P_ci, Y_ci, normalize=False)['h']
+    W_comp = m_ci * (h_ti - h_ci)
+
+    # Heating value per inlet composition (one dot product for all rows)
+    LHV_ci = m_ci * np.broadcast_to(lhv_mass(full, X=x_ci), (n,))
+    W_gt = W_turb - W_comp
+
+    return {
+        'T_ci': T_ci,
+        'T_to': T_to,
+        'W_gt': W_gt,
+        'eff_gt': W_gt / LHV_ci,
+        'W_turb': W_turb,
+        'W_comp': W_comp,
+        'T_co': T_co,
+        'converged': root['converged'] & root['bracketed'],
+        'failed': failed,
+    }
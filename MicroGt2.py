@@ -5,20 +5,26 @@ Created on Tue Dec 24 03:27:43 2024
 @author: 82108
 """
 
-from cantera import Solution
+from heating_value import lhv_mass
+from mechanism import get_gas, get_reduced_gas, to_reduced
 
-def MicroSOFC(x_ci, P_ci, m_ci):
-    # Load SOFC-specific gas model
-    gas = Solution('sofc.cti')
-    N = gas.n_species
+def MicroSOFC(x_ci, P_ci, m_ci, gas=None):
+    # SOFC-specific gas model: thermo-only SOFC species set of gri30
+    # (replaces sofc.cti); compositions stay in the gri30 index space
+    full = get_gas('gri30.yaml')
+    if gas is None:
+        gas, index = get_reduced_gas(x_ci, name='gri30.yaml')
+    else:
+        index = slice(None)
+    N = full.n_species
     
     # Index for common species
-    iH2 = gas.species_index('H2')
-    iO2 = gas.species_index('O2')
-    iCO = gas.species_index('CO')
-    iCO2 = gas.species_index('CO2')
-    iH2O = gas.species_index('H2O')
-    iN2 = gas.species_index('N2')
+    iH2 = full.species_index('H2')
+    iO2 = full.species_index('O2')
+    iCO = full.species_index('CO')
+    iCO2 = full.species_index('CO2')
+    iH2O = full.species_index('H2O')
+    iN2 = full.species_index('N2')
     
     # Compressor
     x_co = x_ci
@@ -27,14 +33,14 @@ def MicroSOFC(x_ci, P_ci, m_ci):
     P_co = rp_c * P_ci
     T_co = 900 + 273.15  # SOFC pre-reformer output temperature
     
-    gas.TPX = T_co, P_co, x_co
+    gas.TPX = T_co, P_co, to_reduced(x_co, index)
     h_co = gas.enthalpy_mass
     cp_co = gas.cp_mass
     cv_co = gas.cv_mass
     k = cp_co / cv_co
     
     T_ci = T_co / ((P_co / P_ci) ** ((k - 1) / k))
-    gas.TPX = T_ci, P_ci, x_ci
+    gas.TPX = T_ci, P_ci, to_reduced(x_ci, index)
     h_ci = gas.enthalpy_mass
     
     W_comp = m_ci * (h_co - h_ci)
@@ -52,18 +58,18 @@ def MicroSOFC(x_ci, P_ci, m_ci):
     x_ti[iO2] -= 0.5 * x_co[iH2]
     
     x_ti = x_ti / sum(x_ti)
-    gas.TPX = T_ti, P_ti, x_ti
+    gas.TPX = T_ti, P_ti, to_reduced(x_ti, index)
     h_ti = gas.enthalpy_mass
     
     x_to = x_ti.copy()
-    gas.TPX = T_to, P_to, x_to
+    gas.TPX = T_to, P_to, to_reduced(x_to, index)
     h_to = gas.enthalpy_mass
     
     W_turb = m_co * (h_ti - h_to)
     
     # Efficiency
     W_gt = W_turb - W_comp
-    LHV_ci = m_ci * gas.enthalpy_mole(iH2)  # Assuming H2 as primary fuel
+    LHV_ci = m_ci * lhv_mass(full, X=x_ci)  # 입구 연료 조성 (H2, CO, CH4 ...) 의 LHV
     eff_gt = W_gt / LHV_ci
     
     return T_ci, T_to, x_to, W_gt, eff_gt, W_turb, W_comp, T_co
@@ -1,12 +1,15 @@
-import cantera as ct
+from mechanism import get_reduced_gas, to_reduced
 
-def mix(T1, T2, P1, P2, X1, X2, m1, m2):
-    # SOFC에 적합한 기체 모델 사용
-    gas = ct.Solution('gri30.cti')  # SOFC 모델에서도 gri30 사용 가능
-    M = gas.molecular_weights
+def mix(T1, T2, P1, P2, X1, X2, m1, m2, gas=None):
+    # SOFC에 적합한 기체 모델 사용: 사용 중인 화학종만 가진 열역학 전용 상
+    # (X1, X2, X3는 전체 gri30 인덱스 공간 그대로 유지)
+    if gas is None:
+        gas, index = get_reduced_gas(X1, X2, name='gri30.cti')  # SOFC 모델에서도 gri30 사용 가능
+    else:
+        index = slice(None)
 
     # 기체 1 초기 설정
-    gas.TPX = T1, P1, X1
+    gas.TPX = T1, P1, to_reduced(X1, index)
     h1 = gas.enthalpy_mass
     s1 = gas.entropy_mass
     H1 = m1 * h1
@@ -14,7 +17,7 @@ def mix(T1, T2, P1, P2, X1, X2, m1, m2):
     M1 = gas.mean_molecular_weight
 
     # 기체 2 초기 설정
-    gas.TPX = T2, P2, X2
+    gas.TPX = T2, P2, to_reduced(X2, index)
     h2 = gas.enthalpy_mass
     s2 = gas.entropy_mass
     H2 = m2 * h2
@@ -29,8 +32,7 @@ def mix(T1, T2, P1, P2, X1, X2, m1, m2):
     X3 = (X1 * m1 / M1 + X2 * m2 / M2) / sum(X1 * m1 / M1 + X2 * m2 / M2)
 
     # 혼합 기체 상태 설정
-    gas.HP = h3, P3
-    gas.X = X3
+    gas.HPX = h3, P3, to_reduced(X3, index)
     T3 = gas.T
     s3 = gas.entropy_mass
     S3 = m3 * s3
@@ -1,10 +1,12 @@
 import cantera as ct
 import numpy as np
+from mechanism import get_gas
 
 # Define the function for SOFC modeling
-def sofc_modeling(m_H2, m_H2O, m_O2, T_reform_in, T_reform_out, P_reform, x_O2_in):
+def sofc_modeling(m_H2, m_H2O, m_O2, T_reform_in, T_reform_out, P_reform, x_O2_in, gas=None):
     # Initialize gas properties with a YAML database
-    gas = ct.Solution('gri30.yaml')  # Replace with the correct YAML file for SOFC
+    if gas is None:
+        gas = get_gas('gri30.yaml')  # Replace with the correct YAML file for SOFC
     
     # Define species indices for key components
     iH2 = gas.species_index('H2')
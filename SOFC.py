@@ -7,15 +7,23 @@ Created on Tue Dec 24 03:21:57 2024
 
 # SOFC 모델링 코드 (MCFC에서 변환)
 import numpy as np
-from cantera import Solution, one_atm
+from cantera import one_atm
+from equilibrium_table import equilibrate_TP
+from heating_value import lhv_mass
+from mechanism import get_gas
+from polarization import CellParams, cell_feed, operating_point
 
-def sofc_model(m_CH4, m_H2O, m_ca_in, T_reform_in, T_reform_out, P_reform, x_ca_in):
+def sofc_model(m_CH4, m_H2O, m_ca_in, T_reform_in, T_reform_out, P_reform, x_ca_in, gas=None,
+               util=0.75, params=None, full_output=False):
     """
     SOFC 모델링 함수
-    - 입력: 연료 성분, 초기 조건, 온도 및 압력
-    - 출력: 시스템 효율, 스택 온도, 전기 화학적 파라미터
+    - 입력: 연료 성분, 초기 조건, 온도 및 압력, 연료 활용도 util
+    - 출력: 총 전력 W_tot = V * I, 스택 온도, 시스템 효율
+    - 전압은 polarization.operating_point 로 계산 (params: CellParams)
+    - full_output=True 이면 작동점 dict (V, j, I, 손실 항목) 도 반환
     """
-    gas = Solution('gri30.yaml')  # gri30.xml -> gri30.yaml
+    if gas is None:
+        gas = get_gas('gri30.yaml')  # gri30.xml -> gri30.yaml
     
     # 기체 구성 요소 인덱스
     iCO2 = gas.species_index('CO2')
@@ -32,52 +40,44 @@ def sofc_model(m_CH4, m_H2O, m_ca_in, T_reform_in, T_reform_out, P_reform, x_ca_
 
     # 연료의 낮은 발열량(LHV)
     gas.Y = {"CH4": m_CH4, "H2O": m_H2O}
-    LHV_fuel = gas.enthalpy_mass  # 단위: [J/kg]
+    LHV_fuel = lhv_mass(gas)  # 단위: [J/kg]
 
-    # SOFC 조건 초기화
-    V = 0.8  # 초기 전지 전압 [V]
+    # SOFC 조건
     num_stacks = 300  # 스택 수
-    A_tot = 12000  # 전극 면적 [cm^2]
-    util = 0.75  # 연료 활용도
-    
+    A_tot = 12000  # 스택당 전극 면적 [cm^2]
+    area = A_tot * num_stacks
+
     # 온도 및 압력 설정
-    T_fc = T_reform_out  # 연료 전지 초기 온도 [K]
+    T_fc = T_reform_out  # 연료 전지 온도 [K]
     P_an = one_atm
-    P_ca = one_atm
-
-    # 계산 반복
-    for iteration in range(100):
-        # 가스 상태 업데이트
-        gas.TPX = T_fc, P_an, x_an_in
 
-        # 전기화학적 계산
-        delta_G = 242000 - 45.8 * T_fc  # 기브스 자유 에너지 변화 [J/mol]
-        E = delta_G / (2 * 96487)  # Nernst 전압 [V]
-        R_tot = 0.1  # 내부 저항 [Ohm*cm^2], 추정값
-        j = (E - V) / R_tot  # 전류 밀도 [A/cm^2]
-        
-        # 연료 활용도 및 효율 업데이트
-        util_calc = 1 - (LHV_fuel * (1 - util) / LHV_fuel)
-        if abs(util_calc - util) < 0.01:
-            break
-        V += 0.01 if util_calc < util else -0.01
+    # 주어진 연료 활용도에서의 작동점 (Nernst, 활성화, 저항, 농도 손실)
+    feed = cell_feed(gas, x_an_in, m_tot, x_ca_in, m_ca_in, area)
+    op = operating_point(T_fc, feed, params or CellParams(), P_an, area=area, util=util)
 
     # 출력 결과 계산
-    W_tot = j * A_tot * num_stacks  # 총 전력 [W]
+    W_tot = float(op['W'])  # 총 전력 = V * I [W]
     eff_cell = W_tot / (LHV_fuel * m_tot)  # 시스템 효율
 
+    if full_output:
+        return W_tot, T_fc, eff_cell, op
     return W_tot, T_fc, eff_cell
 
-def reformer(gas, m_CH4, m_H2O, T_in, T_out, P):
+def reformer(gas, m_CH4, m_H2O, T_in, T_out, P, tabulate=False, table=None):
     """
     개질기 (Reformer) 계산 함수
     - 가스 및 연료 유량 초기화
     - 출력: 개질된 연료 조성
+    - tabulate=True 이면 평형 계산을 EquilibriumTable (ISAT) 캐시로 처리
+      (table=None 이면 스레드 공유 테이블 사용, 몰분율 오차 ~ table.tol)
     """
     # 입력 상태 설정
     gas.TPX = T_in, P, {"CH4": m_CH4, "H2O": m_H2O}
     # 화학적 균형 계산
-    gas.equilibrate('TP')
+    if tabulate:
+        equilibrate_TP(gas, table)
+    else:
+        gas.equilibrate('TP')
     x_out = gas.X
     Q_an_mix = gas.enthalpy_mass
     return x_out, Q_an_mix
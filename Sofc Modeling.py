@@ -1,6 +1,7 @@
 import cantera as ct
 import numpy as np
 from fan import fan
+from mechanism import new_gas
 from create_gas import create_gas_structure
 from fn_build_5 import build_filename
 from HX import heat_exchanger_effectiveness
@@ -27,7 +28,7 @@ def integrate_sofc_system():
     """
     # Step 1: Initialize gas
     def initialize_fuel_mixture():
-        gas = ct.Solution('gri30.xml')  # Cantera 메커니즘
+        gas = new_gas('gri30.xml')  # Cantera 메커니즘
         gas.TPX = 300, ct.one_atm, {'CH4': 0.5, 'H2O': 0.5}  # 초기 혼합물 비율
         return gas
 
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 27 09:02:15 2026
+
+@author: 82108
+"""
+
+# Checkpoint files for long integrations.
+# A checkpoint is an .npz of named arrays written atomically (temporary file,
+# fsync, os.replace), so a run killed while writing leaves the previous
+# checkpoint intact. run_hash() fingerprints the inputs of a run; a
+# checkpoint is only resumed by a run with the same fingerprint.
+
+import hashlib
+import os
+
+import numpy as np
+
+
+def run_hash(*items):
+    """
+    SHA-256 fingerprint of the inputs of a run.
+
+    Arrays contribute their dtype, shape and bytes; NamedTuples, tuples and
+    lists are hashed item by item; anything else by repr().
+
+    Returns:
+    str: Hex digest.
+    """
+    digest = hashlib.sha256()
+
+    def update(item):
+        if isinstance(item, np.ndarray):
+            digest.update(f"{item.dtype.str}{item.shape}".encode())
+            digest.update(np.ascontiguousarray(item).tobytes())
+        elif hasattr(item, '_asdict'):
+            update(tuple(item._asdict().items()))
+        elif isinstance(item, (tuple, list)):
+            digest.update(f"{type(item).__name__}{len(item)}".encode())
+            for sub in item:
+                update(sub)
+        else:
+            digest.update(repr(item).encode())
+        digest.update(b'|')
+
+    for item in items:
+        update(item)
+    return digest.hexdigest()
+
+
+def save_checkpoint(path, **arrays):
+    """
+    Atomically write named arrays to path (.npz format).
+
+    Parameters:
+    path (str): Checkpoint file.
+    **arrays: Values stored with np.savez (scalars and strings are fine).
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, expected_hash=None):
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Parameters:
+    path (str): Checkpoint file.
+    expected_hash (str, optional): Required value of the stored 'hash' entry.
+
+    Returns:
+    dict or None: The stored arrays (0-d arrays as scalars), or None if the file
+                  does not exist or belongs to a different run.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        state = {key: data[key][()] if data[key].ndim == 0 else data[key] for key in data.files}
+    if expected_hash is not None and str(state.get('hash')) != expected_hash:
+        return None
+    return state
+
+
+def remove_checkpoint(path):
+    """Delete a checkpoint file if it exists."""
+    if os.path.exists(path):
+        os.remove(path)
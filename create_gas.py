@@ -1,4 +1,4 @@
-import cantera as ct
+from mechanism import new_gas
 
 def create_gas_structure():
     """
@@ -7,7 +7,7 @@ def create_gas_structure():
     filename = 'gri30.yaml'  # GRI 3.0 mechanism
     phasename = 'gri30'
     try:
-        gas = ct.Solution(filename, phasename)
+        gas = new_gas(filename, phasename)
         NSP = gas.n_species
         nrxn = gas.n_reactions
         print(f"Gas structure created with {NSP} species and {nrxn} reactions.")
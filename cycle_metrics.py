@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 28 11:26:07 2026
+
+@author: 82108
+"""
+
+# Running cycle metrics.
+# CycleMetrics is fed consecutive states of one trajectory while the
+# integrator advances and keeps only scalars: peak pressure and its crank
+# angle, the maximum pressure rise rate dp/dCAD and its angle, and the gross
+# work integral of p dV. run_cycle passes every solver step's dense output
+# (update_interval): the work is integrated on a sub-grid, while the peak
+# and the maximum rise rate are located on the dense output itself as roots
+# of dp/dt and d2p/dt2 (bracketed_root), so they do not depend on the
+# sub-grid. Sweeps that only need these statistics can then run with
+# store=False and O(1) memory per run. Pressures are reported in bar and
+# rise rates in bar/CAD, and the gross efficiency and power are defined as
+# in sofc_post_process_HT.cycle_statistics.
+
+import cantera as ct
+import numpy as np
+
+from heating_value import lhv_mass
+from root_finding import bracketed_root
+
+
+class CycleMetrics:
+    """
+    Running reductions over a cycle trajectory.
+
+    Parameters:
+    params (SystemParams): Cylinder parameters (MASS, bore, stroke and RPM are used).
+    gas (Cantera.Solution): Gas object of the state vector's species.
+    n_sub (int): Dense-output samples per solver step (work integral and
+                 bracketing of the extrema).
+    LHV (float, optional): Lower heating value per kg of trapped charge (J/kg);
+                           by default that of the first state's composition.
+    n_cyl (int): Number of cylinders for the gross power.
+    """
+
+    _FIELDS = ('t', 'p', 'V', 'CAD', 'peak_p', 'angle_of_peak_p', 'max_rate_rise',
+               'angle_of_max_rate_rise', 'gross_work', 'charge_lhv', 'samples')
+
+    def __init__(self, params, gas, n_sub=8, LHV=None, n_cyl=1):
+        self.params = params
+        self.gas = gas
+        self.n_sub = n_sub
+        self.LHV = LHV
+        self.n_cyl = n_cyl
+        self.NSP = gas.n_species
+        self.inv_MW = 1.0 / gas.molecular_weights
+        self.displacement = np.pi * (params.bore / 2) ** 2 * params.stroke
+        self.reset()
+
+    def reset(self):
+        """Start a new trajectory."""
+        self.t = np.nan  # last state seen
+        self.p = np.nan
+        self.V = np.nan
+        self.CAD = np.nan
+        self.peak_p = -np.inf
+        self.angle_of_peak_p = np.nan
+        self.max_rate_rise = 0.0
+        self.angle_of_max_rate_rise = np.nan
+        self.gross_work = 0.0
+        self.charge_lhv = np.nan if self.LHV is None else self.LHV
+        self.samples = 0
+
+    def pressure(self, X):
+        """Cylinder pressure (Pa) of states X (n, 5 + NSP)."""
+        Rc = ct.gas_constant * (X[:, 5:5 + self.NSP] @ self.inv_MW)
+        return self.params.MASS * Rc * X[:, 2] / X[:, 1]
+
+    def update(self, t, X):
+        """
+        Add states X (n, 5 + NSP) at increasing times t (n,) that continue the trajectory.
+        """
+        t = np.atleast_1d(t)
+        X = np.atleast_2d(X)
+        p = self.pressure(X)
+        V = X[:, 1]
+        CAD = X[:, 0] * (180 / np.pi)
+        if not self.samples and self.LHV is None:
+            self.charge_lhv = lhv_mass(self.gas, Y=X[0, 5:5 + self.NSP])
+
+        i = int(np.argmax(p))
+        if p[i] > self.peak_p:
+            self.peak_p = p[i]
+            self.angle_of_peak_p = CAD[i]
+
+        # 연속된 점 사이의 차분 (이전 구간의 마지막 점 포함)
+        if self.samples:
+            p_all = np.concatenate(([self.p], p))
+            V_all = np.concatenate(([self.V], V))
+            CAD_all = np.concatenate(([self.CAD], CAD))
+        else:
+            p_all, V_all, CAD_all = p, V, CAD
+        if len(p_all) > 1:
+            dp = np.diff(p_all)
+            dCAD = np.diff(CAD_all)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rr = np.where(dCAD > 0, dp / dCAD, 0.0)
+            j = int(np.argmax(rr))
+            if rr[j] > self.max_rate_rise:
+                self.max_rate_rise = rr[j]
+                self.angle_of_max_rate_rise = 0.5 * (CAD_all[j] + CAD_all[j + 1])
+            self.gross_work += 0.5 * ((p_all[1:] + p_all[:-1]) * np.diff(V_all)).sum()
+
+        self.t, self.p, self.V, self.CAD = t[-1], p[-1], V[-1], CAD[-1]
+        self.samples += len(t)
+
+    def update_interval(self, t_a, t_b, state):
+        """
+        Add one solver step (t_a, t_b] given by its dense output.
+
+        Parameters:
+        t_a, t_b (float): Step interval; the state at t_a has already been added.
+        state (callable): state(t) -> X (n, 5 + NSP) for times t (n,).
+        """
+        t_sub = np.linspace(t_a, t_b, self.n_sub + 1)
+        self.update(t_sub[1:], state(t_sub[1:]))
+
+        # dp/dt, d2p/dt2 and dCAD/dt by central differences on the dense output
+        h = 1e-4 * (t_b - t_a)
+        if h <= 0:
+            return
+
+        def derivatives(t):
+            t = np.atleast_1d(t)
+            X = state(np.concatenate((t - h, t, t + h)))
+            p = self.pressure(X).reshape(3, -1)
+            CAD = X[:, 0].reshape(3, -1) * (180 / np.pi)
+            dp = (p[2] - p[0]) / (2 * h)
+            d2p = (p[2] - 2 * p[1] + p[0]) / h**2
+            dCAD = (CAD[2] - CAD[0]) / (2 * h)
+            return p[1], dp, d2p, CAD[1], dCAD
+
+        _, dp, d2p, CAD, dCAD = derivatives(t_sub)
+        xtol = 1e-8 * (t_b - t_a)
+
+        # 부호가 +에서 -로 바뀌는 구간: dp/dt = 0 (압력 극대)
+        i = np.flatnonzero((dp[:-1] > 0) & (dp[1:] <= 0))
+        if len(i):
+            root = bracketed_root(lambda s, idx: derivatives(s)[1], t_sub[i], t_sub[i + 1], xtol=xtol)
+            p_max, _, _, CAD_max, _ = derivatives(root['x'])
+            j = int(np.argmax(p_max))
+            if p_max[j] > self.peak_p:
+                self.peak_p = p_max[j]
+                self.angle_of_peak_p = CAD_max[j]
+
+        # The crank turns at constant speed, so dp/dCAD peaks where d2p/dt2 = 0
+        rr, angle = dp / dCAD, CAD
+        i = np.flatnonzero((d2p[:-1] > 0) & (d2p[1:] <= 0))
+        if len(i):
+            root = bracketed_root(lambda s, idx: derivatives(s)[2], t_sub[i], t_sub[i + 1], xtol=xtol)
+            _, dp_max, _, CAD_max, dCAD_max = derivatives(root['x'])
+            rr = np.concatenate((rr, dp_max / dCAD_max))
+            angle = np.concatenate((angle, CAD_max))
+        j = int(np.argmax(rr))
+        if rr[j] > self.max_rate_rise:
+            self.max_rate_rise = rr[j]
+            self.angle_of_max_rate_rise = angle[j]
+
+    def result(self):
+        """
+        Current values.
+
+        Returns:
+        dict: 'peak_p' (bar), 'angle_of_peak_p' (CAD), 'max_rate_rise' (bar/CAD),
+              'angle_of_max_rate_rise' (CAD), 'gross_work' (J, integral of p dV),
+              'gmep' (bar), 'gross_eff' (gross work / (LHV * MASS)),
+              'gross_power' (W, all n_cyl cylinders, one cycle per two
+              revolutions), 'samples'.
+        """
+        return {
+            'peak_p': self.peak_p / 1e5,
+            'angle_of_peak_p': self.angle_of_peak_p,
+            'max_rate_rise': self.max_rate_rise / 1e5,
+            'angle_of_max_rate_rise': self.angle_of_max_rate_rise,
+            'gross_work': self.gross_work,
+            'gmep': self.gross_work / self.displacement / 1e5,
+            'gross_eff': self.gross_work / (self.charge_lhv * self.params.MASS),
+            'gross_power': self.gross_work * (self.params.RPM / 60 / 2) * self.n_cyl,
+            'samples': self.samples,
+        }
+
+    def state(self):
+        """Running values as an array (for checkpoints)."""
+        return np.array([getattr(self, name) for name in self._FIELDS], dtype=float)
+
+    def load_state(self, values):
+        """Restore running values saved by state()."""
+        for name, value in zip(self._FIELDS, values):
+            setattr(self, name, float(value))
+        self.samples = int(self.samples)
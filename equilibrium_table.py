@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 20 10:05:31 2026
+
+@author: 82108
+"""
+
+# In-situ adaptive tabulation (ISAT) of TP equilibrium states.
+# Each table entry stores the equilibrium mole fractions at a query point
+# phi = [T / T_scale, ln(P / P_ref), element mole fractions] together with the
+# linearization A = dX_eq/dphi. Queries inside an entry's ellipsoid of
+# accuracy (EOA) |G dphi| <= 1 are answered by linear interpolation. The
+# linearization error grows with the square of the change |A dphi|, so a new
+# EOA admits changes up to sqrt(tol / kappa), with kappa = error / change^2
+# measured where the nearest entry's estimate was last checked against an
+# exact solve (|A dphi| <= tol, the bound on the change itself, would be far
+# too small). The EOA grows towards later queries whenever an exact solve
+# shows that the linear estimate was still within tolerance.
+
+import threading
+from collections import OrderedDict
+
+import cantera as ct
+import numpy as np
+
+_local = threading.local()
+
+
+class EquilibriumTable:
+    """
+    Tabulated replacement for gas.equilibrate('TP').
+
+    Parameters:
+    gas (Cantera.Solution): Gas object defining the species and elements.
+    tol (float): Maximum absolute mole fraction error accepted from interpolation.
+                 Much below 1e-4 the linear region around an entry shrinks to a
+                 fraction of a kelvin and few queries are retrieved.
+    max_radius (float): Largest distance (in the scaled phi space) an EOA may grow to.
+    max_entries (int): Maximum number of entries kept (least recently used go first).
+    max_bytes (int): Memory cap on the stored arrays.
+    T_scale (float): Temperature scale of the query vector (K).
+    """
+
+    def __init__(self, gas, tol=1e-4, max_radius=0.05,
+                 max_entries=20000, max_bytes=64 * 2**20, T_scale=1000.0):
+        self.species_names = tuple(gas.species_names)
+        self.tol = tol
+        self.max_radius = max_radius
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.T_scale = T_scale
+
+        # Scratch phase for the exact and perturbed solves (thermo only is enough)
+        self._gas = ct.Solution(thermo='ideal-gas', species=gas.species())
+        self._P_ref = gas.reference_pressure
+        self._atoms = np.array([[gas.n_atoms(k, m) for m in range(gas.n_elements)]
+                                for k in range(gas.n_species)])
+
+        # One carrier species per element (the species made of that element only)
+        self._carriers = []
+        for m in range(gas.n_elements):
+            pure = [k for k in range(gas.n_species)
+                    if self._atoms[k, m] > 0 and np.count_nonzero(self._atoms[k]) == 1]
+            if pure:
+                self._carriers.append(min(pure, key=lambda k: self._atoms[k, m]))
+
+        self._entries = OrderedDict()  # id -> (phi, X_eq, A, G)
+        self._next_id = 0
+        self._bytes = 0
+        self._keys = None  # stacked phi and G of the entries, rebuilt when entries change
+        self._shapes = None
+        self._ids = None
+        self._kappa = None  # latest linearization error / change^2
+        self._stats = {'queries': 0, 'retrieves': 0, 'grows': 0, 'adds': 0,
+                       'direct': 0, 'evictions': 0}
+
+    def query_vector(self, T, P, X):
+        """Scaled query vector [T / T_scale, ln(P / P_ref), element mole fractions]."""
+        b = np.asarray(X, dtype=float) @ self._atoms
+        return np.concatenate(([T / self.T_scale, np.log(P / self._P_ref)], b / b.sum()))
+
+    def _solve(self, T, P, X):
+        """Exact TP equilibrium mole fractions."""
+        self._gas.TPX = T, P, X
+        self._gas.equilibrate('TP')
+        return self._gas.X
+
+    def _linearize(self, T, P, X, phi, X_eq, eps=1e-4):
+        """dX_eq/dphi from forward perturbations of T, P and each carrier species."""
+        d_phi = []
+        d_X = []
+        steps = [(T * (1 + eps), P, X), (T, P * (1 + eps), X)]
+        for k in self._carriers:
+            X_k = X.copy()
+            X_k[k] += eps
+            steps.append((T, P, X_k / X_k.sum()))
+        for T_k, P_k, X_k in steps:
+            d_phi.append(self.query_vector(T_k, P_k, X_k) - phi)
+            d_X.append(self._solve(T_k, P_k, X_k) - X_eq)
+        # Element fractions sum to one, so the perturbations span a subspace; use pinv
+        return np.array(d_X).T @ np.linalg.pinv(np.array(d_phi).T)
+
+    def _initial_eoa(self, A):
+        """
+        EOA matrix G of a new entry: the region where the estimated
+        linearization error kappa |A dphi|^2 is below tol (|A dphi| <= tol
+        before any error has been measured), within max_radius.
+        """
+        change = self.tol if self._kappa is None else np.sqrt(self.tol / self._kappa)
+        _, S, Vt = np.linalg.svd(A, full_matrices=False)
+        # Floor the singular values so insensitive directions stay bounded
+        S = np.maximum(S, max(1e-3 * S.max(), change / self.max_radius))
+        return (S / change)[:, None] * Vt
+
+    def _nearest(self, phi):
+        """
+        Candidate entries for a query.
+
+        Returns:
+        tuple: (index with the smallest EOA norm |G dphi|, that norm,
+                index of the nearest entry in the phi space), or Nones if empty.
+        """
+        if not self._entries:
+            return None, np.inf, None
+        if self._keys is None:
+            self._ids = list(self._entries)
+            self._keys = np.array([self._entries[i][0] for i in self._ids])
+            self._shapes = np.array([self._entries[i][3] for i in self._ids])
+        d_phi = phi - self._keys
+        norm = np.linalg.norm(np.einsum('eij,ej->ei', self._shapes, d_phi), axis=1)
+        j = int(np.argmin(norm))
+        return j, norm[j], int(np.argmin(np.einsum('ej,ej->e', d_phi, d_phi)))
+
+    def _add(self, phi, X_eq, A):
+        """Store a new entry and evict least recently used ones over the caps."""
+        G = self._initial_eoa(A)
+        self._entries[self._next_id] = (phi, X_eq, A, G)
+        self._next_id += 1
+        self._bytes += phi.nbytes + X_eq.nbytes + A.nbytes + G.nbytes
+        while len(self._entries) > self.max_entries or \
+                (self._bytes > self.max_bytes and len(self._entries) > 1):
+            _, arrays = self._entries.popitem(last=False)
+            self._bytes -= sum(a.nbytes for a in arrays)
+            self._stats['evictions'] += 1
+        self._keys = None
+
+    @staticmethod
+    def _grow(G, d_phi):
+        """Smallest change of the EOA that takes in d_phi: shrink G along G d_phi."""
+        u = G @ d_phi
+        r = np.linalg.norm(u)
+        u /= r
+        return G - (1 - 1 / r) * np.outer(u, u @ G)
+
+    def lookup(self, T, P, X):
+        """
+        Equilibrium mole fractions at (T, P) for the element content of X.
+
+        Parameters:
+        T (float): Temperature (K).
+        P (float): Pressure (Pa).
+        X (array): Mole fractions (any species of the table's mechanism).
+
+        Returns:
+        array: Equilibrium mole fractions.
+        """
+        X = np.asarray(X, dtype=float)
+        X = X / X.sum()
+        phi = self.query_vector(T, P, X)
+        self._stats['queries'] += 1
+
+        j, norm, k = self._nearest(phi)
+        if j is not None and norm <= 1:
+            # Retrieve: linear interpolation inside the EOA
+            entry_id = self._ids[j]
+            phi_0, X_0, A, _ = self._entries[entry_id]
+            self._entries.move_to_end(entry_id)
+            self._stats['retrieves'] += 1
+            X_eq = np.clip(X_0 + A @ (phi - phi_0), 0.0, None)
+            return X_eq / X_eq.sum()
+
+        X_eq = self._solve(T, P, X)
+        self._stats['direct'] += 1
+
+        if k is not None:
+            entry_id = self._ids[k]
+            phi_0, X_0, A, G = self._entries[entry_id]
+            d_phi = phi - phi_0
+            error = np.abs(X_0 + A @ d_phi - X_eq).max()
+            change = np.abs(A @ d_phi).max()
+            if change > 0 and error > self.tol:
+                # 2차 오차 계수: 새 EOA 크기 결정에 사용
+                self._kappa = error / change**2
+            if np.linalg.norm(d_phi) <= self.max_radius and error <= self.tol:
+                # Grow: the linear estimate was still accurate at this point
+                G = self._grow(G, d_phi)
+                self._entries[entry_id] = (phi_0, X_0, A, G)
+                self._entries.move_to_end(entry_id)
+                self._shapes[k] = G
+                self._stats['grows'] += 1
+                return X_eq
+
+        self._add(phi, X_eq, self._linearize(T, P, X, phi, X_eq))
+        self._stats['adds'] += 1
+        return X_eq
+
+    def equilibrate(self, gas):
+        """Set gas to its TP equilibrium state, like gas.equilibrate('TP')."""
+        T, P = gas.TP
+        gas.TPX = T, P, self.lookup(T, P, gas.X)
+        return gas
+
+    def stats(self):
+        """
+        Cache statistics.
+
+        Returns:
+        dict: Counts of 'queries', 'retrieves' (hits), 'grows', 'adds', 'direct'
+              (exact solves), 'evictions', plus 'entries', 'bytes' and 'hit_rate'.
+        """
+        stats = dict(self._stats)
+        stats['entries'] = len(self._entries)
+        stats['bytes'] = self._bytes
+        stats['hit_rate'] = stats['retrieves'] / stats['queries'] if stats['queries'] else 0.0
+        return stats
+
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        self._entries.clear()
+        self._bytes = 0
+        self._keys = None
+        self._kappa = None
+        for key in self._stats:
+            self._stats[key] = 0
+
+
+def get_table(gas, **kwargs):
+    """
+    Return the calling thread's shared EquilibriumTable for the species of gas.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object defining the species set.
+    **kwargs: EquilibriumTable options, used when the table is created.
+
+    Returns:
+    EquilibriumTable: Thread-local table.
+    """
+    tables = getattr(_local, 'tables', None)
+    if tables is None:
+        tables = _local.tables = {}
+    key = tuple(gas.species_names)
+    if key not in tables:
+        tables[key] = EquilibriumTable(gas, **kwargs)
+    return tables[key]
+
+
+def equilibrate_TP(gas, table=None):
+    """
+    TP equilibrium through the shared (or given) equilibrium table.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object; set to the equilibrium state in place.
+    table (EquilibriumTable, optional): Table to use; defaults to get_table(gas).
+
+    Returns:
+    Cantera.Solution: gas
+    """
+    if table is None:
+        table = get_table(gas)
+    return table.equilibrate(gas)
@@ -7,8 +7,9 @@ Created on Wed Dec 25 13:38:41 2024
 
 import cantera as ct
 import math
+from mechanism import get_reduced_gas
 
-def fan(H5, H5a, T5, T5a):
+def fan(H5, H5a, T5, T5a, gas=None):
     """
     Calculate fan parameters including mass flow rate, temperature differences, and power consumption.
 
@@ -17,12 +18,14 @@ def fan(H5, H5a, T5, T5a):
     H5a (float): Enthalpy after heat release (J).
     T5 (float): Temperature before cooling (K).
     T5a (float): Temperature after cooling (K).
+    gas (Cantera.Solution, optional): Gas object to use; defaults to the reduced SOFC species set of GRI-Mech 3.0.
 
     Returns:
     tuple: Mass flow rate (kg/s), Log mean temperature difference (K), Fan power consumption (W), Inlet air temperature (K), Outlet air temperature (K).
     """
-    # Set up the gas object for SOFC using GRI-Mech 3.0
-    gas = ct.Solution('gri30.yaml')
+    # Set up the gas object for SOFC using the GRI-Mech 3.0 thermo of the SOFC species
+    if gas is None:
+        gas, _ = get_reduced_gas(name='gri30.yaml')
 
     # Define species indices
     iN2 = gas.species_index('N2')
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 21 09:12:48 2026
+
+@author: 82108
+"""
+
+# Formation-enthalpy based lower heating values.
+# Each species gets its LHV for complete combustion to CO2, H2O(g) and N2 at
+# T_ref, so the LHV of any blend is a single dot product with the mass
+# fractions. Species without C, H, O or N (e.g. AR) are inert.
+
+from collections import OrderedDict
+
+import cantera as ct
+import numpy as np
+
+from nasa_props import nasa_coefficients, species_thermo
+
+T_REF = 298.15  # K
+
+_species_cache = {}  # (species names, T_ref) -> LHV per species (J/kg)
+_mixture_cache = OrderedDict()  # (species names, T_ref, Y bytes) -> LHV (J/kg)
+_MIXTURE_CACHE_SIZE = 4096
+
+
+def species_lhv(gas, T_ref=T_REF):
+    """
+    Lower heating value of every species of the mechanism.
+
+    LHV_k = [h_k + (nC + nH/4 - nO/2) h_O2 - nC h_CO2 - nH/2 h_H2O - nN/2 h_N2] / MW_k
+    with all molar enthalpies at T_ref. O2, CO2, H2O and N2 therefore have zero LHV.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object containing O2, CO2, H2O and N2.
+    T_ref (float): Reference temperature (K).
+
+    Returns:
+    array: LHV per species (J/kg), shape (n_species,).
+    """
+    key = (tuple(gas.species_names), T_ref)
+    if key not in _species_cache:
+        coeffs = nasa_coefficients(gas)
+        h = ct.gas_constant * T_ref * species_thermo(coeffs, [T_ref], ('h',))[0][0]
+
+        def atoms(element):
+            if element not in gas.element_names:
+                return np.zeros(gas.n_species)
+            m = gas.element_index(element)
+            return np.array([gas.n_atoms(k, m) for k in range(gas.n_species)])
+
+        nC, nH, nO, nN = (atoms(el) for el in ('C', 'H', 'O', 'N'))
+        h_O2, h_CO2, h_H2O, h_N2 = (h[gas.species_index(sp)] for sp in ('O2', 'CO2', 'H2O', 'N2'))
+        h_products = nC * h_CO2 + nH / 2 * h_H2O + nN / 2 * h_N2 - (nC + nH / 4 - nO / 2) * h_O2
+        reactive = (nC + nH + nO + nN) > 0
+        _species_cache[key] = np.where(reactive, h - h_products, 0.0) / gas.molecular_weights
+    return _species_cache[key]
+
+
+def lhv_mass(gas, Y=None, X=None, T_ref=T_REF):
+    """
+    Lower heating value per kg of mixture.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object defining the species (and the default composition).
+    Y (array, optional): Mass fractions, (k,) or (n, k); default is gas.Y.
+    X (array, optional): Mole fractions, (k,) or (n, k), instead of Y.
+    T_ref (float): Reference temperature (K).
+
+    Returns:
+    float or array: LHV (J/kg) for each composition.
+    """
+    lhv = species_lhv(gas, T_ref)
+    if X is not None:
+        X = np.asarray(X, dtype=float)
+        W = X * gas.molecular_weights
+        Y = W / W.sum(axis=-1, keepdims=True)
+    elif Y is None:
+        Y = gas.Y
+    Y = np.asarray(Y, dtype=float)
+
+    if Y.ndim > 1:
+        return (Y @ lhv) / Y.sum(axis=1)
+
+    # Single compositions repeat a lot in flowsheet iterations; keep recent results
+    key = (tuple(gas.species_names), T_ref, Y.tobytes())
+    if key in _mixture_cache:
+        _mixture_cache.move_to_end(key)
+        return _mixture_cache[key]
+    value = float(Y @ lhv / Y.sum())
+    _mixture_cache[key] = value
+    if len(_mixture_cache) > _MIXTURE_CACHE_SIZE:
+        _mixture_cache.popitem(last=False)
+    return value
+
+
+def clear_cache():
+    """Drop the cached species and mixture heating values."""
+    _species_cache.clear()
+    _mixture_cache.clear()
@@ -5,9 +5,47 @@ Created on Tue Dec 24 02:40:20 2024
 @author: 82108
 """
 
+import warnings
+
 import cantera as ct
+import numpy as np
+from scipy.optimize import brentq
+
+from nasa_props import nasa_coefficients, mixture_properties, species_thermo
+from root_finding import bracketed_root
+
+def init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh, xtol=1e-6, max_iter=100,
+                   T_bracket=(250.0, 4000.0), fallback=False, major_products=None, verbose=True,
+                   full_output=False):
+    """
+    Initial cylinder composition, temperature and mass split.
+
+    The initial temperature satisfies the energy balance of mixing intake,
+    exhaust residual and clearance gas, solved by Brent's method on T_bracket.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object.
+    phi (float): Equivalence ratio.
+    rmf (float): Residual mass fraction.
+    rv (float): Compression ratio.
+    T_int, T_exh, T_clr (float): Intake, exhaust and clearance temperatures (K).
+    y_exh (array): Previous-cycle exhaust mass fractions (ignored with major_products).
+    xtol (float): Absolute tolerance on the initial temperature (K).
+    max_iter (int): Maximum number of Brent iterations.
+    T_bracket (tuple): Temperature bracket for the solve (K).
+    fallback (bool): If the energy balance has no root in T_bracket, warn and
+                     use the end point with the smaller residual instead of raising.
+    major_products (bool): Assume complete-combustion products for the residual instead
+                           of y_exh. None keeps the legacy convention y_exh[0] == 0.
+    verbose (bool): Print progress messages.
+    full_output (bool): Also return a diagnostics dict.
 
-def init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh):
+    Returns:
+    tuple: y_init, T_init, m_init_vec, xspi (, info)
+
+    Raises:
+    ValueError: The energy balance is not bracketed by T_bracket (and fallback is False).
+    """
     # Small value to avoid zeros
     zv = 1e-8
 
@@ -21,15 +59,21 @@ def init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh):
 
     xspi = [x_H2_index, x_O2_index, x_N2_index, x_H2O_index, x_CO_index, x_CO2_index]
 
+    if major_products is None:
+        major_products = y_exh[0] == 0
+
     # Initialize the composition
-    if y_exh[0] == 0:
-        print("Assuming MAJOR PRODUCTS for residual, not using previous cycle data.")
+    if major_products:
+        if verbose:
+            print("Assuming MAJOR PRODUCTS for residual, not using previous cycle data.")
         if phi == 0:
             initX = [zv] * gas.n_species
             initX[x_O2_index] = 0.21
             initX[x_N2_index] = 0.79
             gas.TPX = T_int, ct.one_atm, initX
             y_init = gas.Y
+            # Without fuel the residual is air as well
+            y_exh = y_init
         else:
             # Set intake composition based on equivalence ratio phi
             initX = [zv] * gas.n_species
@@ -59,7 +103,8 @@ def init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh):
             y_init = (1 - rmf) * y_int + rmf * y_exh
 
     else:
-        print("Using previous cycle data for exhaust residual.")
+        if verbose:
+            print("Using previous cycle data for exhaust residual.")
         if phi == 0:
             initX = [zv] * gas.n_species
             initX[x_O2_index] = 0.21
@@ -79,15 +124,15 @@ def init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh):
             y_int = gas.Y
 
             # Mixture composition
-            y_init = (1 - rmf) * y_int + rmf * y_exh
+            y_init = (1 - rmf) * y_int + rmf * np.asarray(y_exh)
+
+    info = {'converged': True, 'iterations': 0, 'function_calls': 0, 'residual': 0.0}
 
     # Initial temperature calculation
     if T_exh == 0:
         T_init = T_int
         m_init_vec = [0, 0, 0]
     else:
-        T_init = 300
-        T_step = 1
         P_cyl = ct.one_atm
 
         gas.TPY = T_clr, ct.one_atm, y_exh
@@ -99,18 +144,162 @@ def init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh):
         R = ct.gas_constant / gas.mean_molecular_weight
         V = (1 / rv) * 1e-3
 
-        while True:
-            T_init += T_step
-            m_init = (P_cyl * V) / (R * T_init)
-            gas.TPY = T_init, ct.one_atm, y_init
-            u_calc = gas.u
+        def split(T):
+            m_init = (P_cyl * V) / (R * T)
             m_exh = (rmf * m_init) - m_clr
             m_int = m_init - m_exh - m_clr
+            return m_init, m_exh, m_int
+
+        # Energy balance residual: mixed internal energy minus u(T)
+        def residual(T):
+            m_init, m_exh, m_int = split(T)
+            gas.TPY = T, ct.one_atm, y_init
+            u_calc = gas.u
             u_test = ((m_int * gas.h) + (m_exh * gas.h) + (m_clr * u_clr) - (P_cyl * V)) / m_init
-            if abs(u_test - u_calc) < 1e-6:
-                break
+            return u_test - u_calc
+
+        T_lo, T_hi = T_bracket
+        f_lo = residual(T_lo)
+        f_hi = residual(T_hi)
+        if f_lo * f_hi > 0:
+            if not fallback:
+                raise ValueError(f"Initial temperature is not bracketed by T_bracket={T_bracket} "
+                                 f"(residuals {f_lo:.3g}, {f_hi:.3g}).")
+            warnings.warn("Initial temperature is not bracketed; using the closest end point.")
+            T_init = T_lo if abs(f_lo) < abs(f_hi) else T_hi
+            info.update(converged=False, function_calls=2)
+        else:
+            T_init, root = brentq(residual, T_lo, T_hi, xtol=xtol, maxiter=max_iter,
+                                  full_output=True, disp=False)
+            info.update(converged=root.converged, iterations=root.iterations,
+                        function_calls=root.function_calls + 2)
+        info['residual'] = residual(T_init)
 
-        print(f"Initial cylinder temperature calculated: {T_init} K")
+        if verbose:
+            print(f"Initial cylinder temperature calculated: {T_init} K")
+        m_init, m_exh, m_int = split(T_init)
         m_init_vec = [m_int, m_exh, m_clr]
 
+    if full_output:
+        return y_init, T_init, m_init_vec, xspi, info
     return y_init, T_init, m_init_vec, xspi
+
+def init_cyl_state_batch(gas, phi, rmf, rv, T_int, T_exh, T_clr, y_exh, xtol=1e-6, max_iter=100,
+                         T_bracket=(250.0, 4000.0), fallback=False, major_products=None):
+    """
+    Vectorized init_cyl_state over arrays of (phi, rmf, rv) and temperatures.
+
+    All scalar inputs broadcast to a common length n. y_exh and major_products
+    follow the scalar function; y_exh may also be an (n, n_species) array of
+    previous-cycle exhaust compositions.
+
+    Points whose energy balance has no root in T_bracket get NaN T_init and
+    m_init_vec (the closest end point with fallback=True) and are listed in
+    'failed'.
+
+    Returns:
+    dict: 'y_init' (n, n_species), 'T_init', 'm_init_vec' (n, 3), 'converged',
+          'iterations', 'residual' (shape (n,)), 'failed' (indices) and 'xspi'.
+    """
+    zv = 1e-8
+    names = ['H2', 'O2', 'N2', 'H2O', 'CO', 'CO2']
+    iH2, iO2, iN2, iH2O, iCO, iCO2 = (gas.species_index(sp) for sp in names)
+    xspi = [iH2, iO2, iN2, iH2O, iCO, iCO2]
+
+    phi, rmf, rv, T_int, T_exh, T_clr = (np.atleast_1d(np.asarray(v, dtype=float))
+                                         for v in (phi, rmf, rv, T_int, T_exh, T_clr))
+    n = max(len(v) for v in (phi, rmf, rv, T_int, T_exh, T_clr))
+    phi, rmf, rv, T_int, T_exh, T_clr = (np.broadcast_to(v, (n,))
+                                         for v in (phi, rmf, rv, T_int, T_exh, T_clr))
+
+    coeffs = nasa_coefficients(gas)
+    MW = coeffs['MW']
+
+    def mass_fractions(X):
+        Y = X * MW
+        return Y / Y.sum(axis=1, keepdims=True)
+
+    fuel = phi != 0
+    phi_f = np.where(fuel, phi, 1.0)
+
+    # Intake composition (air where phi == 0)
+    X_int = np.full((n, gas.n_species), zv)
+    react_total = 1 + (4 / phi_f) * 4.76
+    X_int[:, iH2] = np.where(fuel, 1 / react_total, zv)
+    X_int[:, iO2] = np.where(fuel, 4 / (phi_f * react_total), 0.21)
+    X_int[:, iN2] = np.where(fuel, (4 * 3.76) / (phi_f * react_total), 0.79)
+    y_int = mass_fractions(X_int)
+
+    # Exhaust residual composition
+    y_exh = np.asarray(y_exh, dtype=float)
+    if major_products is None:
+        major_products = y_exh.ndim == 1 and y_exh[0] == 0
+    if major_products:
+        X_prod = np.full((n, gas.n_species), zv)
+        prod_total = 2 + 1 + (4 * 3.76 / phi_f)
+        X_prod[:, iH2O] = 2 / prod_total
+        X_prod[:, iCO2] = 1 / prod_total
+        X_prod[:, iN2] = (4 * 3.76 / phi_f) / prod_total
+        y_res = np.where(fuel[:, None], mass_fractions(X_prod), y_int)
+    else:
+        y_res = np.broadcast_to(y_exh, (n, gas.n_species))
+
+    y_init = np.where(fuel[:, None], (1 - rmf[:, None]) * y_int + rmf[:, None] * y_res, y_int)
+    y_init = y_init / y_init.sum(axis=1, keepdims=True)
+
+    # Clearance gas and mixture gas constants
+    P_cyl = ct.one_atm
+    V = (1 / rv) * 1e-3
+    clr = mixture_properties(coeffs, np.where(T_clr > 0, T_clr, 300.0), P_cyl, y_res)
+    u_clr = clr['u']
+    m_clr = (P_cyl * V) / (clr['R'] * T_clr)
+    R = ct.gas_constant * (y_init / MW).sum(axis=1)
+    y_init_W = y_init / MW
+
+    # Energy balance residual; algebraically m_clr * (u_clr - h(T)) / m_init
+    def residual(T, i):
+        _, h_RT = species_thermo(coeffs, T, ('cp', 'h'))
+        h = ct.gas_constant * T * (y_init_W[i] * h_RT).sum(axis=1)
+        m_init = (P_cyl * V[i]) / (R[i] * T)
+        return m_clr[i] * (u_clr[i] - h) / m_init
+
+    T_init = T_int.copy()
+    m_init_vec = np.zeros((n, 3))
+    converged = np.ones(n, dtype=bool)
+    iterations = np.zeros(n, dtype=int)
+    residuals = np.zeros(n)
+
+    solve = np.flatnonzero(T_exh != 0)
+    if len(solve):
+        def residual_solve(T, i):
+            return residual(T, solve[i])
+
+        root = bracketed_root(residual_solve, np.full(len(solve), T_bracket[0]),
+                              np.full(len(solve), T_bracket[1]), xtol=xtol, rtol=0.0,
+                              max_iter=max_iter)
+        T_init[solve] = root['x']
+        converged[solve] = root['converged'] & root['bracketed']
+        iterations[solve] = root['iterations']
+        residuals[solve] = root['f']
+
+        m_init = (P_cyl * V[solve]) / (R[solve] * T_init[solve])
+        m_exh = rmf[solve] * m_init - m_clr[solve]
+        m_init_vec[solve] = np.column_stack((m_init - m_exh - m_clr[solve], m_exh, m_clr[solve]))
+
+        unbracketed = solve[~root['bracketed']]
+        if len(unbracketed):
+            warnings.warn(f"Initial temperature is not bracketed at {len(unbracketed)} point(s).")
+            if not fallback:
+                T_init[unbracketed] = np.nan
+                m_init_vec[unbracketed] = np.nan
+
+    return {
+        'y_init': y_init,
+        'T_init': T_init,
+        'm_init_vec': m_init_vec,
+        'converged': converged,
+        'iterations': iterations,
+        'residual': residuals,
+        'failed': np.flatnonzero(~converged),
+        'xspi': xspi,
+    }
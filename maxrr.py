@@ -7,58 +7,158 @@ Created on Tue Dec 24 03:17:46 2024
 
 import numpy as np
 
+
+def _rise_rates(CAD, p, w):
+    """Windowed rise rates (..., n - 2w) and their centre CAD, negative rises set to 0."""
+    dp = p[..., 2 * w:] - p[..., :-2 * w]
+    dCAD = CAD[..., 2 * w:] - CAD[..., :-2 * w]
+    rr = np.where(dp < 0, 0.0, dp / dCAD)
+    return rr, CAD[..., w:CAD.shape[-1] - w]
+
+
 def max_rr(CAD, p, window_half_width):
     """
     Finds the maximum rate of rise (rr) of the "p" vector and the corresponding
     value of the "CAD" vector using a two-point derivative approximation.
 
     Parameters:
-        CAD (array-like): Crank angle degree (CAD) vector.
-        p (array-like): Pressure vector.
-        window_half_width (int): Half-width of the window for derivative approximation.
+        CAD (array-like): Crank angle degree (CAD) vector, (n,), or (m, n) per trace.
+        p (array-like): Pressure vector (n,), or (m, n) for m stacked traces.
+        window_half_width (int or sequence): Half-width of the window for derivative
+                                             approximation; several widths are done in one call.
 
     Returns:
-        rr (float): Maximum rate of rise of pressure.
-        aorr (float): Corresponding CAD value at maximum rate of rise.
+        rr (float or array): Maximum rate of rise of pressure.
+        aorr (float or array): Corresponding CAD value at maximum rate of rise.
+        For stacked traces the leading shape is (m,); for several widths a last
+        axis of len(window_half_width) is added.
     """
-    CAD = np.array(CAD)
-    p = np.array(p)
+    CAD = np.asarray(CAD, dtype=float)
+    p = np.asarray(p, dtype=float)
 
     # Ensure input dimensions are correct
-    if CAD.ndim != 1 or p.ndim != 1:
-        raise ValueError("CAD and p must be 1D arrays.")
-    if len(CAD) != len(p):
+    if p.ndim not in (1, 2) or CAD.ndim not in (1, 2) or CAD.ndim > p.ndim:
+        raise ValueError("p must be a 1D or 2D array and CAD 1D or of the same shape as p.")
+    if CAD.shape[-1] != p.shape[-1]:
         raise ValueError("CAD and p must have the same length.")
 
-    rr_values = []
-    CAD_rr = []
+    widths = np.atleast_1d(window_half_width)
+    rr = np.empty(p.shape[:-1] + (len(widths),))
+    aorr = np.empty_like(rr)
+    for k, w in enumerate(widths):
+        w = int(w)
+        if w < 1 or 2 * w >= p.shape[-1]:
+            raise ValueError("window_half_width must be at least 1 and below half the trace length.")
+        rates, CAD_rr = _rise_rates(CAD, p, w)
+        index = np.argmax(rates, axis=-1)
+        rr[..., k] = np.take_along_axis(rates, index[..., None], axis=-1)[..., 0]
+        aorr[..., k] = np.take_along_axis(np.broadcast_to(CAD_rr, rates.shape), index[..., None], axis=-1)[..., 0]
+
+    if np.ndim(window_half_width) == 0:
+        rr, aorr = rr[..., 0], aorr[..., 0]
+    if rr.ndim == 0:
+        return float(rr), float(aorr)
+    return rr, aorr
+
+
+class MaxRRStream:
+    """
+    Streaming max_rr over (CAD, p) chunks.
+
+    Only the last 2 * max(window_half_width) samples are kept between chunks,
+    so memory does not grow with the trace length. Results equal max_rr on
+    the concatenated chunks.
+
+    Parameters:
+        window_half_width (int or sequence): Window half-width(s).
+        n_traces (int, optional): Number of stacked traces per chunk; chunks of p
+                                  are then (n_traces, n_chunk) and CAD (n_chunk,) or
+                                  the same shape as p.
+    """
 
-    for index in range(window_half_width, len(CAD) - window_half_width):
-        dp = p[index + window_half_width] - p[index - window_half_width]
-        dCAD = CAD[index + window_half_width] - CAD[index - window_half_width]
-        
-        # Avoid negative rates of rise
-        if dp < 0:
-            rr_values.append(0)
-        else:
-            rr_values.append(dp / dCAD)
-        CAD_rr.append(CAD[index])
+    def __init__(self, window_half_width, n_traces=None):
+        self.scalar_width = np.ndim(window_half_width) == 0
+        self.widths = [int(w) for w in np.atleast_1d(window_half_width)]
+        if min(self.widths) < 1:
+            raise ValueError("window_half_width must be at least 1.")
+        self.n_traces = n_traces
+        lead = () if n_traces is None else (n_traces,)
+        self.depth = 2 * max(self.widths)
+        self._CAD = np.empty(lead + (self.depth,))
+        self._p = np.empty(lead + (self.depth,))
+        self._fill = 0  # samples in the buffer (< depth only at the start)
+        self.rr = np.full(lead + (len(self.widths),), -np.inf)
+        self.aorr = np.full(lead + (len(self.widths),), np.nan)
+        self.samples = 0
 
-    # Find the maximum rate of rise and its corresponding CAD value
-    rr_values = np.array(rr_values)
-    CAD_rr = np.array(CAD_rr)
+    def update(self, CAD, p):
+        """Consume one chunk of samples."""
+        p = np.asarray(p, dtype=float)
+        CAD = np.broadcast_to(np.asarray(CAD, dtype=float), p.shape)
+        if p.shape[-1] == 0:
+            return
+        CAD_all = np.concatenate((self._CAD[..., :self._fill], CAD), axis=-1)
+        p_all = np.concatenate((self._p[..., :self._fill], p), axis=-1)
 
-    max_rr = np.max(rr_values)
-    max_rr_index = np.argmax(rr_values)
-    aorr = CAD_rr[max_rr_index]
+        for k, w in enumerate(self.widths):
+            # Windows whose right end lies in the new chunk
+            start = max(self._fill - 2 * w, 0)
+            if p_all.shape[-1] - start <= 2 * w:
+                continue
+            rates, CAD_rr = _rise_rates(CAD_all[..., start:], p_all[..., start:], w)
+            index = np.argmax(rates, axis=-1)
+            best = np.take_along_axis(rates, index[..., None], axis=-1)[..., 0]
+            angle = np.take_along_axis(CAD_rr, index[..., None], axis=-1)[..., 0]
+            # First maximum wins, as with np.argmax in max_rr
+            better = best > self.rr[..., k]
+            self.rr[..., k] = np.where(better, best, self.rr[..., k])
+            self.aorr[..., k] = np.where(better, angle, self.aorr[..., k])
+
+        # Keep the last depth samples
+        n_keep = min(p_all.shape[-1], self.depth)
+        self._CAD[..., :n_keep] = CAD_all[..., -n_keep:]
+        self._p[..., :n_keep] = p_all[..., -n_keep:]
+        self._fill = n_keep
+        self.samples += p.shape[-1]
+
+    def result(self):
+        """
+        Current maximum rate of rise and its CAD, shaped like max_rr's output
+        (nan until the first full window).
+        """
+        rr = np.where(np.isinf(self.rr), np.nan, self.rr)
+        aorr = self.aorr
+        if self.scalar_width:
+            rr, aorr = rr[..., 0], aorr[..., 0]
+        if rr.ndim == 0:
+            return float(rr), float(aorr)
+        return rr.copy(), aorr.copy()
+
+
+def max_rr_stream(chunks, window_half_width, n_traces=None):
+    """
+    max_rr over a generator of (CAD, p) chunks.
+
+    Parameters:
+        chunks (iterable): Yields (CAD, p) chunks in time order.
+        window_half_width (int or sequence): Window half-width(s).
+        n_traces (int, optional): Number of stacked traces (see MaxRRStream).
+
+    Returns:
+        rr, aorr: As max_rr.
+    """
+    stream = MaxRRStream(window_half_width, n_traces)
+    for CAD, p in chunks:
+        stream.update(CAD, p)
+    return stream.result()
 
-    return max_rr, aorr
 
 # Example usage (replace with actual data):
-CAD = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
-p = [1, 2, 4, 7, 11, 16, 22, 29, 37, 46, 56]
-window_half_width = 2
+if __name__ == "__main__":
+    CAD = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+    p = [1, 2, 4, 7, 11, 16, 22, 29, 37, 46, 56]
+    window_half_width = 2
 
-rr, aorr = max_rr(CAD, p, window_half_width)
-print("Maximum rate of rise (rr):", rr)
-print("Corresponding CAD (aorr):", aorr)
+    rr, aorr = max_rr(CAD, p, window_half_width)
+    print("Maximum rate of rise (rr):", rr)
+    print("Corresponding CAD (aorr):", aorr)
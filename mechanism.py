@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 18 10:12:40 2026
+
+@author: 82108
+"""
+
+# Process-wide mechanism registry.
+# Each mechanism file is parsed once per process; every thread then gets its
+# own Solution built from the cached species/reaction objects, which skips the
+# YAML parsing and is roughly 20x cheaper than ct.Solution(filename).
+# Registering a name again (or clearing the registry) bumps a generation
+# counter that get_gas checks, so every thread rebuilds its Solution.
+
+import os
+import threading
+import warnings
+
+import cantera as ct
+import numpy as np
+
+DEFAULT_MECHANISM = 'gri30.yaml'
+
+# Species handled by the thermo-only components (Mix, fan, HX_eff, MicroGt2)
+SOFC_SPECIES = ('H2', 'H2O', 'CO', 'CO2', 'CH4', 'O2', 'N2')
+
+# Legacy input formats (Cantera < 3.0) are resolved to their YAML equivalent
+_LEGACY_SUFFIXES = ('.xml', '.cti')
+
+_lock = threading.Lock()
+_definitions = {}  # (resolved file, phase) -> (species, reactions, transport)
+_resolved = {}  # requested name -> resolved file
+_registered = set()  # names registered with register_mechanism()
+_base_masks = {}  # (resolved file, base species) -> boolean species mask
+_generations = {}  # (name, phase) -> number of registrations under that name
+_epoch = 0  # number of clear_registry() calls
+_local = threading.local()
+
+
+def _find_data_file(filename):
+    """Return True if Cantera can locate `filename` in its data directories."""
+    if os.path.isfile(filename):
+        return True
+    for directory in ct.get_data_directories():
+        if os.path.isfile(os.path.join(directory, filename)):
+            return True
+    return False
+
+
+def resolve_mechanism(name=DEFAULT_MECHANISM):
+    """
+    Resolve a mechanism reference to a file Cantera 3.x can load.
+
+    'gri30.xml' / 'gri30.cti' map to 'gri30.yaml'. Files that do not exist in
+    YAML form (e.g. 'gri60.xml', 'sofc.cti') fall back to DEFAULT_MECHANISM.
+
+    Parameters:
+    name (str): Mechanism file name, as used in the legacy scripts.
+
+    Returns:
+    str: Mechanism file name to pass to Cantera.
+    """
+    if name in _resolved:
+        return _resolved[name]
+
+    root, ext = os.path.splitext(name)
+    if ext in _LEGACY_SUFFIXES:
+        candidate = root + '.yaml'
+    else:
+        candidate = name
+
+    if not _find_data_file(candidate):
+        warnings.warn(f"Mechanism '{name}' not found, using '{DEFAULT_MECHANISM}' instead.")
+        candidate = DEFAULT_MECHANISM
+
+    _resolved[name] = candidate
+    return candidate
+
+
+def _load_definition(filename, phase):
+    """Parse the mechanism once and keep its species/reaction objects."""
+    key = (filename, phase)
+    with _lock:
+        if key not in _definitions:
+            gas = ct.Solution(filename, phase)
+            _definitions[key] = (gas.species(), gas.reactions(), gas.transport_model)
+            return _definitions[key], gas
+    return _definitions[key], None
+
+
+def new_gas(name=DEFAULT_MECHANISM, phase=''):
+    """
+    Build a private Solution for the mechanism, not shared with any component.
+
+    Use this when the caller keeps its own state in the gas object
+    (e.g. scripts that set up a fuel mixture and pass it around).
+
+    Parameters:
+    name (str): Mechanism file name.
+    phase (str): Phase name inside the file ('' for the first phase).
+
+    Returns:
+    Cantera.Solution: New gas object.
+    """
+    filename = resolve_mechanism(name)
+    (species, reactions, transport), gas = _load_definition(filename, phase)
+    if gas is not None:
+        return gas
+    return ct.Solution(thermo='ideal-gas', kinetics='gas', transport_model=transport,
+                       species=species, reactions=reactions)
+
+
+def register_mechanism(name, species, reactions, transport_model='none'):
+    """
+    Register a mechanism built in memory (e.g. a skeletal mechanism) under a name.
+
+    get_gas(name) / new_gas(name) then return Solutions of it, exactly like
+    for a mechanism file. The entry lives until clear_registry(). Registering
+    a name again replaces the Solutions that get_gas() returns on all threads.
+
+    Parameters:
+    name (str): Name to register.
+    species (list): Cantera Species objects.
+    reactions (list): Cantera Reaction objects.
+    transport_model (str): Transport model of the Solutions.
+    """
+    with _lock:
+        _definitions[(name, '')] = (species, reactions, transport_model)
+        _resolved[name] = name
+        _registered.add(name)
+        _generations[(name, '')] = _generations.get((name, ''), 0) + 1
+        for key in [key for key in _base_masks if key[0] == name]:
+            del _base_masks[key]
+
+
+def is_registered(name):
+    """True if name refers to a mechanism registered with register_mechanism()."""
+    return name in _registered
+
+
+def get_gas(name=DEFAULT_MECHANISM, phase=''):
+    """
+    Return the calling thread's shared Solution for the mechanism.
+
+    The object is reused by every component on the same thread, so its state
+    is not preserved between calls; set the state before reading properties.
+
+    Parameters:
+    name (str): Mechanism file name ('gri30.xml', 'gri30.cti', ... are accepted).
+    phase (str): Phase name inside the file ('' for the first phase).
+
+    Returns:
+    Cantera.Solution: Thread-local gas object.
+    """
+    filename = resolve_mechanism(name)
+    solutions = getattr(_local, 'solutions', None)
+    if solutions is None:
+        solutions = _local.solutions = {}
+
+    # 다른 스레드에서 다시 등록된 메커니즘이면 새로 만든다
+    key = (filename, phase)
+    generation = (_epoch, _generations.get(key, 0))
+    entry = solutions.get(key)
+    if entry is None or entry[0] != generation:
+        entry = solutions[key] = (generation, new_gas(filename, phase))
+    return entry[1]
+
+
+def _species_mask(full, filename, compositions, base):
+    """Boolean mask over the full mechanism of the species needed for `compositions`."""
+    key = (filename, base)
+    if key not in _base_masks:
+        _base_masks[key] = np.isin(full.species_names, base)
+    mask = _base_masks[key].copy()
+    for comp in compositions:
+        if isinstance(comp, str):
+            names = [item.split(':')[0].strip() for item in comp.split(',')]
+            mask[[full.species_index(sp) for sp in names]] = True
+        elif isinstance(comp, dict):
+            mask[[full.species_index(sp) for sp in comp]] = True
+        else:
+            comp = np.asarray(comp)
+            if comp.ndim == 1:
+                mask |= comp != 0
+            else:
+                mask |= (comp.reshape(-1, full.n_species) != 0).any(axis=0)
+    return mask
+
+
+def species_in_use(*compositions, name=DEFAULT_MECHANISM, base=SOFC_SPECIES):
+    """
+    List the species needed to represent the given compositions.
+
+    Parameters:
+    *compositions: Full-mechanism arrays, dicts or composition strings.
+    name (str): Mechanism file name defining the full species set.
+    base (tuple): Species that are always included.
+
+    Returns:
+    tuple: Species names, in the order of the full mechanism.
+    """
+    full = get_gas(name)
+    mask = _species_mask(full, resolve_mechanism(name), compositions, base)
+    return tuple(full.species_name(k) for k in np.flatnonzero(mask))
+
+
+def get_reduced_gas(*compositions, name=DEFAULT_MECHANISM, base=SOFC_SPECIES):
+    """
+    Return a thermo-only gas (no reactions) holding only the species in use.
+
+    The species set is derived from `base` plus every species present in the
+    given compositions, so states are identical to the full mechanism while
+    each TPX/HP call is cheaper. Like get_gas(), the object is thread-local.
+
+    Parameters:
+    *compositions: Full-mechanism arrays, dicts or composition strings.
+    name (str): Mechanism file name defining the full species set.
+    base (tuple): Species that are always included.
+
+    Returns:
+    tuple: (reduced Cantera.Solution, index array of its species in the full mechanism)
+    """
+    filename = resolve_mechanism(name)
+    full = get_gas(filename)
+    mask = _species_mask(full, filename, compositions, base)
+    reduced = getattr(_local, 'reduced', None)
+    if reduced is None:
+        reduced = _local.reduced = {}
+
+    key = (filename, mask.tobytes(), _epoch, _generations.get((filename, ''), 0))
+    if key not in reduced:
+        index = np.flatnonzero(mask)
+        gas = ct.Solution(thermo='ideal-gas', species=[full.species(int(k)) for k in index])
+        reduced[key] = (gas, index)
+    return reduced[key]
+
+
+def to_reduced(x, index):
+    """Map a full-mechanism composition (array, or stack of arrays) to the reduced set."""
+    if isinstance(x, (str, dict)):
+        return x
+    return np.asarray(x, dtype=float)[..., index]
+
+
+def to_full(x_reduced, index, n_species):
+    """Map a reduced composition back to the full mechanism index space."""
+    x_reduced = np.asarray(x_reduced, dtype=float)
+    x = np.zeros(x_reduced.shape[:-1] + (n_species,))
+    x[..., index] = x_reduced
+    return x
+
+
+def clear_registry():
+    """Drop all cached mechanism definitions; every thread rebuilds its gas objects."""
+    global _epoch
+    with _lock:
+        _epoch += 1
+        _definitions.clear()
+        _resolved.clear()
+        _registered.clear()
+        _base_masks.clear()
+    _local.solutions = {}
+    _local.reduced = {}
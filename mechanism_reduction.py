@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 22 13:40:26 2026
+
+@author: 82108
+"""
+
+# Skeletal mechanism reduction by DRGEP (directed relation graph with error
+# propagation, Pepiot-Desjardins & Pitsch 2008).
+# Species importance is taken over sample states from earlier runs and over
+# the detailed constant-volume reactor runs started from them; the threshold
+# is raised as long as the skeletal reactor runs stay within the target error.
+# The result can be registered with the mechanism registry or written to YAML
+# for the cycle simulation.
+
+import warnings
+
+import cantera as ct
+import numpy as np
+
+from mechanism import new_gas, register_mechanism
+
+DEFAULT_TARGETS = ('H2', 'CO', 'CH4', 'O2', 'H2O', 'CO2')
+DEFAULT_RETAINED = ('N2', 'AR')
+
+
+def states_from_cycle(out, gas, MASS):
+    """
+    Sample states (T, P, Y) from a cycle trajectory.
+
+    Parameters:
+    out (array): Integrator output, rows = samples, columns = [theta, V, T, k, Q, Y...].
+    gas (Cantera.Solution): Gas object of the trajectory's species.
+    MASS (float): Trapped mass (kg).
+
+    Returns:
+    tuple: T (n,), P (n,), Y (n, n_species)
+    """
+    out = np.atleast_2d(out)
+    T = out[:, 2]
+    Y = np.clip(out[:, 5:5 + gas.n_species], 0.0, None)
+    Y = Y / Y.sum(axis=1, keepdims=True)
+    R = ct.gas_constant * (Y / gas.molecular_weights).sum(axis=1)
+    P = MASS / out[:, 1] * R * T
+    return T, P, Y
+
+
+def interaction_coefficients(gas):
+    """
+    DRGEP direct interaction coefficients at the current state of gas.
+
+    r[A, B] = |sum_i nu_Ai w_i delta_Bi| / max(P_A, C_A), with w the net rates
+    of progress and delta_Bi = 1 if B is a reactant or product of reaction i.
+
+    Returns:
+    array: r, shape (n_species, n_species), zero diagonal.
+    """
+    nu_r = gas.reactant_stoich_coeffs
+    nu_p = gas.product_stoich_coeffs
+    contrib = (nu_p - nu_r) * gas.net_rates_of_progress
+    delta = ((nu_r != 0) | (nu_p != 0)).astype(float)
+
+    production = np.clip(contrib, 0.0, None).sum(axis=1)
+    consumption = np.clip(-contrib, 0.0, None).sum(axis=1)
+    scale = np.maximum(production, consumption)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.abs(contrib @ delta.T) / scale[:, None]
+    r[~np.isfinite(r)] = 0.0
+    np.fill_diagonal(r, 0.0)
+    return np.minimum(r, 1.0)
+
+
+def _path_coefficients(r, source):
+    """Largest product of r along any path from source (max-product Dijkstra)."""
+    n = len(r)
+    R = np.zeros(n)
+    R[source] = 1.0
+    done = np.zeros(n, dtype=bool)
+    for _ in range(n):
+        candidates = np.where(done, -1.0, R)
+        u = int(np.argmax(candidates))
+        if candidates[u] <= 0:
+            break
+        done[u] = True
+        np.maximum(R, R[u] * r[u], out=R)
+    return R
+
+
+def drgep_importance(gas, states, targets=DEFAULT_TARGETS):
+    """
+    Overall DRGEP importance of every species over a set of sample states.
+
+    Parameters:
+    gas (Cantera.Solution): Detailed mechanism.
+    states (tuple): T (n,), P (n,), Y (n, n_species) sample states.
+    targets (tuple): Target species names.
+
+    Returns:
+    array: max over states and targets of the path coefficient R_TB, shape (n_species,).
+    """
+    target_index = [gas.species_index(sp) for sp in targets]
+
+    initial_state = gas.TPY
+    importance = np.zeros(gas.n_species)
+    for T_s, P_s, Y_s in _iter_states(states):
+        gas.TPY = T_s, P_s, Y_s
+        r = interaction_coefficients(gas)
+        for t in target_index:
+            np.maximum(importance, _path_coefficients(r, t), out=importance)
+    gas.TPY = initial_state
+    return importance
+
+
+def skeletal_definition(gas, keep):
+    """
+    Species and reactions of the skeletal mechanism on a species subset.
+
+    Reactions are kept if all their reactants and products are kept; third-body
+    efficiencies of removed species are dropped by Cantera.
+
+    Parameters:
+    gas (Cantera.Solution): Detailed mechanism.
+    keep (array): Boolean mask over the species of gas.
+
+    Returns:
+    tuple: (species list, reactions list)
+    """
+    kept = {gas.species_name(k) for k in np.flatnonzero(keep)}
+    species = [gas.species(k) for k in range(gas.n_species) if keep[k]]
+    reactions = [rxn for rxn in gas.reactions()
+                 if kept.issuperset(rxn.reactants) and kept.issuperset(rxn.products)]
+    return species, reactions
+
+
+def _iter_states(states):
+    """Iterate over (T, P, Y) rows of a states tuple; P may be a scalar."""
+    T, P, Y = states
+    T = np.atleast_1d(T)
+    return zip(T, np.broadcast_to(P, T.shape), np.atleast_2d(Y))
+
+
+def _output_times(t_end, n_times):
+    """Log-spaced reactor output times over four decades up to t_end."""
+    return np.logspace(np.log10(t_end) - 4, np.log10(t_end), n_times)
+
+
+def reactor_trajectory(gas, T, P, Y, times):
+    """
+    Constant-volume reactor run from (T, P, Y).
+
+    Returns:
+    tuple: T (n_t,), P (n_t,), Y (n_t, n_species), X (n_t, n_species) at the given times.
+    """
+    gas.TPY = T, P, Y
+    reactor = ct.IdealGasReactor(gas, clone=True)
+    net = ct.ReactorNet([reactor])
+    n_t = len(times)
+    T_out = np.empty(n_t)
+    P_out = np.empty(n_t)
+    Y_out = np.empty((n_t, gas.n_species))
+    X_out = np.empty((n_t, gas.n_species))
+    for j, t in enumerate(times):
+        net.advance(t)
+        T_out[j], P_out[j], Y_out[j] = reactor.phase.TPY
+        X_out[j] = reactor.phase.X
+    return T_out, P_out, Y_out, X_out
+
+
+def reduction_error(gas, skeletal, states, targets=DEFAULT_TARGETS, t_end=1e-3, n_times=20,
+                    reference=None):
+    """
+    Error of a skeletal mechanism against the detailed one.
+
+    Constant-volume reactors are run from every sample state to t_end. The
+    error is the largest of |dT| / T and, for each target, |dX| divided by the
+    target's largest detailed mole fraction along the run (floored at 1e-6).
+
+    Parameters:
+    reference (list, optional): Detailed reactor_trajectory results per state, if
+                                already computed with the same t_end and n_times.
+
+    Returns:
+    float: Maximum error over states and output times.
+    """
+    times = _output_times(t_end, n_times)
+    skeletal_index = np.array([gas.species_index(sp) for sp in skeletal.species_names])
+    det_targets = [gas.species_index(sp) for sp in targets]
+    skel_targets = [skeletal.species_index(sp) for sp in targets]
+
+    error = 0.0
+    for j, (T_s, P_s, Y_s) in enumerate(_iter_states(states)):
+        if reference is None:
+            T_d, _, _, X_d = reactor_trajectory(gas, T_s, P_s, Y_s, times)
+        else:
+            T_d, _, _, X_d = reference[j]
+        T_k, _, _, X_k = reactor_trajectory(skeletal, T_s, P_s, Y_s[skeletal_index], times)
+        error = max(error, np.max(np.abs(T_k - T_d) / T_d))
+        scale = np.maximum(X_d[:, det_targets].max(axis=0), 1e-6)
+        error = max(error, np.max(np.abs(X_k[:, skel_targets] - X_d[:, det_targets]) / scale))
+    return error
+
+
+def reduce_mechanism(states, name='gri30.yaml', targets=DEFAULT_TARGETS, error_tol=0.02,
+                     thresholds=None, retained=DEFAULT_RETAINED, t_end=1e-3, n_times=20,
+                     trajectory_samples=True, register_as=None, output=None):
+    """
+    Build the smallest DRGEP skeletal mechanism within error_tol.
+
+    Thresholds are tried in increasing order; the last species set whose
+    reduction_error stays within error_tol is returned.
+
+    Parameters:
+    states (tuple): T (n,), P (n,), Y (n, n_species) sample states from earlier runs
+                    (see states_from_cycle).
+    name (str): Detailed mechanism file.
+    targets (tuple): Species whose evolution must be reproduced.
+    error_tol (float): Target error (see reduction_error).
+    thresholds (array, optional): DRGEP thresholds to scan; default logspace(-4, -0.5, 15).
+    retained (tuple): Species always kept (e.g. inert bath gases).
+    t_end (float): Reactor run time for the error check (s).
+    n_times (int): Number of reactor output times compared.
+    trajectory_samples (bool): Also take the importance over the detailed reactor
+                               runs (unreacted samples carry no radical chemistry).
+    register_as (str, optional): Register the result under this name, so that
+                                 get_gas(register_as) / new_gas(register_as) return it.
+    output (str, optional): Also write the skeletal mechanism to this YAML file.
+
+    Returns:
+    dict: 'gas' (skeletal Solution), 'species' (names), 'n_reactions', 'threshold',
+          'error', 'importance' (per detailed species).
+    """
+    gas = new_gas(name)
+    if thresholds is None:
+        thresholds = np.logspace(-4, -0.5, 15)
+    times = _output_times(t_end, n_times)
+    reference = [reactor_trajectory(gas, T_s, P_s, Y_s, times) for T_s, P_s, Y_s in _iter_states(states)]
+    importance = drgep_importance(gas, states, targets)
+    if trajectory_samples:
+        for T_d, P_d, Y_d, _ in reference:
+            np.maximum(importance, drgep_importance(gas, (T_d, P_d, Y_d), targets), out=importance)
+    always = np.isin(gas.species_names, list(targets) + [sp for sp in retained
+                                                          if sp in gas.species_names])
+
+    best = None
+    tried = set()
+    for eps in np.sort(thresholds):
+        keep = always | (importance >= eps)
+        key = keep.tobytes()
+        if key in tried:
+            continue
+        tried.add(key)
+        species, reactions = skeletal_definition(gas, keep)
+        skeletal = ct.Solution(thermo='ideal-gas', kinetics='gas', transport_model=gas.transport_model,
+                               species=species, reactions=reactions)
+        error = reduction_error(gas, skeletal, states, targets, t_end, n_times, reference)
+        if error > error_tol:
+            break
+        best = {
+            'gas': skeletal,
+            'species': skeletal.species_names,
+            'n_reactions': skeletal.n_reactions,
+            'threshold': eps,
+            'error': error,
+            'importance': importance,
+        }
+
+    if best is None:
+        warnings.warn("No skeletal mechanism met the error target; keeping the detailed mechanism.")
+        best = {
+            'gas': gas,
+            'species': gas.species_names,
+            'n_reactions': gas.n_reactions,
+            'threshold': 0.0,
+            'error': 0.0,
+            'importance': importance,
+        }
+
+    skeletal = best['gas']
+    if register_as is not None:
+        register_mechanism(register_as, skeletal.species(), skeletal.reactions(),
+                           skeletal.transport_model)
+    if output is not None:
+        skeletal.write_yaml(output)
+    return best
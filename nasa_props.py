@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 18 14:05:12 2026
+
+@author: 82108
+"""
+
+# Vectorized NASA-7 property engine.
+# Evaluates ideal-gas mixture properties for whole arrays of (T, P, Y) with
+# NumPy, using the NASA polynomial coefficients of the loaded mechanism.
+# Results follow Cantera's IdealGasPhase definitions, so they agree with
+# gas.cp_mass / enthalpy_mass / int_energy_mass / entropy_mass to round-off.
+
+import numpy as np
+import cantera as ct
+
+_coeff_cache = {}  # (species names, selected indices) -> coefficient dict
+
+
+def nasa_coefficients(gas, species=None):
+    """
+    Extract the NASA-7 coefficients of a gas object.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object whose species use NASA-7 (NasaPoly2) thermo.
+    species (list, optional): Species names or indices to keep; default is all species.
+
+    Returns:
+    dict: 'T_mid' (k,), 'low' (k, 7), 'high' (k, 7), 'MW' (k,), 'P_ref',
+          'species_names' (k,) for the selected k species.
+    """
+    names = tuple(gas.species_names)
+    if species is None:
+        index = tuple(range(len(names)))
+    else:
+        index = tuple(sp if isinstance(sp, (int, np.integer)) else names.index(sp) for sp in species)
+
+    key = (names, index)
+    if key not in _coeff_cache:
+        k = len(index)
+        T_mid = np.empty(k)
+        low = np.empty((k, 7))
+        high = np.empty((k, 7))
+        for j, i in enumerate(index):
+            thermo = gas.species(int(i)).thermo
+            if not isinstance(thermo, ct.NasaPoly2):
+                raise ValueError(f"Species '{names[i]}' does not use NASA-7 polynomials.")
+            coeffs = thermo.coeffs
+            T_mid[j] = coeffs[0]
+            high[j] = coeffs[1:8]
+            low[j] = coeffs[8:15]
+
+        _coeff_cache[key] = _with_matrices({
+            'T_mid': T_mid,
+            'low': low,
+            'high': high,
+            'MW': gas.molecular_weights[list(index)],
+            'P_ref': gas.reference_pressure,
+            'species_names': [names[i] for i in index],
+        })
+    return _coeff_cache[key]
+
+
+# Polynomial coefficients rearranged so that each property is basis @ matrix.T,
+# with basis columns:
+#   cp/R:       [1, T, T^2, T^3, T^4]
+#   h/RT:       [1, T, T^2, T^3, T^4, 1/T]
+#   s/R:        [ln T, T, T^2, T^3, T^4, 1]
+#   d(cp/R)/dT: [1, T, T^2, T^3]
+_PROPERTY_MATRICES = {
+    'cp': lambda a: a[:, :5],
+    'h': lambda a: np.column_stack((a[:, 0], a[:, 1] / 2, a[:, 2] / 3, a[:, 3] / 4, a[:, 4] / 5, a[:, 5])),
+    's': lambda a: np.column_stack((a[:, 0], a[:, 1], a[:, 2] / 2, a[:, 3] / 3, a[:, 4] / 4, a[:, 6])),
+    'dcp': lambda a: np.column_stack((a[:, 1], 2 * a[:, 2], 3 * a[:, 3], 4 * a[:, 4])),
+}
+
+
+def _with_matrices(coeffs):
+    """Add the transposed property matrices for both temperature ranges."""
+    for prop, build in _PROPERTY_MATRICES.items():
+        coeffs[prop + '_low'] = np.ascontiguousarray(build(coeffs['low']).T)
+        coeffs[prop + '_high'] = np.ascontiguousarray(build(coeffs['high']).T)
+    return coeffs
+
+
+def _subset(coeffs, columns):
+    """Coefficient dict restricted to the species selected by a boolean mask."""
+    sub = {key: coeffs[key][columns] for key in ('T_mid', 'low', 'high', 'MW')}
+    sub['P_ref'] = coeffs['P_ref']
+    sub['species_names'] = [coeffs['species_names'][i] for i in np.flatnonzero(columns)]
+    return _with_matrices(sub)
+
+
+def _evaluate(coeffs, prop, basis, low):
+    """Species property (n, k) from the basis, picking the range per temperature."""
+    return np.where(low, basis @ coeffs[prop + '_low'], basis @ coeffs[prop + '_high'])
+
+
+def species_thermo(coeffs, T, props=('cp', 'h', 's')):
+    """
+    Non-dimensional species properties at temperatures T.
+
+    Parameters:
+    coeffs (dict): Output of nasa_coefficients().
+    T (array): Temperatures (K), shape (n,).
+    props (tuple): Which of 'cp' (cp/R), 'h' (h/RT), 's' (s/R at the
+                   reference pressure) and 'dcp' (d(cp/R)/dT) to return.
+
+    Returns:
+    tuple: One (n, k) array per requested property.
+    """
+    T = np.atleast_1d(np.asarray(T, dtype=float))
+    powers = np.vander(T, 5, increasing=True)  # [1, T, T^2, T^3, T^4]
+    low = T[:, None] <= coeffs['T_mid'][None, :]
+
+    result = []
+    for prop in props:
+        if prop == 'cp':
+            basis = powers
+        elif prop == 'h':
+            basis = np.column_stack((powers, 1.0 / T))
+        elif prop == 's':
+            basis = np.column_stack((np.log(T), powers[:, 1:], np.ones_like(T)))
+        elif prop == 'dcp':
+            basis = powers[:, :4]
+        else:
+            raise ValueError(f"Unknown species property '{prop}'.")
+        result.append(_evaluate(coeffs, prop, basis, low))
+    return tuple(result)
+
+
+def species_dcp_dT(coeffs, T):
+    """
+    Temperature derivative of the species cp/R, d(cp/R)/dT in 1/K, shape (n, k).
+    """
+    return species_thermo(coeffs, T, ('dcp',))[0]
+
+
+def mole_to_mass_fractions(coeffs, X):
+    """Convert mole fractions (n, k) or (k,) to mass fractions, columns ordered as coeffs."""
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    Y = X * coeffs['MW']
+    return Y / Y.sum(axis=1, keepdims=True)
+
+
+def temperature_from_enthalpy(coeffs, h, Y, T_guess=1000.0, tol=1e-10, max_iter=50):
+    """
+    Invert h(T) for fixed compositions by Newton iteration (dh/dT = cp).
+
+    Parameters:
+    coeffs (dict): Output of nasa_coefficients().
+    h (array): Target mass enthalpies (J/kg), shape (n,).
+    Y (array): Normalized mass fractions, shape (n, k).
+    T_guess (array): Starting temperatures (K).
+    tol (float): Relative temperature tolerance.
+    max_iter (int): Maximum number of Newton iterations.
+
+    Returns:
+    tuple: (T, converged) arrays of shape (n,).
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n = Y.shape[0]
+    h = np.broadcast_to(np.asarray(h, dtype=float), (n,))
+    T = np.array(np.broadcast_to(np.asarray(T_guess, dtype=float), (n,)))
+    converged = np.zeros(n, dtype=bool)
+    Y_W = Y / coeffs['MW']
+
+    for _ in range(max_iter):
+        active = ~converged
+        if not active.any():
+            break
+        Ta = T[active]
+        cp_R, h_RT = species_thermo(coeffs, Ta, ('cp', 'h'))
+        Ya = Y_W[active]
+        h_calc = ct.gas_constant * Ta * (Ya * h_RT).sum(axis=1)
+        cp = ct.gas_constant * (Ya * cp_R).sum(axis=1)
+        dT = (h[active] - h_calc) / cp
+        # Limit the step so a poor guess cannot jump to negative temperatures
+        dT = np.clip(dT, -0.5 * Ta, 2.0 * Ta)
+        T[active] = Ta + dT
+        converged[active] = np.abs(dT) <= tol * Ta
+
+    return T, converged
+
+
+def temperature_from_entropy(coeffs, s, P, Y, T_guess=1000.0, tol=1e-10, max_iter=50):
+    """
+    Invert s(T, P) for fixed compositions by Newton iteration (ds/dT = cp/T).
+
+    Parameters:
+    coeffs (dict): Output of nasa_coefficients().
+    s (array): Target mass entropies (J/kg-K), shape (n,).
+    P (array): Pressures (Pa), shape (n,) or scalar.
+    Y (array): Normalized mass fractions, shape (n, k).
+    T_guess (array): Starting temperatures (K).
+    tol (float): Relative temperature tolerance.
+    max_iter (int): Maximum number of Newton iterations.
+
+    Returns:
+    tuple: (T, converged) arrays of shape (n,).
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n = Y.shape[0]
+    s = np.broadcast_to(np.asarray(s, dtype=float), (n,))
+    P = np.broadcast_to(np.asarray(P, dtype=float), (n,))
+    T = np.array(np.broadcast_to(np.asarray(T_guess, dtype=float), (n,)))
+    converged = np.zeros(n, dtype=bool)
+
+    # Temperature-independent part of the mixture entropy
+    Y_W = Y / coeffs['MW']
+    inv_mw = Y_W.sum(axis=1)
+    X = Y_W / inv_mw[:, None]
+    xlogx = np.where(X > 0, X * np.log(np.where(X > 0, X, 1.0)), 0.0).sum(axis=1)
+    s_mix = ct.gas_constant * inv_mw * (-xlogx - np.log(P / coeffs['P_ref']))
+
+    for _ in range(max_iter):
+        active = ~converged
+        if not active.any():
+            break
+        Ta = T[active]
+        cp_R, s_R = species_thermo(coeffs, Ta, ('cp', 's'))
+        Ya = Y_W[active]
+        s_calc = ct.gas_constant * (Ya * s_R).sum(axis=1) + s_mix[active]
+        cp = ct.gas_constant * (Ya * cp_R).sum(axis=1)
+        dT = (s[active] - s_calc) * Ta / cp
+        dT = np.clip(dT, -0.5 * Ta, 2.0 * Ta)
+        T[active] = Ta + dT
+        converged[active] = np.abs(dT) <= tol * Ta
+
+    return T, converged
+
+
+def normalize_mass_fractions(Y):
+    """Clip negative mass fractions and normalize each row, as Cantera does on gas.Y = ..."""
+    Y = np.clip(np.atleast_2d(np.asarray(Y, dtype=float)), 0.0, None)
+    return Y / Y.sum(axis=1, keepdims=True)
+
+
+def mixture_properties(coeffs, T, P, Y, normalize=True):
+    """
+    Mass-specific mixture properties for arrays of states.
+
+    Parameters:
+    coeffs (dict): Output of nasa_coefficients().
+    T (array): Temperatures (K), shape (n,) or scalar.
+    P (array): Pressures (Pa), shape (n,) or scalar.
+    Y (array): Mass fractions, shape (n, k) or (k,), columns ordered as coeffs.
+    normalize (bool): Clip and normalize Y like Cantera (default True).
+
+    Returns:
+    dict: 'cp', 'cv' (J/kg-K), 'h', 'u' (J/kg), 's' (J/kg-K), 'mw' (kg/kmol), 'R' (J/kg-K),
+          each of shape (n,).
+    """
+    Y = normalize_mass_fractions(Y) if normalize else np.atleast_2d(np.asarray(Y, dtype=float))
+    n = Y.shape[0]
+    T = np.broadcast_to(np.asarray(T, dtype=float), (n,))
+    P = np.broadcast_to(np.asarray(P, dtype=float), (n,))
+
+    # Species absent from every state do not contribute; skip their polynomials
+    active = Y.any(axis=0)
+    if not active.all():
+        coeffs = _subset(coeffs, active)
+        Y = Y[:, active]
+
+    cp_R, h_RT, s_R = species_thermo(coeffs, T)
+    Y_W = Y / coeffs['MW']
+    inv_mw = Y_W.sum(axis=1)
+    mw = 1.0 / inv_mw
+    X = Y_W * mw[:, None]
+
+    R = ct.gas_constant * inv_mw
+    cp = R * (X * cp_R).sum(axis=1)
+    h = R * T * (X * h_RT).sum(axis=1)
+    xlogx = np.where(X > 0, X * np.log(np.where(X > 0, X, 1.0)), 0.0).sum(axis=1)
+    s = R * ((X * s_R).sum(axis=1) - xlogx - np.log(P / coeffs['P_ref']))
+
+    return {
+        'cp': cp,
+        'cv': cp - R,
+        'h': h,
+        'u': h - R * T,
+        's': s,
+        'mw': mw,
+        'R': R,
+    }
@@ -7,10 +7,11 @@ Created on Tue Dec 24 03:41:15 2024
 
 import matplotlib.pyplot as plt
 import numpy as np
-from cantera import IdealGasMix, one_atm
+from cantera import one_atm
+from mechanism import new_gas
 
 # SOFC 모델링을 위한 초기 설정
-gas = IdealGasMix('gri60.xml')  # SOFC 연료 특성에 맞는 xml 파일로 변경
+gas = new_gas('gri60.xml')  # SOFC 연료 특성에 맞는 xml 파일로 변경
 N = gas.n_species
 iH2 = gas.species_index('H2')
 iO2 = gas.species_index('O2')
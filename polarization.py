@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Nov  1 10:12:36 2026
+
+@author: 82108
+"""
+
+# SOFC polarization model (lumped cell, H2 electrochemistry).
+# V = E_Nernst - eta_act - eta_ohm - eta_conc with
+#   E_Nernst = dG(T)/2F + RT/2F ln(x_H2 x_O2^0.5 / x_H2O * (P/P0)^0.5)
+#   eta_act  = RT/(alpha n F) asinh(j / 2 j0) at anode and cathode (Butler-Volmer)
+#   eta_ohm  = j (L_el / sigma_YSZ(T) + R_contact)
+#   eta_conc = -RT/2F ln(1 - j/jL_an) - RT/4F ln(1 - j/jL_ca)
+# The gas composition follows from the utilization the current implies
+# (H2 equivalents H2 + CO + 4 CH4 are consumed, H2O + CO2 produced, O2 taken
+# from the air), evaluated at the mean of inlet and outlet or at the outlet.
+# All functions broadcast over arrays of current density, temperature and
+# feed, so an I-V / power curve or a map of operating points is one call.
+
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+from cantera import faraday, gas_constant, one_atm
+
+F = faraday / 1000  # C/mol
+R = gas_constant / 1000  # J/(mol K)
+
+
+class CellParams(NamedTuple):
+    """
+    Electrochemical parameters (estimates for an anode-supported planar cell).
+
+    j0_an, j0_ca: exchange current densities (A/cm^2); alpha: transfer coefficient;
+    n_e: electrons per reaction in the activation terms; L_el: electrolyte thickness (cm);
+    sigma0, E_sigma: YSZ conductivity sigma = sigma0 exp(-E_sigma/T) (S/cm, K);
+    R_contact: contact / interconnect resistance (Ohm cm^2);
+    jL_an, jL_ca: limiting current densities (A/cm^2);
+    composition: 'mean' (average of inlet and outlet) or 'outlet' gas for the Nernst term.
+    """
+    j0_an: float = 0.65
+    j0_ca: float = 0.25
+    alpha: float = 0.5
+    n_e: int = 2
+    L_el: float = 10e-4
+    sigma0: float = 334.0
+    E_sigma: float = 10300.0
+    R_contact: float = 0.05
+    jL_an: float = 3.0
+    jL_ca: float = 1.5
+    composition: str = 'mean'
+
+
+class CellFeed(NamedTuple):
+    """
+    Reactant supply per unit cell area.
+
+    x_fuel: H2-equivalent mole fraction of the anode inlet (H2 + CO + 4 CH4);
+    x_product: H2O + CO2 mole fraction of the anode inlet; x_O2: cathode inlet O2 mole fraction;
+    j_fuel: current density at 100 % fuel utilization (A/cm^2);
+    j_air: 4 F n_cathode / area (A/cm^2), so all O2 is used at j = x_O2 j_air.
+    """
+    x_fuel: float
+    x_product: float
+    x_O2: float
+    j_fuel: float
+    j_air: float
+
+
+def cell_feed(gas, x_an, m_an, x_ca, m_ca, area):
+    """
+    CellFeed from anode / cathode inlet compositions and mass flows.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object defining the species of x_an, x_ca.
+    x_an, x_ca: Anode / cathode inlet mole fractions (array or dict).
+    m_an, m_ca (float): Anode / cathode mass flow rates (kg/s).
+    area (float): Total active cell area (cm^2).
+
+    Returns:
+    CellFeed
+    """
+    gas.X = x_an
+    X = gas.X
+    x_fuel = sum(k * X[gas.species_index(sp)] for sp, k in (('H2', 1), ('CO', 1), ('CH4', 4))
+                 if sp in gas.species_names)
+    x_product = sum(X[gas.species_index(sp)] for sp in ('H2O', 'CO2') if sp in gas.species_names)
+    n_an = m_an / gas.mean_molecular_weight * 1000  # mol/s
+    gas.X = x_ca
+    x_O2 = gas.X[gas.species_index('O2')]
+    n_ca = m_ca / gas.mean_molecular_weight * 1000
+    return CellFeed(x_fuel, x_product, x_O2, 2 * F * x_fuel * n_an / area, 4 * F * n_ca / area)
+
+
+def max_current_density(feed, params=CellParams()):
+    """Largest current density the fuel, the O2 supply and mass transport allow (A/cm^2)."""
+    return np.minimum(np.minimum(feed.j_fuel, np.multiply(feed.x_O2, feed.j_air)),
+                      min(params.jL_an, params.jL_ca))
+
+
+def nernst_potential(T, x_H2, x_H2O, x_O2, P=one_atm):
+    """Nernst potential (V) of H2 + 1/2 O2 -> H2O at local mole fractions and pressure P (Pa)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ((242000 - 45.8 * T) / (2 * F)
+                + R * T / (2 * F) * (np.log(x_H2 / x_H2O) + 0.5 * np.log(x_O2 * P / one_atm)))
+
+
+def area_specific_resistance(T, params=CellParams()):
+    """Ohmic area-specific resistance (Ohm cm^2): electrolyte plus contact."""
+    return params.L_el / (params.sigma0 * np.exp(-params.E_sigma / T)) + params.R_contact
+
+
+def overpotentials(j, T, params=CellParams()):
+    """
+    Activation, ohmic and concentration losses (V) at current density j (A/cm^2).
+
+    Returns:
+    tuple: eta_act, eta_ohm, eta_conc
+    """
+    RT = R * T
+    # Activation (Butler-Volmer, asinh form)
+    a = RT / (params.alpha * params.n_e * F)
+    eta_act = a * (np.arcsinh(j / (2 * params.j0_an)) + np.arcsinh(j / (2 * params.j0_ca)))
+    # Ohmic
+    eta_ohm = j * area_specific_resistance(T, params)
+    # Concentration
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eta_conc = -RT / (2 * F) * np.log(1 - j / params.jL_an) - RT / (4 * F) * np.log(1 - j / params.jL_ca)
+    return eta_act, eta_ohm, eta_conc
+
+
+def _voltage(j, T, P, feed, params):
+    """Cell voltage, its slope dV/dj and the loss terms at current density j."""
+    RT = R * T
+    c = 0.5 if params.composition == 'mean' else 1.0
+
+    # Nernst: 소비된 연료 / 산소에 따른 조성
+    u = j / feed.j_fuel
+    x_H2 = feed.x_fuel * (1 - c * u)
+    x_H2O = feed.x_product + c * feed.x_fuel * u
+    b = j / feed.j_air
+    x_O2 = feed.x_O2 + c * ((feed.x_O2 - b) / (1 - b) - feed.x_O2)
+    E = nernst_potential(T, x_H2, x_H2O, x_O2, P)
+    eta_act, eta_ohm, eta_conc = overpotentials(j, T, params)
+
+    # dV/dj
+    a = RT / (params.alpha * params.n_e * F)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dE = RT / (2 * F) * (-c * feed.x_fuel / (x_H2 * feed.j_fuel)
+                             - c * feed.x_fuel / (x_H2O * feed.j_fuel)
+                             + 0.5 * c * (feed.x_O2 - 1) / ((1 - b) ** 2 * feed.j_air * x_O2))
+        d_conc = RT / (2 * F) / (params.jL_an - j) + RT / (4 * F) / (params.jL_ca - j)
+    d_act = a * (1 / np.sqrt(4 * params.j0_an ** 2 + j ** 2) + 1 / np.sqrt(4 * params.j0_ca ** 2 + j ** 2))
+
+    V = E - eta_act - eta_ohm - eta_conc
+    dV = dE - d_act - area_specific_resistance(T, params) - d_conc
+    return V, dV, {'E': E, 'eta_act': eta_act, 'eta_ohm': eta_ohm, 'eta_conc': eta_conc, 'util': u}
+
+
+def cell_voltage(j, T, feed, params=CellParams(), P=one_atm, full_output=False):
+    """
+    Cell voltage at given current densities (closed form).
+
+    Parameters:
+    j (float or array): Current density (A/cm^2).
+    T (float or array): Cell temperature (K).
+    feed (CellFeed): Reactant supply (fields may be arrays).
+    params (CellParams): Electrochemical parameters.
+    P (float or array): Cell pressure (Pa).
+    full_output (bool): Also return a dict with 'E', the losses 'eta_act',
+                        'eta_ohm', 'eta_conc', 'util', 'power_density' (W/cm^2)
+                        and 'dV_dj'.
+
+    Returns:
+    V (float or array) (, info)
+    """
+    j = np.asarray(j, dtype=float)
+    V, dV, info = _voltage(j, T, P, feed, params)
+    if full_output:
+        info.update(power_density=V * j, dV_dj=dV)
+        return V, info
+    return V
+
+
+def solve_current(V, T, feed, params=CellParams(), P=one_atm, tol=1e-10, max_iter=50,
+                  full_output=False):
+    """
+    Current density at given cell voltages by safeguarded Newton iteration.
+
+    V(j) decreases monotonically on [0, j_max); each point keeps a bracket
+    and Newton steps that leave it are replaced by bisection. dV/dj is
+    analytic.
+
+    Parameters:
+    V (float or array): Cell voltage (V).
+    T, feed, params, P: As cell_voltage (broadcast against V).
+    tol (float): Absolute tolerance on j (A/cm^2).
+    max_iter (int): Maximum number of iterations.
+    full_output (bool): Also return a dict with 'converged' and 'iterations'
+                        (points with V above the open-circuit voltage or
+                        below V(j_max) are not converged and return 0 or j_max).
+
+    Returns:
+    j (float or array) (, info)
+    """
+    shape = np.broadcast_shapes(np.shape(V), np.shape(T), np.shape(P), *(np.shape(x) for x in feed))
+    V_t = np.broadcast_to(np.asarray(V, dtype=float), shape).ravel()
+    T = np.broadcast_to(np.asarray(T, dtype=float), shape).ravel()
+    P = np.broadcast_to(np.asarray(P, dtype=float), shape).ravel()
+    feed = CellFeed(*(np.broadcast_to(np.asarray(x, dtype=float), shape).ravel() for x in feed))
+
+    lo = np.zeros(V_t.shape)
+    hi = max_current_density(feed, params) * (1 - 1e-12)
+    V0, dV0, _ = _voltage(lo, T, P, feed, params)
+    V_hi, _, _ = _voltage(hi, T, P, feed, params)
+    converged = np.zeros(V_t.shape, dtype=bool)
+    iterations = np.zeros(V_t.shape, dtype=int)
+    j = np.clip((V0 - V_t) / -dV0, lo, 0.5 * hi)
+
+    # Targets outside [V(j_max), OCV]
+    above = V_t >= V0
+    below = V_t <= V_hi
+    j[above] = 0.0
+    j[below] = hi[below]
+    active = ~(above | below)
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        i = np.flatnonzero(active)
+        fi = CellFeed(*(x[i] for x in feed))
+        Vi, dVi, _ = _voltage(j[i], T[i], P[i], fi, params)
+        g = Vi - V_t[i]
+        # V 가 목표보다 높으면 전류를 늘려야 함
+        lo[i] = np.where(g > 0, j[i], lo[i])
+        hi[i] = np.where(g > 0, hi[i], j[i])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            j_new = j[i] - g / dVi
+        bad = ~np.isfinite(j_new) | (j_new <= lo[i]) | (j_new >= hi[i])
+        j_new = np.where(bad, 0.5 * (lo[i] + hi[i]), j_new)
+        done = np.abs(j_new - j[i]) <= tol
+        j[i] = j_new
+        iterations[i] += 1
+        converged[i] = done
+        active[i] = ~done
+
+    if not converged[~(above | below)].all():
+        warnings.warn(f"solve_current did not converge in {max_iter} iterations.")
+
+    j = j.reshape(shape)
+    if full_output:
+        return j, {'converged': converged.reshape(shape), 'iterations': iterations.reshape(shape)}
+    return j
+
+
+def operating_point(T, feed, params=CellParams(), P=one_atm, area=None, util=None, j=None, V=None):
+    """
+    Cell operating point at a given fuel utilization, current density or voltage.
+
+    Exactly one of util, j and V is given; at given utilization or current the
+    voltage is closed form, at given voltage the current follows from solve_current.
+
+    Parameters:
+    T, feed, params, P: As cell_voltage.
+    area (float, optional): Total active area (cm^2) for the current 'I' (A) and power 'W' (W).
+    util, j, V (float or array): Operating condition.
+
+    Returns:
+    dict: 'V', 'j', 'util', 'power_density' (W/cm^2), 'E', 'eta_act', 'eta_ohm',
+          'eta_conc' (, 'I', 'W' = V I with area).
+    """
+    if sum(x is not None for x in (util, j, V)) != 1:
+        raise ValueError("Give exactly one of util, j and V.")
+    if util is not None:
+        j = np.asarray(util, dtype=float) * feed.j_fuel
+    elif V is not None:
+        j = solve_current(V, T, feed, params, P)
+    if np.any(np.asarray(j) >= max_current_density(feed, params)):
+        warnings.warn("Current density at or beyond the fuel, O2 or limiting current; V is nan there.")
+    V, info = cell_voltage(j, T, feed, params, P, full_output=True)
+    result = {'V': V, 'j': np.asarray(j, dtype=float)}
+    result.update(info)
+    del result['dV_dj']
+    if area is not None:
+        result['I'] = result['j'] * area
+        result['W'] = V * result['I']
+    return result
+
+
+def polarization_curve(T, feed, params=CellParams(), P=one_atm, n_points=100, j=None):
+    """
+    I-V and power curve from open circuit up to the largest feasible current density.
+
+    Parameters:
+    T, feed, params, P: As cell_voltage (scalars).
+    n_points (int): Points of the default current density grid.
+    j (array, optional): Current densities to evaluate instead (A/cm^2).
+
+    Returns:
+    dict: Arrays 'j', 'V', 'power_density', 'util', 'E', 'eta_act', 'eta_ohm', 'eta_conc'.
+    """
+    if j is None:
+        j = np.linspace(0.0, float(max_current_density(feed, params)), n_points + 1)[:-1]
+    return operating_point(T, feed, params, P, j=j)
+
+
+# Example usage
+if __name__ == "__main__":
+    feed = CellFeed(x_fuel=0.97, x_product=0.03, x_O2=0.21, j_fuel=1.2, j_air=20.0)
+    curve = polarization_curve(1073.15, feed)
+    k = np.argmax(curve['power_density'])
+    print(f"OCV {curve['V'][0]:.3f} V, peak {curve['power_density'][k]:.3f} W/cm^2 "
+          f"at {curve['j'][k]:.3f} A/cm^2, {curve['V'][k]:.3f} V")
+    print("j at 0.7 V:", solve_current(0.7, 1073.15, feed))
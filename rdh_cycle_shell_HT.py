@@ -1,11 +1,24 @@
+import time
+import warnings
+
 import numpy as np
-from scipy.integrate import solve_ivp
+from scipy import integrate
+from scipy.optimize import brentq
 import cantera as ct
+from mechanism import new_gas
+from rdh_system_HT import SofcSystem, FrozenSystem
+from init_cyl_state import init_cyl_state
+from checkpoint import run_hash, save_checkpoint, load_checkpoint, remove_checkpoint
 
 # Global variables
 bore = 0.1  # Bore size (m)
 stroke = 0.15  # Stroke length (m)
 
+# Reaction mechanism of the cycle: a file name, or a skeletal mechanism written by
+# mechanism_reduction.reduce_mechanism(..., output='sofc_skeletal.yaml') or registered
+# in this process with register_as='sofc_skeletal'
+mechanism = "gri30.yaml"
+
 # Function to calculate initial volume
 def calculate_initial_volume(theta, rv):
     """
@@ -27,35 +40,646 @@ def rdh_system(t, y, gas):
     dT = 0.0  # Placeholder for temperature change (implement based on heat transfer)
     return [dtheta, dV, dT] + [0] * (len(y) - 3)
 
+def _integrate_segment(fun, t0, t_end, y0, method, t_eval, rtol, atol, jac, event, emit,
+                       emit_start, on_step=None, on_interval=None):
+    """
+    Step a scipy.integrate solver from t0 to t_end and hand every output sample to emit.
+
+    Samples are the t_eval points in each step (from the step's dense output)
+    or the solver steps themselves. event is a solve_ivp-style terminal event
+    (with .direction); the segment stops at its first zero crossing.
+    on_interval(t_old, t_stop, sol) receives the dense output of every step and
+    on_step(t, y, nfev) is called after every completed step. The solver always
+    chooses its own first step.
+
+    Returns:
+    tuple: status (0 finished, 1 event, -1 failed), t_stop, y_stop, nfev, message
+    """
+    kw = {'jac': jac} if jac is not None else {}
+    solver = getattr(integrate, method)(fun, t0, y0, t_end, rtol=rtol, atol=atol, **kw)
+    if emit_start:
+        if t_eval is None:
+            emit(np.array([t0]), y0[None, :])
+        elif len(t_eval) and t_eval[0] == t0:
+            emit(t_eval[:1], y0[None, :])
+    g_old = event(t0, y0) if event is not None else None
+
+    while solver.status == 'running':
+        t_old = solver.t
+        message = solver.step()
+        if solver.status == 'failed':
+            return -1, solver.t, solver.y, solver.nfev, message
+        t_new = solver.t
+        t_stop, status = t_new, 0
+        sol = None
+
+        if event is not None:
+            g_new = event(t_new, solver.y)
+            crossed = (g_old <= 0 <= g_new) if event.direction > 0 else (g_old >= 0 >= g_new)
+            if crossed and g_old != g_new:
+                sol = solver.dense_output()
+                t_stop = brentq(lambda t: event(t, sol(t)), t_old, t_new, xtol=4 * np.finfo(float).eps)
+                status = 1
+            g_old = g_new
+        if sol is None and (t_eval is not None or on_interval is not None):
+            sol = solver.dense_output()
+
+        if t_eval is None:
+            if status == 1:
+                emit(np.array([t_stop]), sol(t_stop)[None, :])
+            else:
+                emit(np.array([t_new]), solver.y[None, :])
+        else:
+            lo, hi = np.searchsorted(t_eval, (t_old, t_stop), side='right')
+            if hi > lo:
+                emit(t_eval[lo:hi], sol(t_eval[lo:hi]).T)
+        if on_interval is not None:
+            on_interval(t_old, t_stop, sol)
+
+        if status == 1:
+            return 1, t_stop, sol(t_stop), solver.nfev, 'A termination event occurred.'
+        if on_step is not None:
+            on_step(solver.t, solver.y, solver.nfev)
+    return 0, solver.t, solver.y, solver.nfev, 'The solver successfully reached the end of the integration interval.'
+
+
+def run_cycle(params, gas, X0, t_span, t_eval=None, mode='auto', wdot_tol=1.0, hysteresis=10.0,
+              method='BDF', rtol=1e-6, atol=1e-10, use_jac=True, max_switches=50, writer=None,
+              store=True, checkpoint=None, checkpoint_interval=60.0, metrics=None, full_output=False):
+    """
+    Integrate the cylinder ODE with an optional frozen-composition fast path.
+
+    Frozen segments integrate only [theta, V, T, k, Q] at fixed Y (FrozenSystem);
+    reacting segments integrate the full state (SofcSystem). In 'auto' mode a
+    segment starts frozen when the inverse chemical time scale
+    max |dY/dt| / max(Y, 1e-6) (SofcSystem.composition_rate) is below wdot_tol,
+    switches to reacting when it rises above wdot_tol and back to frozen when
+    it falls below wdot_tol / hysteresis (terminal events).
+
+    The solver is stepped directly, so output samples are streamed to writer
+    as the integration advances instead of after it.
+
+    With checkpoint set, the integrator state (t, state vector, mode,
+    segments, written rows) is saved there at most every
+    checkpoint_interval seconds of wall time, together with a hash of the
+    run inputs. A later call with the same inputs resumes from it: the
+    writer (opened with resume=True) is cut back to the checkpointed rows
+    and the returned t, out hold only the samples after the restart, so
+    use a writer for the full trajectory. If the writer holds fewer rows
+    than the checkpoint (missing or shortened file, or not opened with
+    resume=True), the run starts over from t_span[0] with a warning. The
+    checkpoint is deleted when the run completes. A resumed solver starts
+    afresh at order one and picks its own first step (the last adaptive
+    step of a stiff phase such as ignition is far too large for a first
+    order start), so results agree to the integration tolerance.
+
+    Parameters:
+    params (SystemParams): Cylinder parameters.
+    gas (Cantera.Solution): Gas object (detailed or skeletal mechanism).
+    X0 (array): Initial state [theta, V, T, k, Q, Y...].
+    t_span (tuple): Integration interval (s).
+    t_eval (array, optional): Output times; default is the solver steps.
+    mode (str): 'auto', 'frozen' or 'reacting'.
+    wdot_tol (float): Threshold on the inverse chemical time scale (1/s).
+    hysteresis (float): Ratio between the switch-on and switch-off thresholds.
+    method (str): scipy.integrate solver ('BDF', 'Radau', 'LSODA', 'RK45', ...).
+    rtol, atol (float): Integration tolerances.
+    use_jac (bool): Pass the analytic Jacobian in reacting segments.
+    max_switches (int): Maximum number of mode switches in 'auto'.
+    writer (TrajectoryWriter, optional): Receives every output sample.
+    store (bool): Keep the samples in memory and return them; with store=False
+                  (and a writer) t and out are returned empty.
+    checkpoint (str, optional): Checkpoint file for restarts.
+    checkpoint_interval (float): Minimum wall time between checkpoints (s).
+    metrics (CycleMetrics, optional): Running metrics, updated from the dense
+                                      output of every step (CycleMetrics.update_interval);
+                                      with store=False nothing else is kept.
+    full_output (bool): Also return a dict with the segments and solver counts.
+
+    Returns:
+    tuple: t (n,), out (n, 5 + NSP) with rows = samples, columns = [theta, V, T, k, Q, Y...]
+           (, info)
+    """
+    if mode not in ('auto', 'frozen', 'reacting'):
+        raise ValueError(f"Unknown mode '{mode}'.")
+    NSP = gas.n_species
+    reacting = SofcSystem(params, gas, jac_format='dense' if method == 'LSODA' else 'csc')
+    x = np.array(X0, dtype=float)
+    t0, t_end = t_span
+    if t_eval is not None:
+        t_eval = np.asarray(t_eval, dtype=float)
+        t_eval = t_eval[(t_eval >= t0) & (t_eval <= t_end)]
+
+    def to_reacting(t, y):
+        return reacting.composition_rate(np.concatenate((y, frozen_Y))) - wdot_tol
+    to_reacting.direction = 1
+
+    def to_frozen(t, y):
+        return reacting.composition_rate(y) - wdot_tol / hysteresis
+    to_frozen.direction = -1
+
+    if mode == 'auto':
+        is_reacting = reacting.composition_rate(x) >= wdot_tol
+    else:
+        is_reacting = mode == 'reacting'
+
+    segments = []
+    nfev = 0
+    seg_start = t0
+    state = None
+    if checkpoint is not None:
+        key = run_hash(params, tuple(gas.species_names), gas.n_reactions, x, t_span, t_eval, mode,
+                       wdot_tol, hysteresis, method, rtol, atol, use_jac, max_switches)
+        state = load_checkpoint(checkpoint, key)
+    if state is not None and writer is not None:
+        writer.flush()
+        if writer.n_rows < int(state['rows']):
+            # 궤적 파일이 체크포인트보다 짧으면 이어 쓸 수 없음: 처음부터 다시 계산
+            warnings.warn(f"{writer.path} has {writer.n_rows} rows, the checkpoint {int(state['rows'])}; "
+                          f"restarting the cycle from t = {t0}.")
+            writer.truncate(0)
+            state = None
+    if state is not None:
+        # 체크포인트에서 재시작
+        t0 = float(state['t'])
+        x = state['y']
+        is_reacting = bool(state['reacting'])
+        seg_start = float(state['segment_start'])
+        nfev = int(state['nfev'])
+        segments = [(float(a), float(b), 'reacting' if r else 'frozen')
+                    for (a, b), r in zip(state['segment_bounds'], state['segment_reacting'])]
+        if writer is not None:
+            writer.truncate(int(state['rows']))
+        if metrics is not None:
+            metrics.load_state(state['metrics'])
+    elif metrics is not None:
+        metrics.reset()
+        metrics.update([t0], x[None, :])
+    last_save = time.perf_counter()
+
+    def on_step(t, y, n):
+        nonlocal last_save
+        if time.perf_counter() - last_save < checkpoint_interval:
+            return
+        if writer is not None:
+            writer.flush()
+        save_checkpoint(checkpoint, hash=key, t=t,
+                        y=y if is_reacting else np.concatenate((y, frozen_Y)),
+                        reacting=is_reacting, segment_start=seg_start,
+                        segment_bounds=np.array([seg[:2] for seg in segments]).reshape(-1, 2),
+                        segment_reacting=np.array([seg[2] == 'reacting' for seg in segments], dtype=bool),
+                        nfev=nfev + n, rows=writer.n_rows if writer is not None else 0,
+                        metrics=metrics.state() if metrics is not None else np.empty(0))
+        last_save = time.perf_counter()
+
+    t_parts = []
+    out_parts = []
+
+    def emit(t_rows, y_rows):
+        if not is_reacting:
+            y_rows = np.hstack((y_rows, np.broadcast_to(frozen_Y, (len(y_rows), NSP))))
+        if writer is not None:
+            writer.extend(t_rows, y_rows)
+        if store:
+            t_parts.append(t_rows)
+            out_parts.append(y_rows)
+
+    def track(t_a, t_b, sol):
+        if is_reacting:
+            metrics.update_interval(t_a, t_b, lambda t: sol(t).T)
+        else:
+            metrics.update_interval(t_a, t_b, lambda t: np.hstack(
+                (sol(t).T, np.broadcast_to(frozen_Y, (len(t), NSP)))))
+
+    hooks = {'on_step': on_step if checkpoint is not None else None,
+             'on_interval': track if metrics is not None else None}
+    emit_start = state is None
+    while True:
+        event = None
+        if is_reacting:
+            jac = reacting.jac if use_jac and method in ('BDF', 'Radau', 'LSODA') else None
+            if mode == 'auto' and len(segments) < max_switches:
+                event = to_frozen
+            status, t_stop, y_stop, n, message = _integrate_segment(
+                reacting, t0, t_end, x, method, t_eval, rtol, atol, jac, event, emit, emit_start,
+                **hooks)
+        else:
+            frozen_Y = x[5:5 + NSP]
+            frozen = FrozenSystem(params, gas, frozen_Y)
+            if mode == 'auto' and len(segments) < max_switches:
+                event = to_reacting
+            status, t_stop, y_stop, n, message = _integrate_segment(
+                frozen, t0, t_end, x[:5], method, t_eval, rtol, atol, None, event, emit, emit_start,
+                **hooks)
+        if status == -1:
+            raise RuntimeError(f"Cycle integration failed at t = {t_stop}: {message}")
+        nfev += n
+        segments.append((seg_start, t_stop, 'reacting' if is_reacting else 'frozen'))
+        emit_start = False
+
+        if status != 1 or t_stop >= t_end:
+            break
+        # 모드 전환: 이벤트 시점의 상태에서 다시 시작
+        x = y_stop if is_reacting else np.concatenate((y_stop, frozen_Y))
+        t0 = seg_start = t_stop
+        is_reacting = not is_reacting
+
+    if checkpoint is not None:
+        remove_checkpoint(checkpoint)
+
+    if t_parts:
+        t = np.concatenate(t_parts)
+        out = np.vstack(out_parts)
+    else:
+        t = np.empty(0)
+        out = np.empty((0, 5 + NSP))
+    if full_output:
+        info = {'segments': segments, 'nfev': nfev}
+        if metrics is not None:
+            info['metrics'] = metrics.result()
+        return t, out, info
+    return t, out
+
+
+def _peak_values(out, gas, MASS):
+    """Peak pressure (Pa) and temperature (K) of a cycle output."""
+    Rc = ct.gas_constant * (out[:, 5:5 + gas.n_species] / gas.molecular_weights).sum(axis=1)
+    return (MASS * Rc * out[:, 2] / out[:, 1]).max(), out[:, 2].max()
+
+
+def _cycle_from_exhaust(params, gas, phi, rmf, rv, T_int, V0, t_span, theta0, k0, P_int,
+                        T_exh, y_exh, cycle_kw, major_products=False):
+    """
+    One cycle started from init_cyl_state with the given exhaust residual.
+
+    Returns:
+    tuple: t, out, params (with the trapped MASS of this cycle), T_init
+
+    Raises:
+    ValueError: The initial temperature is not bracketed (see init_cyl_state).
+    """
+    y_init, T_init, _, _ = init_cyl_state(gas, phi, rmf, rv, T_int, T_exh, T_exh, y_exh,
+                                          major_products=major_products, verbose=False)
+    gas.TPY = T_init, P_int, y_init
+    params = params._replace(MASS=gas.density * V0)
+    X0 = np.concatenate(([theta0, V0, gas.T, k0, 0.0], gas.Y))
+    t, out = run_cycle(params, gas, X0, t_span, **cycle_kw)
+    return t, out, params, T_init
+
+
+def _exhaust_vector(out, NSP, T_scale):
+    """Fixed-point vector [T_exh / T_scale, Y_exh] at the end of a cycle."""
+    return np.concatenate(([out[-1, 2] / T_scale], np.clip(out[-1, 5:5 + NSP], 0.0, None)))
+
+
+def _exhaust_state(z, T_scale, T_int):
+    """T_exh, y_exh for init_cyl_state from a (possibly extrapolated) fixed-point vector."""
+    T_exh = max(z[0] * T_scale, T_int)
+    y_exh = np.clip(z[1:], 0.0, None)
+    y_exh /= y_exh.sum()
+    return T_exh, y_exh
+
+
+def _anderson_step(z_hist, g_hist, depth):
+    """
+    Anderson-accelerated next iterate of the fixed point z = G(z).
+
+    z_hist, g_hist hold the last iterates and their images; with one
+    difference (depth 1) this is the vector form of Aitken's extrapolation.
+    """
+    if len(z_hist) < 2 or depth == 0:
+        return g_hist[-1]
+    F = [g - z for z, g in zip(z_hist, g_hist)]
+    dF = np.column_stack([F[i + 1] - F[i] for i in range(len(F) - 1)][-depth:])
+    dG = np.column_stack([g_hist[i + 1] - g_hist[i] for i in range(len(g_hist) - 1)][-depth:])
+    gamma = np.linalg.lstsq(dF, F[-1], rcond=None)[0]
+    return g_hist[-1] - dG @ gamma
+
+
+def run_cycles(params, gas, phi, rmf, rv, T_int, V0, t_span, theta0=-np.pi, k0=1.0,
+               P_int=ct.one_atm, T_exh=800.0, y_exh=(0,), max_cycles=20, p_tol=1e-3, T_tol=1.0,
+               accelerate='anderson', depth=3, T_scale=1000.0, verbose=True, **cycle_kw):
+    """
+    Chain cycles until the cycle-to-cycle change of peak pressure and temperature is small.
+
+    Every cycle starts from init_cyl_state with the previous cycle's exhaust
+    (end-of-cycle T and Y, also used as the clearance gas); the trapped mass is
+    set by P_int at V0 and the mixed initial temperature. The exhaust state
+    z = [T_exh / T_scale, Y_exh] is a fixed point of the cycle map, which is
+    extrapolated by Anderson acceleration so that periodic steady state is
+    reached in a few cycles instead of by plain substitution. If a cycle
+    cannot be run from an extrapolated state, it is rerun from the plain
+    substitution and the acceleration restarts from there.
+
+    Parameters:
+    params (SystemParams): Cylinder parameters; MASS is replaced each cycle.
+    gas (Cantera.Solution): Gas object.
+    phi, rmf, rv, T_int: See init_cyl_state.
+    V0 (float): Cylinder volume at theta0 (m^3).
+    t_span (tuple): Time interval of one cycle (s).
+    theta0 (float): Crank angle at the start of the cycle (rad).
+    k0 (float): Initial turbulent kinetic energy (m^2/s^2).
+    P_int (float): Cylinder pressure at theta0 (Pa).
+    T_exh (float): Exhaust temperature guess for the first cycle (K).
+    y_exh (array): Exhaust mass fractions for the first cycle; any other size than
+                   n_species (e.g. the default (0,)) assumes major products.
+    max_cycles (int): Maximum number of cycles.
+    p_tol (float): Relative tolerance on the change of peak pressure.
+    T_tol (float): Absolute tolerance on the change of peak temperature (K).
+    accelerate (str): 'anderson' or None (plain substitution).
+    depth (int): Number of previous differences used by Anderson (1 = vector Aitken).
+    T_scale (float): Temperature scale of the fixed-point vector (K).
+    verbose (bool): Print one line per cycle.
+    **cycle_kw: Options passed on to run_cycle (t_eval, mode, method, rtol, ...).
+
+    Returns:
+    dict: 't', 'out' of the last cycle, 'params' of the last cycle, 'converged',
+          'cycles', 'T_exh', 'y_exh', 'history' (per cycle: 'T_init', 'MASS',
+          'P_max', 'T_max', 'T_exh') and 'error'. If a cycle cannot be run (its
+          initial state cannot be solved, or Cantera fails on the state), the
+          chain stops with converged False and the message in 'error'; 't',
+          'out' and the exhaust are those of the last completed cycle (None if
+          there is none).
+    """
+    if accelerate not in ('anderson', None):
+        raise ValueError(f"Unknown accelerate '{accelerate}'.")
+    NSP = gas.n_species
+    z_hist = []
+    g_hist = []
+    history = []
+    converged = False
+    error = None
+    t = out = None
+    y_exh = np.asarray(y_exh, dtype=float)
+    major_products = y_exh.size != NSP
+    extrapolated = False
+
+    for cycle in range(1, max_cycles + 1):
+        try:
+            try:
+                t, out, params, T_init = _cycle_from_exhaust(params, gas, phi, rmf, rv, T_int, V0,
+                                                             t_span, theta0, k0, P_int, T_exh,
+                                                             y_exh, cycle_kw, major_products)
+            except (ValueError, ct.CanteraError) as err:
+                if not extrapolated:
+                    raise
+                # 외삽된 상태에서 실패: 외삽 없이 (단순 대입) 다시 계산하고 가속을 재시작
+                warnings.warn(f"Cycle {cycle}: {type(err).__name__} from the Anderson-extrapolated "
+                              f"exhaust state; retrying with plain substitution.")
+                del z_hist[:], g_hist[:]
+                T_exh, y_exh = _exhaust_state(g, T_scale, T_int)
+                t, out, params, T_init = _cycle_from_exhaust(params, gas, phi, rmf, rv, T_int, V0,
+                                                             t_span, theta0, k0, P_int, T_exh,
+                                                             y_exh, cycle_kw, major_products)
+        except (ValueError, ct.CanteraError) as err:
+            # 사이클을 계산할 수 없으면 잘못된 상태에서 반복하지 않고 중단
+            error = f"Cycle {cycle}: {err}"
+            warnings.warn(error)
+            break
+
+        P_max, T_max = _peak_values(out, gas, params.MASS)
+        history.append({'T_init': T_init, 'MASS': params.MASS, 'P_max': P_max,
+                        'T_max': T_max, 'T_exh': out[-1, 2]})
+        if verbose:
+            print(f"Cycle {cycle}: T_init = {T_init:.2f} K, P_max = {P_max:.6g} Pa, T_max = {T_max:.2f} K")
+        if cycle > 1:
+            prev = history[-2]
+            if abs(P_max - prev['P_max']) <= p_tol * P_max and abs(T_max - prev['T_max']) <= T_tol:
+                converged = True
+                break
+
+        # 다음 사이클의 잔류가스 상태 (고정점 반복)
+        g = _exhaust_vector(out, NSP, T_scale)
+        if not major_products:
+            z_hist.append(np.concatenate(([T_exh / T_scale], y_exh)))
+            g_hist.append(g)
+            del z_hist[:-(depth + 1)], g_hist[:-(depth + 1)]
+            z = _anderson_step(z_hist, g_hist, depth if accelerate == 'anderson' else 0)
+        else:
+            z = g  # the major-products guess is not a point of the iteration
+            major_products = False
+        extrapolated = z is not g
+        T_exh, y_exh = _exhaust_state(z, T_scale, T_int)
+
+    return {
+        't': t,
+        'out': out,
+        'params': params,
+        'converged': converged,
+        'cycles': cycle,
+        'T_exh': None if out is None else out[-1, 2],
+        'y_exh': None if out is None else out[-1, 5:5 + NSP],
+        'history': history,
+        'error': error,
+    }
+
+
+def shoot_cycle(params, gas, phi, rmf, rv, T_int, V0, t_span, theta0=-np.pi, k0=1.0,
+                P_int=ct.one_atm, T_exh=800.0, y_exh=(0,), jacobian='broyden', tol=1e-4,
+                max_iter=10, fd_step=1e-4, Y_active=1e-4, T_scale=1000.0, max_step=0.2,
+                max_backtrack=4, verbose=True, **cycle_kw):
+    """
+    Periodic steady state by Newton shooting on the cycle map.
+
+    The cycle map G takes the exhaust residual z = [T_exh / T_scale, Y_exh]
+    through init_cyl_state and one cycle to the next exhaust state; the
+    periodic solution solves F(z) = G(z) - z = 0. The closed-cycle state
+    [theta, V, T, k, Q, Y] itself cannot map onto itself without gas
+    exchange, so the residual state is the shooting variable.
+
+    jacobian='broyden' starts from dF/dz = -I (the first step is one plain
+    substitution) and improves it by good-Broyden rank-one updates, so each
+    iteration costs a single cycle integration. jacobian='fd' builds dF/dz
+    by forward differences in T and the species above Y_active (the others
+    keep -I): one integration per active component, but quadratic
+    convergence; practical with skeletal mechanisms. The differences must
+    sit above the integration noise, so 'fd' defaults the cycle rtol / atol
+    to 1e-9 / 1e-13.
+
+    Newton steps are limited to max |dz| <= max_step; a step whose cycle
+    cannot be evaluated (unsolvable initial state, or a Cantera error from an
+    unphysical state) is halved up to max_backtrack times.
+
+    Parameters:
+    params, gas, phi, rmf, rv, T_int, V0, t_span, theta0, k0, P_int, T_exh, y_exh:
+        See run_cycles.
+    jacobian (str): 'broyden' or 'fd'.
+    tol (float): Tolerance on max |F(z)| (T scaled by T_scale, Y absolute).
+    max_iter (int): Maximum number of Newton iterations.
+    fd_step (float): Forward-difference step in z for 'fd'.
+    Y_active (float): Species with Y_exh above this are differenced for 'fd'.
+    T_scale (float): Temperature scale of the shooting vector (K).
+    max_step (float): Largest component of a Newton step in z.
+    max_backtrack (int): Number of step halvings after a failed cycle evaluation.
+    verbose (bool): Print one line per iteration.
+    **cycle_kw: Options passed on to run_cycle.
+
+    Returns:
+    dict: 't', 'out', 'params' of the periodic cycle, 'converged', 'iterations',
+          'integrations' (cycle integrations used), 'residual', 'T_exh', 'y_exh' and
+          'error' (see run_cycles; None if every cycle could be evaluated).
+    """
+    if jacobian not in ('broyden', 'fd'):
+        raise ValueError(f"Unknown jacobian '{jacobian}'.")
+    if jacobian == 'fd':
+        cycle_kw.setdefault('rtol', 1e-9)
+        cycle_kw.setdefault('atol', 1e-13)
+    NSP = gas.n_species
+    integrations = 0
+
+    def cycle_map(z):
+        nonlocal integrations
+        T_e, y_e = _exhaust_state(z, T_scale, T_int)
+        integrations += 1
+        result = _cycle_from_exhaust(params, gas, phi, rmf, rv, T_int, V0, t_span,
+                                     theta0, k0, P_int, T_e, y_e, cycle_kw)
+        return _exhaust_vector(result[1], NSP, T_scale), result
+
+    def newton_step(z, dz):
+        """Limited step z + dz and its image, halving dz while the cycle fails."""
+        dz = dz * min(1.0, max_step / np.abs(dz).max())
+        for attempt in range(max_backtrack + 1):
+            T_new, y_new = _exhaust_state(z + dz, T_scale, T_int)
+            z_new = np.concatenate(([T_new / T_scale], y_new))
+            try:
+                return (z_new,) + cycle_map(z_new)
+            except (ValueError, ct.CanteraError) as err:
+                if attempt == max_backtrack:
+                    raise
+                if verbose:
+                    print(f"Shooting step failed ({type(err).__name__}); halving it")
+                dz = dz / 2
+
+    y_exh = np.asarray(y_exh, dtype=float)
+    n = NSP + 1
+    J = -np.eye(n)
+    converged = False
+    error = None
+    cycle = None
+    iteration = 0
+    residual = np.inf
+    try:
+        if y_exh.size == NSP:
+            z = np.concatenate(([T_exh / T_scale], y_exh))
+        else:
+            # Major-products guess: one cycle gives a consistent starting point
+            z = _exhaust_vector(_cycle_from_exhaust(params, gas, phi, rmf, rv, T_int, V0, t_span,
+                                                    theta0, k0, P_int, T_exh, y_exh, cycle_kw,
+                                                    major_products=True)[1],
+                                NSP, T_scale)
+            integrations += 1
+        T_exh, y_exh = _exhaust_state(z, T_scale, T_int)
+        z = np.concatenate(([T_exh / T_scale], y_exh))
+
+        g, cycle = cycle_map(z)
+        F = g - z
+        for iteration in range(1, max_iter + 1):
+            residual = np.abs(F).max()
+            if verbose:
+                print(f"Shooting iteration {iteration}: |F| = {residual:.3e}, T_exh = {z[0] * T_scale:.2f} K")
+            if residual <= tol:
+                converged = True
+                break
+
+            if jacobian == 'fd':
+                J = -np.eye(n)
+                for j in np.flatnonzero(np.concatenate(([True], z[1:] > Y_active))):
+                    z_j = z.copy()
+                    z_j[j] += fd_step
+                    J[:, j] = (cycle_map(z_j)[0] - g) / fd_step
+                    J[j, j] -= 1.0
+
+            z_new, g_new, cycle_new = newton_step(z, np.linalg.solve(J, -F))
+            F_new = g_new - z_new
+
+            if jacobian == 'broyden':
+                # 실제 스텝(클리핑 후)으로 갱신
+                s = z_new - z
+                J += np.outer(F_new - F - J @ s, s) / (s @ s)
+            z, g, F, cycle = z_new, g_new, F_new, cycle_new
+        else:
+            # 마지막 갱신 후의 잔차도 수렴 판정
+            residual = np.abs(F).max()
+            converged = residual <= tol
+    except (ValueError, ct.CanteraError) as err:
+        # 사이클을 계산할 수 없는 잔류가스 상태: 마지막으로 계산된 사이클을 반환
+        error = f"Shooting iteration {iteration}: {err}"
+        warnings.warn(error)
+
+    t, out, params, _ = cycle if cycle is not None else (None, None, params, None)
+    return {
+        't': t,
+        'out': out,
+        'params': params,
+        'converged': converged,
+        'iterations': iteration,
+        'integrations': integrations,
+        'residual': residual,
+        'T_exh': None if out is None else out[-1, 2],
+        'y_exh': None if out is None else out[-1, 5:5 + NSP],
+        'error': error,
+    }
+
+
 # Example usage
 if __name__ == "__main__":
+    from rdh_system_HT import SystemParams
+    from trajectory_store import TrajectoryWriter, load_trajectory
+
     rv = 12.0  # Compression ratio
-    theta_initial = 0  # Initial crank angle (degrees)
-    T_initial = 1000  # Initial temperature (K)
+    RPM = 1800  # Engine speed
+    theta_initial = -np.pi  # Initial crank angle (rad, BDC)
+    T_initial = 350  # Initial temperature (K)
     P_initial = 101325  # Initial pressure (Pa)
-    
+
     # Initialize gas properties
-    gas = ct.Solution("gri30.yaml")
+    gas = new_gas(mechanism)
     gas.TP = T_initial, P_initial
-    
-    # Calculate initial volume
-    V_initial = calculate_initial_volume(theta_initial, rv)
-    
-    # Initial state vector
-    X0 = [theta_initial, V_initial, T_initial] + list(gas.Y)
-    
-    # Time span and evaluation points
-    t_span = (0, 720)  # Crank angle range (degrees)
-    t_eval = np.linspace(*t_span, 500)
-    
-    # Solve ODE system
-    sol = solve_ivp(rdh_system, t_span, X0, t_eval=t_eval, args=(gas,))
-    
-    if sol.success:
-        print("Cycle simulation completed successfully.")
-    else:
-        print("Cycle simulation failed.")
-    
-    # Save results
-    np.savetxt("cycle_results.csv", sol.y, delimiter=",")
-    print("Results saved to cycle_results.csv")
+    gas.set_equivalence_ratio(0.4, 'H2', 'O2:1, N2:3.76')
+
+    # Initial volume at BDC (clearance volume times compression ratio)
+    V_initial = rv * calculate_initial_volume(theta_initial, rv)
+    params = SystemParams(MASS=gas.density * V_initial, bore=bore, stroke=stroke, con_len=0.25,
+                          RPM=RPM, FP=0.002, FD=0.1, ST=0.02, TW=400, SADH=np.pi * bore**2 / 4)
+
+    # Initial state vector [theta, V, T, k, Q, Y...]
+    X0 = np.concatenate(([theta_initial, V_initial, T_initial, 1.0, 0.0], gas.Y))
+
+    # One revolution, sampled every half degree
+    t_span = (0, 60 / RPM)
+    t_eval = np.linspace(*t_span, 721)
+
+    # Integrate the cycle, streaming the samples to the trajectory file
+    with TrajectoryWriter("cycle_results.npy", gas.species_names,
+                          params=dict(params._asdict(), mechanism=mechanism)) as writer:
+        t, out = run_cycle(params, gas, X0, t_span, t_eval=t_eval, writer=writer, store=False)
+    print(f"Cycle simulation completed: {writer.n_rows} samples saved to cycle_results.npy")
+
+    # Restart check: stop a checkpointed run just after ignition and resume it
+    class _Stop(Exception):
+        pass
+
+    class StoppingWriter(TrajectoryWriter):
+        """Writer that interrupts the run once stop_rows rows have been produced."""
+        stop_rows = None
+
+        def extend(self, t, X):
+            super().extend(t, X)
+            if self.stop_rows is not None and self.n_rows + self._fill >= self.stop_rows:
+                raise _Stop
+
+    _, full, _ = load_trajectory("cycle_results.npy")
+    ignition = int(np.argmax(np.diff(full[:, 2]))) + 1  # row of the steepest temperature rise
+    with StoppingWriter("cycle_restart.npy", gas.species_names) as writer:
+        writer.stop_rows = ignition + 20
+        try:
+            run_cycle(params, gas, X0, t_span, t_eval=t_eval, writer=writer, store=False,
+                      checkpoint="cycle_restart.ckpt", checkpoint_interval=0.0)
+        except _Stop:
+            pass
+    with TrajectoryWriter("cycle_restart.npy", gas.species_names, resume=True) as writer:
+        run_cycle(params, gas, X0, t_span, t_eval=t_eval, writer=writer, store=False,
+                  checkpoint="cycle_restart.ckpt")
+    _, resumed, _ = load_trajectory("cycle_restart.npy")
+    print(f"Resumed after ignition (row {ignition + 20}): {len(resumed)} samples, "
+          f"max |T - T_full| = {np.abs(resumed[:, 2] - full[:, 2]).max():.3g} K")
@@ -6,82 +6,366 @@ Created on Tue Dec 24 03:55:24 2024
 """
 
 # SOFC용 Python 코드 변환
+from typing import NamedTuple
+
 import numpy as np
-from cantera import Solution
+import cantera as ct
+from scipy import sparse
+
+from nasa_props import nasa_coefficients, species_dcp_dT, mixture_properties
+
+
+class SystemParams(NamedTuple):
+    """
+    Immutable parameter set of the cylinder ODE system.
+
+    MASS: trapped mass (kg); bore, stroke, con_len: geometry (m); RPM: engine speed;
+    FP, FD: turbulent KE production / dissipation constants; ST: Stanton number;
+    TW: wall temperature (K); SADH: dome surface area (m^2);
+    HT: heat transfer model (0 none, 1 correlation, 2 Stanton); SFC: correlation scaling factor.
+    """
+    MASS: float
+    bore: float
+    stroke: float
+    con_len: float
+    RPM: float
+    FP: float
+    FD: float
+    ST: float
+    TW: float
+    SADH: float
+    HT: int = 1
+    SFC: float = 1.0
+
+
+class SofcSystem:
+    """
+    Callable ODE right-hand side rhs(t, X) for one parameter set and gas object.
+
+    Geometry constants and the MW vector are computed once; each call does a
+    single gas state update and fills the species rates in one NumPy expression.
+    State vector: [theta, V, T, k, Q, Y_1 ... Y_NSP].
+
+    jac(t, X) is the analytic Jacobian for BDF / Radau / LSODA (jac_format 'csc'
+    or 'dense'; LSODA needs 'dense') and jac_sparsity its structural pattern,
+    for finite-difference Jacobians.
+    """
+
+    def __init__(self, params, gas, jac_format='csc'):
+        if jac_format not in ('csc', 'dense'):
+            raise ValueError(f"Unknown jac_format '{jac_format}'.")
+        self.params = params
+        self.jac_format = jac_format
+        self.gas = gas
+        p = params
+        self.NSP = gas.n_species
+
+        # 각도 변화율과 슬라이더-크랭크 상수
+        self.omega = p.RPM * (2 * np.pi) / 60  # rad/s
+        self.a = p.stroke / 2  # 크랭크 반경 [m]
+        self.a2 = self.a ** 2
+        self.con_len2 = p.con_len ** 2
+        self.piston_area = (np.pi / 4) * (p.bore ** 2)
+
+        # 난류 및 열 전달 상수
+        self.AV = 4 / p.bore  # 벽 면적 대 체적 비율 [1/m]
+        self.wall_per_volume = 2 / (p.bore / 2)
+        Sp = 2 * (p.stroke * p.RPM / 60)
+        # h_wos = 3.26 bore^-0.2 (100 p[bar])^0.8 T^-0.55 (2.28 Sp)^0.8, with p[bar] = rho Rc T / 1e5
+        self.h_wos_const = 3.26 * (p.bore ** -0.2) * (100 / 1e5) ** 0.8 * (2.28 * Sp) ** 0.8
+
+        # 종 질량 분율 변화율: dY = wdot * MW * V / MASS
+        self.MW = gas.molecular_weights
+        self.MW_per_mass = self.MW / p.MASS
+        self._coeffs = nasa_coefficients(gas)
+        self._jac_sparsity = None
+
+    def __call__(self, t, X):
+        p = self.params
+        gas = self.gas
+        NSP = self.NSP
+
+        theta = X[0]  # 크랭크 각도 [rad]
+        V = X[1]      # 가스 혼합물의 부피 [m^3]
+        T = X[2]      # 온도 [K]
+        k = X[3]      # 난류 운동 에너지 [m^2/s^2]
+
+        # GAS 상태 설정
+        gas.TDY = T, p.MASS / V, X[5:5 + NSP]
+        Rc = ct.gas_constant / gas.mean_molecular_weight
+
+        dXdt = np.empty(5 + NSP)
+        dXdt[0] = self.omega
+
+        # 부피 변화율 계산 (슬라이더-크랭크 메커니즘)
+        sin_t = np.sin(theta)
+        num = self.a * sin_t * np.cos(theta)
+        den = np.sqrt(self.con_len2 - self.a2 * sin_t ** 2)
+        dsdt = self.omega * self.a * (-sin_t - num / den)
+        dVdt = self.piston_area * (-dsdt)
+        dXdt[1] = dVdt
+
+        # 종 질량 분율 변화율 계산
+        dY = dXdt[5:]
+        np.multiply(gas.net_production_rates, self.MW_per_mass, out=dY)
+        dY *= V
+
+        # 난류 운동 에너지 변화율
+        vp = dVdt / self.piston_area  # 피스톤 속도 [m/s]
+        turb_P = p.FP * self.AV * (abs(vp) ** 3) - (2 / 3) * k * (1 / V) * dVdt
+        vt = np.sqrt(2 * k)  # 난류 속도 [m/s]
+        turb_D = p.FD * k * vt / (V ** (1 / 3))
+        dXdt[3] = turb_P - turb_D
+
+        # 열 전달 계산
+        if p.HT == 0:
+            dXdt[4] = 0
+        elif p.HT == 1:
+            Ac_sim = 2 * p.SADH + self.wall_per_volume * V
+            h_wos = self.h_wos_const * (p.MASS * Rc * T / V) ** 0.8 * T ** -0.55
+            dXdt[4] = p.SFC * Ac_sim * h_wos * (T - p.TW)
+        elif p.HT == 2:
+            Ac_sim = 2 * p.SADH + self.wall_per_volume * V
+            dXdt[4] = p.ST * vt * (p.MASS / V) * gas.cp_mass * Ac_sim * (T - p.TW)
+        else:
+            dXdt[4] = 0
+
+        # 온도 변화율
+        rate = gas.P * dVdt / p.MASS + Rc * T * np.dot(gas.partial_molar_enthalpies, dY)
+        if p.HT != 0:
+            rate += dXdt[4] / p.MASS
+        dXdt[2] = -rate / gas.cv_mass
+
+        return dXdt
+
+    def _kinematics(self, theta):
+        """dV/dt and d(dV/dt)/dtheta of the slider-crank mechanism."""
+        sin_t = np.sin(theta)
+        cos_t = np.cos(theta)
+        num = self.a * sin_t * cos_t
+        den = np.sqrt(self.con_len2 - self.a2 * sin_t ** 2)
+        dnum = self.a * (cos_t ** 2 - sin_t ** 2)
+        dden = -self.a2 * sin_t * cos_t / den
+        scale = self.piston_area * self.omega * self.a
+        dVdt = scale * (sin_t + num / den)
+        d_dVdt = scale * (cos_t + (dnum * den - num * dden) / den ** 2)
+        return dVdt, d_dVdt
+
+    def jac(self, t, X):
+        """
+        Analytic Jacobian d(dXdt)/dX.
+
+        Rate derivatives come from Cantera (net_production_rates_ddT at constant
+        concentrations and net_production_rates_ddCi), chained through
+        C = (MASS / V) Y / MW; the kinematic, turbulence and heat transfer rows
+        are differentiated by hand. The Y columns are exact for perturbations
+        that keep sum(Y) (the RHS normalizes Y).
+
+        Returns:
+        scipy.sparse.csc_matrix or ndarray: Jacobian, shape (5 + NSP, 5 + NSP).
+        """
+        p = self.params
+        gas = self.gas
+        NSP = self.NSP
+        R = ct.gas_constant
+
+        theta, V, T, k = X[0], X[1], X[2], X[3]
+        rho = p.MASS / V
+        gas.TDY = T, rho, X[5:5 + NSP]
+        Y = gas.Y
+        Rc = R / gas.mean_molecular_weight
+        P = gas.P
+        cv = gas.cv_mass
+        cp = gas.cp_mass
+
+        J = np.zeros((5 + NSP, 5 + NSP))
+        dVdt, d_dVdt = self._kinematics(theta)
+        J[1, 0] = d_dVdt
+
+        # 종 질량 분율 변화율: f_sp = wdot MW V / MASS
+        wdot = gas.net_production_rates
+        ddC = gas.net_production_rates_ddCi
+        ddT = gas.net_production_rates_ddT
+        scale = self.MW_per_mass * V
+        f_sp = wdot * scale
+        dw_dV = -(ddC @ gas.concentrations) / V
+        J_sp = J[5:]
+        J_sp[:, 1] = self.MW_per_mass * (wdot + V * dw_dV)
+        J_sp[:, 2] = scale * ddT
+        J_sp[:, 5:] = scale[:, None] * ddC * (rho / self.MW)[None, :]
+
+        # 난류 운동 에너지
+        vp = dVdt / self.piston_area
+        sqrt2 = np.sqrt(2)
+        J[3, 0] = (p.FP * self.AV * 3 * vp * abs(vp) * d_dVdt / self.piston_area
+                   - (2 / 3) * k / V * d_dVdt)
+        J[3, 1] = (2 / 3) * k * dVdt / V ** 2 + p.FD * sqrt2 * k ** 1.5 * (1 / 3) * V ** (-4 / 3)
+        J[3, 3] = -(2 / 3) * dVdt / V - p.FD * sqrt2 * 1.5 * np.sqrt(k) * V ** (-1 / 3)
+
+        # 열 전달
+        cp_molar = gas.partial_molar_cp
+        cp_species = cp_molar / self.MW  # 질량 기준 종 cp
+        f4 = 0.0
+        dT_wall = T - p.TW
+        if p.HT in (1, 2):
+            Ac_sim = 2 * p.SADH + self.wall_per_volume * V
+            if p.HT == 1:
+                h_wos = self.h_wos_const * (p.MASS * Rc * T / V) ** 0.8 * T ** -0.55
+                f4 = p.SFC * Ac_sim * h_wos * dT_wall
+                J[4, 1] = p.SFC * dT_wall * h_wos * (self.wall_per_volume - 0.8 * Ac_sim / V)
+                J[4, 2] = p.SFC * Ac_sim * h_wos * (0.25 * dT_wall / T + 1)
+                J[4, 5:] = f4 * 0.8 * (R / self.MW) / Rc
+            else:
+                vt = np.sqrt(2 * k)
+                dcp_dT = R * (Y / self.MW) @ species_dcp_dT(self._coeffs, T)[0]
+                f4 = p.ST * vt * rho * cp * Ac_sim * dT_wall
+                J[4, 1] = p.ST * vt * p.MASS * cp * dT_wall * (self.wall_per_volume / V - Ac_sim / V ** 2)
+                J[4, 2] = p.ST * vt * rho * Ac_sim * (dcp_dT * dT_wall + cp)
+                J[4, 3] = p.ST * rho * cp * Ac_sim * dT_wall / vt if vt > 0 else 0.0
+                J[4, 5:] = p.ST * vt * rho * Ac_sim * dT_wall * cp_species
+
+        # 온도: f2 = -N / cv, N = P dVdt / MASS + f4 / MASS + Rc T sum(h_i f_sp_i)
+        h_i = gas.partial_molar_enthalpies
+        S = h_i @ f_sp
+        N = P * dVdt / p.MASS + f4 / p.MASS + Rc * T * S
+        dN = np.zeros(5 + NSP)
+        dN[0] = P * d_dVdt / p.MASS
+        dN[1] = -P / V * dVdt / p.MASS + Rc * T * (h_i @ J_sp[:, 1])
+        dN[2] = P / T * dVdt / p.MASS + Rc * S + Rc * T * (cp_molar @ f_sp + h_i @ J_sp[:, 2])
+        dN[5:] = rho * T * (R / self.MW) * dVdt / p.MASS + (R / self.MW) * T * S \
+            + Rc * T * (h_i @ J_sp[:, 5:])
+        dN += J[4] / p.MASS
+        dN[4] = 0.0
+
+        dcv = np.zeros(5 + NSP)
+        dcv[2] = R * (Y / self.MW) @ species_dcp_dT(self._coeffs, T)[0]
+        dcv[5:] = (cp_molar - R) / self.MW
+        J[2] = -dN / cv + N / cv ** 2 * dcv
+
+        if self.jac_format == 'dense':
+            return J
+        return sparse.csc_matrix(J)
+
+    def composition_rate(self, X, Y_floor=1e-6):
+        """
+        Inverse chemical time scale max_k |dY_k/dt| / max(Y_k, Y_floor) (1/s) at state X.
+
+        The relative rate also catches radicals growing from zero during the
+        ignition delay, where the absolute rates are still tiny.
+        """
+        V = X[1]
+        Y = X[5:5 + self.NSP]
+        self.gas.TDY = X[2], self.params.MASS / V, Y
+        dYdt = self.gas.net_production_rates * self.MW_per_mass * V
+        return (np.abs(dYdt) / np.maximum(Y, Y_floor)).max()
+
+    @property
+    def jac_sparsity(self):
+        """
+        Structural nonzero pattern of jac (scipy.sparse csc), built once.
+
+        Species couplings come from ddCi evaluated at a state with every
+        species present, so third-body and falloff dependencies are included.
+        """
+        if self._jac_sparsity is None:
+            NSP = self.NSP
+            pattern = np.zeros((5 + NSP, 5 + NSP), dtype=bool)
+            pattern[1, 0] = True
+            pattern[2, :] = True
+            pattern[2, 4] = False
+            pattern[3, [0, 1, 3]] = True
+            if self.params.HT in (1, 2):
+                pattern[4, [1, 2]] = True
+                pattern[4, 5:] = True
+                pattern[4, 3] = self.params.HT == 2
+            pattern[5:, 1:3] = True
+
+            probe = ct.Solution(thermo='ideal-gas', kinetics='gas',
+                                species=self.gas.species(), reactions=self.gas.reactions())
+            probe.TPY = 1500.0, ct.one_atm, np.full(NSP, 1.0 / NSP)
+            pattern[5:, 5:] = probe.net_production_rates_ddCi != 0
+            self._jac_sparsity = sparse.csc_matrix(pattern)
+        return self._jac_sparsity
+
+
+class FrozenSystem(SofcSystem):
+    """
+    Frozen-composition RHS rhs(t, X) for X = [theta, V, T, k, Q].
+
+    The mass fractions are fixed at Y, so the species rates vanish and the gas
+    object is never called: Rc is constant and cv(T), cp(T) are interpolated
+    from a table built once with the NASA-7 engine.
+    """
+
+    def __init__(self, params, gas, Y, T_min=200.0, T_max=4000.0, dT=1.0):
+        super().__init__(params, gas)
+        Y = np.clip(np.asarray(Y, dtype=float), 0.0, None)
+        self.Y = Y / Y.sum()
+        self.Rc = ct.gas_constant * (self.Y / self.MW).sum()
+
+        # cp(T), cv(T) 표 (고정 조성)
+        self.T_table = np.arange(T_min, T_max + dT, dT)
+        props = mixture_properties(self._coeffs, self.T_table, ct.one_atm,
+                                   np.broadcast_to(self.Y, (len(self.T_table), self.NSP)))
+        self.cp_table = props['cp']
+        self.cv_table = props['cv']
+
+    def __call__(self, t, X):
+        p = self.params
+        theta, V, T, k = X[0], X[1], X[2], X[3]
+        Rc = self.Rc
+
+        dXdt = np.empty(5)
+        dXdt[0] = self.omega
+        dVdt, _ = self._kinematics(theta)
+        dXdt[1] = dVdt
+
+        # 난류 운동 에너지 변화율
+        vp = dVdt / self.piston_area
+        turb_P = p.FP * self.AV * (abs(vp) ** 3) - (2 / 3) * k * (1 / V) * dVdt
+        vt = np.sqrt(2 * k)
+        turb_D = p.FD * k * vt / (V ** (1 / 3))
+        dXdt[3] = turb_P - turb_D
+
+        # 열 전달 계산
+        if p.HT == 1:
+            Ac_sim = 2 * p.SADH + self.wall_per_volume * V
+            h_wos = self.h_wos_const * (p.MASS * Rc * T / V) ** 0.8 * T ** -0.55
+            dXdt[4] = p.SFC * Ac_sim * h_wos * (T - p.TW)
+        elif p.HT == 2:
+            Ac_sim = 2 * p.SADH + self.wall_per_volume * V
+            cp = np.interp(T, self.T_table, self.cp_table)
+            dXdt[4] = p.ST * vt * (p.MASS / V) * cp * Ac_sim * (T - p.TW)
+        else:
+            dXdt[4] = 0
+
+        # 온도 변화율 (P = rho Rc T, 조성 변화 없음)
+        rate = (p.MASS * Rc * T / V) * dVdt / p.MASS
+        if p.HT != 0:
+            rate += dXdt[4] / p.MASS
+        dXdt[2] = -rate / np.interp(T, self.T_table, self.cv_table)
+
+        return dXdt
+
+
+_legacy_systems = {}  # (params, id(gas)) -> SofcSystem for sofc_system()
+
 
 def sofc_system(t, X, gas):
     """
-    ODE 시스템 설정
+    ODE 시스템 설정 (모듈 전역 변수를 사용하는 기존 인터페이스)
     :param t: 시간 [s]
     :param X: 상태 벡터
     :param gas: Cantera Solution 객체
     :return: 상태 미분 벡터 dXdt
-    """
-    global MASS, NSP, MW, FP, FD, ST, TW, SADH, HT, SFC, bore, stroke, con_len, RPM
-
-    # 상태 변수 분해
-    theta = X[0]  # 크랭크 각도 [rad]
-    V = X[1]      # 가스 혼합물의 부피 [m^3]
-    T = X[2]      # 온도 [K]
-    k = X[3]      # 난류 운동 에너지 [m^2/s^2]
-    Q = X[4]      # 열 전달 [J]
-    Y = X[5:5+NSP]  # 각 종의 질량 분율
-
-    # GAS 상태 설정
-    gas.TDY = T, MASS / V, Y
-    Rc = gas.constant('R') / gas.mean_molecular_weight
-
-    # 화학 반응률 계산
-    wdot = gas.net_production_rates  # [kmol/m^3/s]
-
-    # 상태 미분 벡터 초기화
-    dXdt = np.zeros_like(X)
-
-    # 각도 변화율 계산
-    dXdt[0] = RPM * (2 * np.pi) / 60  # rad/s
-
-    # 부피 변화율 계산 (슬라이더-크랭크 메커니즘)
-    a = stroke / 2  # 크랭크 반경 [m]
-    num = a * np.sin(theta) * np.cos(theta)
-    den = np.sqrt((con_len ** 2) - (a ** 2 * np.sin(theta) ** 2))
-    dsdt = dXdt[0] * a * (-np.sin(theta) - num / den)
-    dVdt = (np.pi / 4) * (bore ** 2) * (-dsdt)
-    dXdt[1] = dVdt
-
-    # 종 질량 분율 변화율 계산
-    for i in range(NSP):
-        dXdt[5 + i] = wdot[i] * MW[i] * V / MASS  # [1/s]
-
-    # 난류 운동 에너지 변화율
-    vp = dVdt / (np.pi * (bore / 2) ** 2)  # 피스톤 속도 [m/s]
-    AV = 4 / bore  # 벽 면적 대 체적 비율 [1/m]
-    turb_P = FP * AV * (abs(vp) ** 3) - (2 / 3) * k * (1 / V) * dVdt
-    vt = np.sqrt(2 * k)  # 난류 속도 [m/s]
-    turb_D = FD * k * vt / (V ** (1 / 3))
-    dXdt[3] = turb_P - turb_D
-
-    # 열 전달 계산
-    Ac_sim = 2 * SADH + 2 * V / (bore / 2)
-    Sp = 2 * (stroke * RPM / 60)
-    p_instant = (MASS * Rc * T / V) / 1e5  # [bar]
-    h_wos = 3.26 * (bore ** -0.2) * (p_instant * 100) ** 0.8 * T ** -0.55 * (2.28 * Sp) ** 0.8
-
-    if HT == 0:
-        dXdt[4] = 0
-    elif HT == 1:
-        dXdt[4] = SFC * Ac_sim * h_wos * (T - TW)
-    elif HT == 2:
-        cp = gas.cp_mass
-        dXdt[4] = ST * vt * (MASS / V) * cp * Ac_sim * (T - TW)
 
-    # 온도 변화율
-    cv = gas.cv_mass
-    if HT == 0:
-        dXdt[2] = -1 / cv * ((gas.P * dVdt / MASS) + (Rc * T * np.dot(gas.partial_molar_enthalpies, dXdt[5:5 + NSP])))
-    else:
-        dXdt[2] = -1 / cv * ((gas.P * dVdt / MASS) + (1 / MASS) * dXdt[4] +
-                             (Rc * T * np.dot(gas.partial_molar_enthalpies, dXdt[5:5 + NSP])))
-
-    return dXdt
+    새 코드는 SofcSystem(SystemParams(...), gas) 를 직접 사용할 것.
+    """
+    params = SystemParams(MASS, bore, stroke, con_len, RPM, FP, FD, ST, TW, SADH, HT, SFC)
+    key = (params, id(gas))
+    system = _legacy_systems.get(key)
+    if system is None or system.gas is not gas:
+        system = _legacy_systems[key] = SofcSystem(params, gas)
+    return system(t, X)
 
 # 필요한 수정 사항은 기록 중...
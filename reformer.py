@@ -5,12 +5,60 @@ Created on Tue Dec 24 04:01:07 2024
 @author: 82108
 """
 
-import cantera as ct
 import numpy as np
+from mechanism import get_gas
+from nasa_props import nasa_coefficients, mixture_properties
 
-def reformer(m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform):
-    # Cantera 가스 객체 생성
-    gas_temp = ct.Solution('gri30.yaml')  # gri30.xml -> gri30.yaml (Cantera 3.0.0 업데이트)
+# Species of the reformer inlet and outlet streams
+REFORMER_SPECIES = ('CH4', 'H2O', 'CO2', 'H2', 'CO')
+
+
+def wgs_equilibrium(Kp, x_CH4_in, x_H2O_in):
+    """
+    CO2 produced by the water-gas shift for a fully reformed CH4/H2O feed.
+
+    Solves (Kp - 1) x^2 - (Kp x_H2O + 3 x_CH4) x + Kp x_CH4 (x_H2O - x_CH4) = 0
+    element-wise in closed form and keeps the root with non-negative CO and
+    H2O, i.e. 0 <= x <= min(x_CH4, x_H2O - x_CH4). Kp close to 1 reduces the
+    quadratic to a linear equation.
+
+    Parameters:
+    Kp (array): Water-gas shift equilibrium constant.
+    x_CH4_in, x_H2O_in (array): Inlet mole fractions of CH4 and H2O.
+
+    Returns:
+    tuple: (x_CO2_out, valid); where no root is physical, x_CO2_out is the
+           root closest to the physical range, clipped into it, and valid is False.
+    """
+    Kp, x_CH4_in, x_H2O_in = np.broadcast_arrays(*(np.asarray(v, dtype=float)
+                                                  for v in (Kp, x_CH4_in, x_H2O_in)))
+    a = Kp - 1
+    b = -x_H2O_in * Kp - 3 * x_CH4_in
+    c = Kp * x_CH4_in * (x_H2O_in - x_CH4_in)
+
+    # Cancellation-free roots; b < 0 for any feed containing CH4 or H2O
+    disc = np.sqrt(np.maximum(b * b - 4 * a * c, 0.0))
+    q = -0.5 * (b - disc)
+    linear = np.abs(a) <= 1e-12 * np.abs(b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root_1 = np.where(linear, -c / b, q / np.where(linear, 1.0, a))
+        root_2 = np.where(q != 0, c / np.where(q != 0, q, 1.0), root_1)
+
+    upper = np.minimum(x_CH4_in, x_H2O_in - x_CH4_in)
+
+    def violation(x):
+        return np.where(np.isfinite(x), np.maximum(-x, 0) + np.maximum(x - upper, 0), np.inf)
+
+    v_1 = violation(root_1)
+    v_2 = violation(root_2)
+    x_CO2_out = np.where(v_2 <= v_1, root_2, root_1)
+    valid = np.minimum(v_1, v_2) == 0
+    x_CO2_out = np.clip(x_CO2_out, 0.0, np.maximum(upper, 0.0))
+    return x_CO2_out, valid
+
+def reformer(m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform, gas=None):
+    # Cantera 가스 객체 (프로세스당 한 번만 로드)
+    gas_temp = gas if gas is not None else get_gas('gri30.yaml')  # gri30.xml -> gri30.yaml (Cantera 3.0.0 업데이트)
     N = gas_temp.n_species
     iCO2 = gas_temp.species_index('CO2')
     iCH4 = gas_temp.species_index('CH4')
@@ -35,9 +83,8 @@ def reformer(m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform):
     x_CH4_in = x_in[iCH4]
     x_H2O_in = x_in[iH2O]
     
-    poly_coeff_x_CO2_out = [Kp - 1, -x_H2O_in * Kp - 3 * x_CH4_in, Kp * x_CH4_in * (x_H2O_in - x_CH4_in)]
-    x_CO2_out_temp = np.roots(poly_coeff_x_CO2_out)
-    x_CO2_out = np.real(x_CO2_out_temp[(x_CO2_out_temp >= 0) & (x_CO2_out_temp <= 1)][0])
+    x_CO2_out, valid = wgs_equilibrium(Kp, x_CH4_in, x_H2O_in)
+    x_CO2_out = float(x_CO2_out)
     x_CO_out = x_CH4_in - x_CO2_out
     x_H2O_out = x_H2O_in - x_CH4_in - x_CO2_out
     x_H2_out = 3 * x_CH4_in + x_CO2_out
@@ -57,7 +104,68 @@ def reformer(m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform):
     # 필요 열량 계산
     Q_joule_per_kg_anode_mix = h_out - h_in
 
-    # 에러 값 계산 (분율 검증)
-    error = 0
+    # 에러 값 계산 (분율 검증): 물리적인 WGS 해가 없으면 1
+    error = 0 if valid else 1
 
     return xanod_in, Q_joule_per_kg_anode_mix, error
+
+
+def reformer_batch(m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform, gas=None):
+    """
+    Vectorized reformer over arrays of operating points.
+
+    All inputs broadcast to a common length n. The water-gas shift quadratic
+    is solved in closed form and the enthalpies come from the NASA-7 engine.
+
+    Parameters:
+    m_CH4, m_H2O (array): Inlet CH4 / H2O mass flows (or mass fractions).
+    T_reform_in, T_reform_out (array): Inlet / outlet temperatures (K).
+    P_reform (array): Pressure (Pa).
+    gas (Cantera.Solution, optional): Gas object defining the output index space.
+
+    Returns:
+    dict: 'xanod_in' (n, n_species) outlet mole fractions, 'Q_joule_per_kg_anode_mix' (n,),
+          'error' (n,) 1 where no physical water-gas shift root exists.
+    """
+    gas_temp = gas if gas is not None else get_gas('gri30.yaml')
+    coeffs = nasa_coefficients(gas_temp, REFORMER_SPECIES)
+    iCH4, iH2O, iCO2, iH2, iCO = (gas_temp.species_index(sp) for sp in REFORMER_SPECIES)
+
+    m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float))
+          for v in (m_CH4, m_H2O, T_reform_in, T_reform_out, P_reform)))
+    n = len(m_CH4)
+
+    # Inlet state (columns ordered as REFORMER_SPECIES)
+    Y_in = np.zeros((n, len(REFORMER_SPECIES)))
+    Y_in[:, 0] = m_CH4
+    Y_in[:, 1] = m_H2O
+    Y_in /= Y_in.sum(axis=1, keepdims=True)
+    h_in = mixture_properties(coeffs, T_reform_in, P_reform, Y_in, normalize=False)['h']
+
+    # Water-gas shift 반응 상수 Kp 계산
+    Kp = np.exp((4276 / T_reform_out) - 3.961)
+
+    # 원자 균형 기반 계산
+    N_in = Y_in[:, :2] / coeffs['MW'][:2]
+    x_in = N_in / N_in.sum(axis=1, keepdims=True)
+    x_CH4_in = x_in[:, 0]
+    x_H2O_in = x_in[:, 1]
+    x_CO2_out, valid = wgs_equilibrium(Kp, x_CH4_in, x_H2O_in)
+
+    X_out = np.column_stack((np.zeros(n), x_H2O_in - x_CH4_in - x_CO2_out, x_CO2_out,
+                             3 * x_CH4_in + x_CO2_out, x_CH4_in - x_CO2_out))
+    X_out /= X_out.sum(axis=1, keepdims=True)  # 재정규화
+
+    Y_out = X_out * coeffs['MW']
+    Y_out /= Y_out.sum(axis=1, keepdims=True)
+    h_out = mixture_properties(coeffs, T_reform_out, P_reform, Y_out, normalize=False)['h']
+
+    xanod_in = np.zeros((n, gas_temp.n_species))
+    xanod_in[:, [iCH4, iH2O, iCO2, iH2, iCO]] = X_out
+
+    return {
+        'xanod_in': xanod_in,
+        'Q_joule_per_kg_anode_mix': h_out - h_in,
+        'error': np.where(valid, 0, 1),
+    }
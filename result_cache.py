@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 30 10:41:27 2026
+
+@author: 82108
+"""
+
+# Persistent content-addressed result cache.
+# A call is identified by the SHA-256 of the function name, its arguments,
+# the contents of the mechanism files it depends on and the code version
+# (the source of the function's module and of the local modules it imports,
+# directly or not), so changing a model file, a mechanism or any input
+# computes afresh, while repeated sweeps only compute the points that
+# changed. Results are pickled one file per key; the least recently used
+# files are evicted past max_bytes.
+# default_cache() follows init_conditions: duplicate_check_flag enables
+# lookups and capture_data_flag enables storing.
+
+import ast
+import functools
+import glob
+import hashlib
+import inspect
+import os
+import pickle
+
+import cantera as ct
+import numpy as np
+
+import init_conditions
+from checkpoint import run_hash
+from mechanism import get_gas, is_registered, resolve_mechanism
+
+_code_versions = {}  # module path -> hash of its source and its local imports
+_file_hashes = {}  # (path, mtime, size) -> content hash
+_gas_definitions = {}  # id(gas) -> (gas, hash of its species and reactions)
+
+
+class Uncacheable(TypeError):
+    """An argument has no stable fingerprint (e.g. an open file or a callback)."""
+
+
+def _local_imports(path):
+    """Paths of the modules next to path that it imports (the flat code base)."""
+    directory = os.path.dirname(path)
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    paths = (os.path.join(directory, name + '.py') for name in names)
+    return [p for p in paths if os.path.isfile(p)]
+
+
+def code_version(path):
+    """
+    Hash of the source of a module and of the local modules it imports.
+
+    Imports are followed transitively, but only to .py files in the module's
+    directory, so editing an unrelated script leaves the version unchanged.
+    """
+    path = os.path.abspath(path)
+    if path not in _code_versions:
+        seen = set()
+        todo = [path]
+        while todo:
+            current = todo.pop()
+            if current not in seen:
+                seen.add(current)
+                todo.extend(_local_imports(current))
+        digest = hashlib.sha256()
+        for current in sorted(seen):
+            digest.update(os.path.basename(current).encode())
+            digest.update(_file_hash(current).encode())
+        _code_versions[path] = digest.hexdigest()
+    return _code_versions[path]
+
+
+def _file_hash(path):
+    """Content hash of a file, memoized on its modification time and size."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _file_hashes:
+        with open(path, 'rb') as f:
+            _file_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+    return _file_hashes[key]
+
+
+def mechanism_hash(name):
+    """
+    Content hash of a mechanism file (after resolve_mechanism).
+
+    Mechanisms registered in memory (register_mechanism) are hashed by their
+    species and reaction definitions, also when the name matches a file.
+    """
+    if is_registered(name):
+        return 'registered:' + _gas_definition(get_gas(name))
+    filename = resolve_mechanism(name)
+    candidates = [filename] + [os.path.join(d, filename) for d in ct.get_data_directories()]
+    for path in candidates:
+        if os.path.isfile(path):
+            return _file_hash(path)
+    raise FileNotFoundError(f"Mechanism file '{filename}' not found.")
+
+
+def _gas_definition(gas):
+    """Hash of the species and reaction definitions of a Solution (memoized per object)."""
+    entry = _gas_definitions.get(id(gas))
+    if entry is None or entry[0] is not gas:
+        definition = ([gas.species(k).input_data for k in range(gas.n_species)],
+                      [gas.reaction(i).input_data for i in range(gas.n_reactions)])
+        entry = (gas, hashlib.sha256(repr(definition).encode()).hexdigest())
+        _gas_definitions[id(gas)] = entry
+    return entry[1]
+
+
+def _normalize(value):
+    """
+    Stable, hashable stand-in for an argument value.
+
+    Real scalars (Python or NumPy, including 0-d arrays) become float, so
+    900, 900.0 and np.float64(900) give the same key; booleans stay bool.
+
+    Raises:
+    Uncacheable: For values without a content-based fingerprint.
+    """
+    if isinstance(value, np.ndarray) and value.ndim == 0:
+        value = value[()]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if value is None or isinstance(value, (complex, str, bytes)):
+        return value
+    if isinstance(value, (np.ndarray, np.generic)):
+        return np.asarray(value)
+    if isinstance(value, ct.Solution):
+        return ('Solution', _gas_definition(value), value.T, value.P, np.asarray(value.Y))
+    if hasattr(value, '_asdict'):
+        return (type(value).__name__, tuple((k, _normalize(v)) for k, v in value._asdict().items()))
+    if isinstance(value, (tuple, list)):
+        return type(value).__name__, tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return 'dict', tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    raise Uncacheable(f"Cannot fingerprint an argument of type {type(value).__name__}.")
+
+
+class ResultCache:
+    """
+    On-disk memoization of function results.
+
+    Parameters:
+    directory (str): Cache directory (created if needed).
+    max_bytes (int): Size limit; least recently used entries are removed beyond it.
+    read (bool): Look results up (skip already computed calls).
+    write (bool): Store new results.
+
+    The size of the directory is read once and then kept as a running total
+    of this process's stores; it is re-read from the directory whenever the
+    total passes max_bytes, so entries written by other processes are counted
+    at the next eviction.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 2**30, read=True, write=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.read = read
+        self.write = write
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'uncacheable': 0}
+        self._bytes = None  # running size of the entries, read on the first store
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, func, args=(), kwargs=None, mechanisms=()):
+        """Cache key of func(*args, **kwargs)."""
+        kwargs = kwargs or {}
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        source = inspect.getsourcefile(func)
+        return run_hash(
+            f"{func.__module__}.{func.__qualname__}",
+            code_version(source),
+            tuple(mechanism_hash(name) for name in mechanisms),
+            _normalize(dict(bound.arguments)),
+        )
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """
+        Stored result for key.
+
+        Returns:
+        tuple: (found, result)
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None
+        try:
+            os.utime(path)  # 최근 사용 시각 갱신 (LRU)
+        except FileNotFoundError:
+            pass
+        return True, result
+
+    def put(self, key, result):
+        """Store a result atomically and evict old entries over max_bytes."""
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if self._bytes is None:
+            self._bytes = self._scan()[1]
+        try:
+            self._bytes -= os.path.getsize(path)  # overwritten entry
+        except FileNotFoundError:
+            pass
+        self._bytes += os.path.getsize(tmp)
+        os.replace(tmp, path)
+        self.stats['stores'] += 1
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def _scan(self):
+        """(mtime_ns, size, path) of every entry and their total size."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        """
+        Remove least recently used entries once the cache exceeds max_bytes.
+
+        Entries are removed down to 90% of max_bytes, so that a full cache is
+        not rescanned on every store.
+        """
+        entries, total = self._scan()
+        self._bytes = total
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.stats['evictions'] += 1
+            total -= size
+            if total <= 0.9 * self.max_bytes:
+                break
+        self._bytes = total
+
+    def call(self, func, *args, mechanisms=(), **kwargs):
+        """func(*args, **kwargs) through the cache."""
+        if not (self.read or self.write):
+            return func(*args, **kwargs)
+        try:
+            key = self.key(func, args, kwargs, mechanisms)
+        except Uncacheable:
+            self.stats['uncacheable'] += 1
+            return func(*args, **kwargs)
+        if self.read:
+            found, result = self.get(key)
+            if found:
+                self.stats['hits'] += 1
+                return result
+        self.stats['misses'] += 1
+        result = func(*args, **kwargs)
+        if self.write:
+            self.put(key, result)
+        return result
+
+    def cached(self, func=None, mechanisms=('gri30.yaml',)):
+        """
+        Decorator / wrapper: cache.cached(SOFC.sofc_model) or @cache.cached(mechanisms=(...)).
+
+        Side effects of the wrapped function (e.g. on the state of a gas
+        argument, or on a writer) do not happen on cache hits; calls with
+        arguments that cannot be fingerprinted always run.
+        """
+        if func is None:
+            return functools.partial(self.cached, mechanisms=mechanisms)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, mechanisms=mechanisms, **kwargs)
+        return wrapper
+
+    def clear(self):
+        """Delete all entries."""
+        for path in glob.glob(os.path.join(self.directory, '*.pkl')):
+            os.remove(path)
+        self._bytes = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['stats'] = dict.fromkeys(self.stats, 0)
+        state['_bytes'] = None
+        return state
+
+
+def default_cache(max_bytes=2 * 2**30):
+    """
+    Cache in <dd>/cache configured by init_conditions.
+
+    duplicate_check_flag = 1 enables lookups (already computed runs are
+    skipped) and capture_data_flag = 1 enables storing results.
+
+    Returns:
+    ResultCache
+    """
+    return ResultCache(os.path.join(init_conditions.dd, 'cache'), max_bytes=max_bytes,
+                       read=bool(init_conditions.duplicate_check_flag),
+                       write=bool(init_conditions.capture_data_flag))
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 31 09:27:40 2026
+
+@author: 82108
+"""
+
+# Append-only columnar store for operating-point results.
+# A store is a directory with one .npy file per column (vector columns such
+# as y_fuel are (n, width) arrays) plus store.json holding the schema, the
+# row count and free-form metadata (e.g. species indices, which are
+# constants of the mechanism rather than per-row data). Columns are
+# memory-mapped, so loading touches only the columns and rows used.
+# Numeric columns are stored as float64 (booleans as bool); an insert whose
+# values would change in the stored dtype is rejected rather than cast.
+# Rows are deduplicated on insert through a 64-bit digest per row, and the
+# operating-point key columns (T1, P1, m1, util, V, ...) get sorted indexes
+# so range queries are binary searches instead of scans.
+# import_processed_csv() converts sofc_processed_data.csv style files, in
+# which y_fuel is spread over one text row per species.
+
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from trajectory_store import HEADER_BYTES, npy_header
+
+DEFAULT_KEYS = ('T1', 'P1', 'm1', 'util', 'V')
+_DIGEST = '_digest'
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + '.npy')
+
+
+def _save_array(path, array):
+    """Write a whole array atomically (temporary file + os.replace)."""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _row_digests(arrays):
+    """64-bit digest of every row of the given column arrays."""
+    n = len(arrays[0])
+    parts = []
+    for a in arrays:
+        if a.dtype.kind == 'f':
+            a = a + 0.0  # -0.0 -> 0.0
+        parts.append(np.ascontiguousarray(a).reshape(n, -1).view(np.uint8))
+    rows = np.ascontiguousarray(np.hstack(parts))
+    return np.array([int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), 'little')
+                     for row in rows], dtype=np.uint64)
+
+
+class ResultStore:
+    """
+    Columnar store of operating-point results.
+
+    Parameters:
+    path (str): Store directory (created on the first insert if needed).
+    keys (tuple): Scalar columns with sorted indexes (operating-point keys).
+                  Ignored when opening an existing store.
+    dedupe (str): 'row' drops rows identical to a stored row, 'keys' drops rows
+                  whose key columns match a stored row, None keeps everything.
+
+    One process appends at a time; readers may open the store concurrently.
+    Only a store that has inserted rows (the writer) saves key indexes to
+    disk; readers build them in memory, so read-only directories work.
+    """
+
+    def __init__(self, path, keys=DEFAULT_KEYS, dedupe='row'):
+        if dedupe not in ('row', 'keys', None):
+            raise ValueError("dedupe must be 'row', 'keys' or None.")
+        self.path = path
+        self._meta_file = os.path.join(path, 'store.json')
+        self._indexes = {}
+        self._views = {}
+        if os.path.exists(self._meta_file):
+            with open(self._meta_file) as f:
+                info = json.load(f)
+            self.schema = info['schema']
+            self.keys = tuple(info['keys'])
+            self.dedupe = info['dedupe']
+            self.meta = info['meta']
+            self.n_rows = self._recover(info['rows'])
+        else:
+            self.schema = {}  # name -> [dtype str, width or None]
+            self.keys = tuple(keys)
+            self.dedupe = dedupe
+            self.meta = {}
+            self.n_rows = 0
+        self._seen = None  # digests of the stored rows, read on the first insert
+        self._writer = False
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def columns(self):
+        """Column names in insertion order."""
+        return list(self.schema)
+
+    # ---- writing ----
+
+    def _recover(self, rows):
+        """
+        Rows complete in store.json and in all column files. Bytes past them (an
+        interrupted insert) are overwritten by the next insert.
+        """
+        for name in list(self.schema) + [_DIGEST]:
+            path = _column_path(self.path, name)
+            rows = min(rows, (os.path.getsize(path) - HEADER_BYTES) // self._row_bytes(name))
+        return rows
+
+    def _row_bytes(self, name):
+        dtype, width = self.schema[name] if name in self.schema else ('<u8', None)
+        return np.dtype(dtype).itemsize * (width or 1)
+
+    def _shape(self, name, rows):
+        width = self.schema[name][1] if name in self.schema else None
+        return (rows,) if width is None else (rows, width)
+
+    def _create(self, columns):
+        """Schema from the first batch; creates the empty column files."""
+        for name, a in columns.items():
+            if a.dtype.kind not in 'biuf' or a.ndim > 2:
+                raise TypeError(f"Column '{name}' must be numeric and scalar or 1-D per row.")
+            # 첫 배치가 정수여도 이후 실수 값이 잘리지 않도록 float64로 저장
+            dtype = a.dtype if a.dtype.kind == 'b' else np.dtype('<f8')
+            self.schema[name] = [dtype.str, a.shape[1] if a.ndim == 2 else None]
+        missing = [k for k in self.keys if k not in self.schema]
+        if missing:
+            raise ValueError(f"Key columns {missing} are not in the data.")
+        if any(self.schema[k][1] is not None for k in self.keys):
+            raise ValueError("Key columns must be scalar.")
+        os.makedirs(self.path, exist_ok=True)
+        for name in list(self.schema) + [_DIGEST]:
+            with open(_column_path(self.path, name), 'wb') as f:
+                dtype = self.schema[name][0] if name in self.schema else '<u8'
+                f.write(npy_header(self._shape(name, 0), dtype))
+        self._write_meta()
+
+    def _write_meta(self):
+        info = {'schema': self.schema, 'keys': list(self.keys), 'dedupe': self.dedupe,
+                'rows': self.n_rows, 'meta': self.meta}
+        tmp = self._meta_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(info, f, indent=1)
+        os.replace(tmp, self._meta_file)
+
+    def _cast(self, name, a):
+        """
+        Column values in the stored dtype and shape.
+
+        Raises:
+        TypeError: The values are not numeric or would change in the stored dtype.
+        ValueError: The per-row width differs from the stored one.
+        """
+        dtype, width = self.schema[name]
+        dtype = np.dtype(dtype)
+        if a.dtype.kind not in 'biuf':
+            raise TypeError(f"Column '{name}' must be numeric.")
+        if a.shape[1:] != ((width,) if width is not None else ()):
+            raise ValueError(f"Column '{name}' has per-row shape {a.shape[1:]}, "
+                             f"the store has {(width,) if width is not None else ()}.")
+        if a.dtype == dtype:
+            return a
+        cast = a.astype(dtype)
+        # int64 -> float64 counts as 'safe' but rounds above 2**53: check the values
+        lossless = np.can_cast(a.dtype, dtype, 'safe') and not (a.dtype.kind in 'iu' and dtype.kind == 'f')
+        if not lossless and not np.array_equal(cast.astype(a.dtype), a):
+            raise TypeError(f"Column '{name}' is stored as {dtype}; "
+                            f"casting these {a.dtype} values would change them.")
+        return cast
+
+    def set_meta(self, **values):
+        """Store metadata (JSON-serializable values) with the store."""
+        self.meta.update(values)
+        if self.schema:
+            self._write_meta()
+
+    def insert(self, rows):
+        """
+        Append rows, skipping duplicates.
+
+        Parameters:
+        rows (dict or list): Columns {name: (n,) or (n, width) array}, or one row
+                             dict, or a list of row dicts.
+
+        Returns:
+        int: Number of rows actually added.
+        """
+        if isinstance(rows, dict):
+            columns = {k: np.asarray(v) for k, v in rows.items()}
+            if any(v.ndim == 0 for v in columns.values()):
+                columns = {k: v[None] for k, v in columns.items()}  # a single row
+        else:
+            rows = list(rows)
+            if not rows:
+                return 0
+            columns = {k: np.asarray([row[k] for row in rows]) for k in rows[0]}
+        if len({len(v) for v in columns.values()}) != 1:
+            raise ValueError("All columns must have the same number of rows.")
+        if not self.schema:
+            self._create(columns)
+        if set(columns) != set(self.schema):
+            raise ValueError(f"Expected columns {sorted(self.schema)}, got {sorted(columns)}.")
+        columns = {name: self._cast(name, columns[name]) for name in self.schema}
+        self._writer = True
+        if self._seen is None and self.dedupe is not None:
+            self._seen = set(self._column(_DIGEST).tolist())
+
+        names = list(self.schema) if self.dedupe != 'keys' else list(self.keys)
+        digests = _row_digests([columns[name] for name in names])
+        if self.dedupe is None:
+            keep = np.ones(len(digests), dtype=bool)
+        else:
+            keep = np.zeros(len(digests), dtype=bool)
+            for i, d in enumerate(digests.tolist()):
+                if d not in self._seen:
+                    self._seen.add(d)
+                    keep[i] = True
+        n_new = int(keep.sum())
+        if n_new == 0:
+            return 0
+
+        # 데이터 먼저, 그 다음 헤더와 store.json의 행 수 갱신
+        columns[_DIGEST] = digests
+        rows = self.n_rows + n_new
+        for name, a in columns.items():
+            with open(_column_path(self.path, name), 'r+b') as f:
+                f.seek(HEADER_BYTES + self.n_rows * self._row_bytes(name))
+                f.write(np.ascontiguousarray(a[keep]).tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(npy_header(self._shape(name, rows), columns[name].dtype.str))
+        self.n_rows = rows
+        self._views.clear()
+        self._write_meta()
+        return n_new
+
+    # ---- reading ----
+
+    def _column(self, name):
+        """Memory-mapped view of a column's rows."""
+        if name not in self._views:
+            if name not in self.schema and name != _DIGEST:
+                raise KeyError(f"No column '{name}' in the store.")
+            dtype = self.schema[name][0] if name in self.schema else '<u8'
+            shape = self._shape(name, self.n_rows)
+            if self.n_rows == 0:
+                self._views[name] = np.empty(shape, dtype=dtype)
+            else:
+                self._views[name] = np.memmap(_column_path(self.path, name), dtype=dtype, mode='r',
+                                              offset=HEADER_BYTES, shape=shape)
+        return self._views[name]
+
+    def __getitem__(self, name):
+        return self._column(name)
+
+    def _index(self, name):
+        """
+        Sorted values and row order of a key column, extended with rows added since.
+
+        The extended index is saved only by the writer.
+        """
+        values_path = os.path.join(self.path, name + '.index.npy')
+        order_path = os.path.join(self.path, name + '.order.npy')
+        if name not in self._indexes and os.path.exists(order_path):
+            try:
+                self._indexes[name] = (np.load(values_path, mmap_mode='r'),
+                                       np.load(order_path, mmap_mode='r'))
+            except (OSError, ValueError):  # being replaced by the writer
+                pass
+        sorted_values, order = self._indexes.get(name, (np.empty(0), np.empty(0, dtype=np.int64)))
+        if len(order) > self.n_rows or len(sorted_values) != len(order):
+            # rows dropped by _recover, or the two files from different saves
+            sorted_values, order = np.empty(0), np.empty(0, dtype=np.int64)
+        if len(order) < self.n_rows:
+            # 새 행만 정렬해서 기존 인덱스에 병합
+            column = self._column(name)
+            new_rows = np.arange(len(order), self.n_rows)
+            new_order = np.argsort(column[new_rows], kind='stable')
+            new_rows, new_values = new_rows[new_order], np.asarray(column[new_rows[new_order]])
+            position = np.searchsorted(sorted_values, new_values, side='right')
+            sorted_values = np.insert(np.asarray(sorted_values), position, new_values)
+            order = np.insert(np.asarray(order), position, new_rows)
+            if self._writer:
+                _save_array(values_path, sorted_values)
+                _save_array(order_path, order)
+            self._indexes[name] = (sorted_values, order)
+        return sorted_values, order
+
+    def where(self, **conditions):
+        """
+        Row numbers matching all conditions.
+
+        Parameters:
+        **conditions: column=value for equality or column=(low, high) for
+                      low <= column <= high (None leaves a side open).
+                      Key columns use their index; other columns are scanned.
+
+        Returns:
+        ndarray: Increasing row numbers.
+        """
+        bounds = {}
+        for name, condition in conditions.items():
+            if name not in self.schema or self.schema[name][1] is not None:
+                raise KeyError(f"'{name}' is not a scalar column of the store.")
+            low, high = condition if isinstance(condition, (tuple, list)) else (condition, condition)
+            bounds[name] = (low, high)
+
+        rows = None
+        indexed = [name for name in bounds if name in self.keys]
+        for name in indexed:
+            sorted_values, order = self._index(name)
+            low, high = bounds.pop(name)
+            start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+            stop = len(order) if high is None else np.searchsorted(sorted_values, high, side='right')
+            found = np.sort(order[start:stop])
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        if rows is None:
+            rows = np.arange(self.n_rows)
+        for name, (low, high) in bounds.items():
+            values = self._column(name)[rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            rows = rows[mask]
+        return rows
+
+    def query(self, columns=None, **conditions):
+        """
+        Columns of the rows matching the conditions (see where()).
+
+        Parameters:
+        columns (list, optional): Columns to return (default all).
+
+        Returns:
+        dict: {name: array} of the selected rows, in insertion order.
+        """
+        rows = self.where(**conditions) if conditions else slice(None)
+        return {name: np.asarray(self._column(name)[rows]) for name in (columns or self.columns)}
+
+
+def import_processed_csv(csv_path, store, vector_column='y_fuel', width=None):
+    """
+    Import a post-processing CSV in which a vector column is spread over rows.
+
+    In sofc_processed_data.csv each operating point takes one row per species:
+    y_fuel holds one mass fraction per row while every other column repeats.
+    Columns named i<species> (1-based species indices) become store metadata
+    ('species_index', 0-based).
+
+    Parameters:
+    csv_path (str): CSV file.
+    store (ResultStore or str): Target store (or its directory).
+    vector_column (str): Column spread over rows.
+    width (int, optional): Rows per operating point (number of species); default
+                           is the length of the first run of repeated values.
+
+    Returns:
+    tuple: (store, rows read as operating points, rows added)
+    """
+    if isinstance(store, str):
+        store = ResultStore(store)
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        table = np.array([[float(v) for v in row] for row in reader if row])
+    if len(table) == 0:
+        return store, 0, 0
+
+    j_vec = header.index(vector_column)
+    index_columns = [j for j, name in enumerate(header) if name.startswith('i') and len(name) > 1
+                     and np.all(table[:, j] == table[0, j]) and float(table[0, j]).is_integer()]
+    scalar_columns = [j for j in range(len(header)) if j != j_vec and j not in index_columns]
+    scalars = table[:, scalar_columns]
+    if width is None:
+        changes = np.flatnonzero(np.any(scalars[1:] != scalars[:-1], axis=1))
+        width = int(changes[0]) + 1 if len(changes) else len(table)
+    if len(table) % width:
+        raise ValueError(f"{len(table)} rows are not a whole number of {width}-row operating points.")
+    blocks = scalars.reshape(-1, width, len(scalar_columns))
+    if np.any(blocks != blocks[:, :1]):
+        raise ValueError(f"Columns other than {vector_column} vary within an operating point.")
+
+    columns = {header[j]: blocks[:, 0, k] for k, j in enumerate(scalar_columns)}
+    columns[vector_column] = table[:, j_vec].reshape(-1, width)
+    added = store.insert(columns)
+    store.set_meta(species_index={header[j][1:]: int(table[0, j]) - 1 for j in index_columns})
+    return store, len(blocks), added
+
+
+# Example usage
+if __name__ == "__main__":
+    store, n_points, added = import_processed_csv('sofc_processed_data.csv', 'sofc_results')
+    print(f"{n_points} operating points read, {added} added, {len(store)} stored")
+    print(store.query(columns=['T1', 'V', 'util', 'W_tot'], V=(0.7, 0.9)))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 19 09:40:03 2026
+
+@author: 82108
+"""
+
+# Vectorized bracketed root finding for arrays of independent scalar problems.
+
+import numpy as np
+
+
+def bracketed_root(f, a, b, xtol=1e-6, rtol=1e-10, max_iter=100):
+    """
+    Solve f(x) = 0 element-wise on brackets [a, b] with the Illinois method.
+
+    Each point keeps a sign-changing bracket, so the iteration cannot leave
+    [a, b]; the Illinois modification of regula falsi converges superlinearly.
+    Steps that fall outside the bracket fall back to bisection.
+
+    Parameters:
+    f (callable): f(x, idx) -> residuals, where x holds the trial values of
+                  the points with indices idx (so f can subset its parameters).
+    a, b (array): Bracket ends, shape (n,).
+    xtol (float): Absolute tolerance on x.
+    rtol (float): Relative tolerance on x.
+    max_iter (int): Maximum number of iterations.
+
+    Returns:
+    dict: 'x' root estimates, 'f' residuals at x, 'converged', 'bracketed'
+          (False where f(a), f(b) have the same sign) and 'iterations', shape (n,).
+    """
+    a = np.array(a, dtype=float, ndmin=1)
+    b = np.array(b, dtype=float, ndmin=1)
+    n = len(a)
+    idx = np.arange(n)
+    fa = np.asarray(f(a, idx), dtype=float)
+    fb = np.asarray(f(b, idx), dtype=float)
+
+    bracketed = np.sign(fa) * np.sign(fb) <= 0
+    converged = (fa == 0) | (fb == 0)
+    iterations = np.zeros(n, dtype=int)
+
+    # Points without a sign change return the end with the smaller residual
+    x = np.where(np.abs(fa) < np.abs(fb), a, b)
+    fx = np.where(np.abs(fa) < np.abs(fb), fa, fb)
+
+    active = bracketed & ~converged
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        i = np.flatnonzero(active)
+        ai, bi, fai, fbi = a[i], b[i], fa[i], fb[i]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = bi - fbi * (bi - ai) / (fbi - fai)
+        lo = np.minimum(ai, bi)
+        hi = np.maximum(ai, bi)
+        bad = ~np.isfinite(c) | (c <= lo) | (c >= hi)
+        c = np.where(bad, 0.5 * (ai + bi), c)
+        fc = np.asarray(f(c, i), dtype=float)
+        iterations[i] += 1
+
+        # Keep the bracket: the old b becomes a if the sign changed,
+        # otherwise a is kept and its residual halved (Illinois step)
+        switch = np.sign(fc) != np.sign(fbi)
+        a[i] = np.where(switch, bi, ai)
+        fa[i] = np.where(switch, fbi, 0.5 * fai)
+        b[i] = c
+        fb[i] = fc
+        x[i] = c
+        fx[i] = fc
+
+        done = (fc == 0) | (np.abs(b[i] - a[i]) <= xtol + rtol * np.abs(c))
+        converged[i] = done
+        active[i] = ~done
+
+    return {
+        'x': x,
+        'f': fx,
+        'converged': converged,
+        'bracketed': bracketed,
+        'iterations': iterations,
+    }
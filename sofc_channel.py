@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Nov  2 09:48:15 2026
+
+@author: 82108
+"""
+
+# 1-D along-channel SOFC cell model (co- or counter-flow).
+# The cell is split into N finite volumes along the channel. Each node has
+# 7 unknowns [n_H2, n_H2O, n_O2, j, T_an, T_ca, T_s]: anode / cathode molar
+# flows leaving the node, local current density, fuel and air gas
+# temperatures and the PEN/interconnect (solid) temperature. Residuals are
+#   species:  upwind molar balances with j dA / 2F of H2 -> H2O, j dA / 4F of O2
+#   current:  E_Nernst(T_s, local x) - losses(j, T_s) - V = 0 (polarization.py)
+#   energy:   fuel gas, air and solid enthalpy balances with convective
+#             exchange, reaction enthalpy carried by the species and axial
+#             conduction in the solid, using gri30 NASA-7 enthalpies.
+# A node couples only to its neighbours, so the Jacobian is block
+# tridiagonal (bandwidth 13). It is built by colored finite differences
+# (21 residual evaluations whatever N) and solved with solve_banded, so a
+# Newton iteration costs O(N). Utilization or current targets are met by a
+# secant iteration on the cell voltage around the banded solve.
+# Anode species other than H2 / H2O (CO, CH4, ...) are carried as inerts.
+
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+from cantera import one_atm
+from scipy.linalg import solve_banded
+
+from mechanism import get_gas
+from nasa_props import nasa_coefficients, species_thermo
+from polarization import (F, R, CellFeed, CellParams, max_current_density, nernst_potential,
+                          operating_point, overpotentials, solve_current)
+
+N_VAR = 7  # n_H2, n_H2O, n_O2, j, T_an, T_ca, T_s
+_BAND = 2 * N_VAR - 1
+
+
+class ChannelParams(NamedTuple):
+    """
+    Cell geometry and heat transfer.
+
+    length, width: active cell dimensions (cm), flow along the length;
+    U_an, U_ca: solid-gas heat transfer coefficients (W/(cm^2 K));
+    k_s: effective axial conductivity of the solid (W/(cm K)); t_s: its thickness (cm).
+    """
+    length: float = 10.0
+    width: float = 10.0
+    U_an: float = 0.04
+    U_ca: float = 0.04
+    k_s: float = 0.05
+    t_s: float = 0.1
+
+
+class _Channel:
+    """Residual of the discretized cell for fixed inlet conditions and voltage."""
+
+    def __init__(self, gas, T_an_in, T_ca_in, x_an, m_an, x_ca, m_ca, P, N, flow, geometry, params):
+        if flow not in ('co', 'counter'):
+            raise ValueError("flow must be 'co' or 'counter'.")
+        self.N = N
+        self.counter = flow == 'counter'
+        self.P = P
+        self.params = params
+        self.geometry = geometry
+        self.area = geometry.length * geometry.width
+        self.dA = self.area / N
+        dx = geometry.length / N
+        self.G_s = geometry.k_s * geometry.width * geometry.t_s / dx  # W/K between nodes
+
+        # Inlet molar flows; H2, H2O and O2 first, other species inert
+        names = gas.species_names
+        gas.X = x_an
+        X = gas.X
+        n_an = m_an / gas.mean_molecular_weight * 1000  # mol/s
+        an = [names.index('H2'), names.index('H2O')]
+        an += [k for k in np.flatnonzero(X > 0) if k not in an]
+        self.n_an_in = X[an] * n_an
+        gas.X = x_ca
+        X = gas.X
+        n_ca = m_ca / gas.mean_molecular_weight * 1000
+        ca = [names.index('O2')]
+        ca += [k for k in np.flatnonzero(X > 0) if k not in ca]
+        self.n_ca_in = X[ca] * n_ca
+        self.coeffs_an = nasa_coefficients(gas, an)
+        self.coeffs_ca = nasa_coefficients(gas, ca)
+        self.T_an_in = T_an_in
+        self.T_ca_in = T_ca_in
+        self.H_an_in = self._enthalpy(self.coeffs_an, np.array([T_an_in]))[0] @ self.n_an_in
+        self.H_ca_in = self._enthalpy(self.coeffs_ca, np.array([T_ca_in]))[0] @ self.n_ca_in
+
+        # Residual scales and typical magnitudes of the unknowns
+        self.n_an = self.n_an_in.sum()
+        self.n_ca = self.n_ca_in.sum()
+        self.H_scale = (self.n_an + self.n_ca) * R * 1000.0
+        self.typical = np.array([self.n_an, self.n_an, self.n_ca, 0.1, 1000.0, 1000.0, 1000.0])
+        self.j_max = min(params.jL_an, params.jL_ca)
+
+    @staticmethod
+    def _enthalpy(coeffs, T):
+        """Species molar enthalpies (n, k) in J/mol."""
+        return species_thermo(coeffs, T, ('h',))[0] * (R * T)[:, None]
+
+    def residual(self, Z, V):
+        """Scaled residuals (N, 7) of node states Z (N, 7) at cell voltage V."""
+        nH2, nH2O, nO2, j, Ta, Tc, Ts = Z.T
+        r = j * self.dA / (2 * F)  # mol/s H2 per node
+        res = np.empty_like(Z)
+
+        # Species (upwind)
+        res[:, 0] = (nH2 - np.r_[self.n_an_in[0], nH2[:-1]] + r) / self.n_an
+        res[:, 1] = (nH2O - np.r_[self.n_an_in[1], nH2O[:-1]] - r) / self.n_an
+        if self.counter:
+            nO2_up = np.r_[nO2[1:], self.n_ca_in[0]]
+        else:
+            nO2_up = np.r_[self.n_ca_in[0], nO2[:-1]]
+        res[:, 2] = (nO2 - nO2_up + 0.5 * r) / self.n_ca
+
+        # Local electrochemistry
+        inert_an = self.n_an_in[2:].sum()
+        inert_ca = self.n_ca_in[1:].sum()
+        n_an_tot = nH2 + nH2O + inert_an
+        E = nernst_potential(Ts, nH2 / n_an_tot, nH2O / n_an_tot, nO2 / (nO2 + inert_ca), self.P)
+        eta_act, eta_ohm, eta_conc = overpotentials(j, Ts, self.params)
+        res[:, 3] = E - eta_act - eta_ohm - eta_conc - V
+
+        # Energy
+        h_an_a = self._enthalpy(self.coeffs_an, Ta)
+        h_an_s = self._enthalpy(self.coeffs_an, Ts)
+        h_ca_c = self._enthalpy(self.coeffs_ca, Tc)
+        H_an = h_an_a[:, 0] * nH2 + h_an_a[:, 1] * nH2O + h_an_a[:, 2:] @ self.n_an_in[2:]
+        H_ca = h_ca_c[:, 0] * nO2 + h_ca_c[:, 1:] @ self.n_ca_in[1:]
+        H_an_up = np.r_[self.H_an_in, H_an[:-1]]
+        H_ca_up = np.r_[H_ca[1:], self.H_ca_in] if self.counter else np.r_[self.H_ca_in, H_ca[:-1]]
+        q_an = self.geometry.U_an * self.dA * (Ts - Ta)
+        q_ca = self.geometry.U_ca * self.dA * (Ts - Tc)
+        into_solid = r * h_an_a[:, 0] + 0.5 * r * h_ca_c[:, 0] - r * h_an_s[:, 1]
+        Ts_pad = np.r_[Ts[0], Ts, Ts[-1]]  # 양 끝 단열
+        conduction = self.G_s * (Ts_pad[2:] - 2 * Ts + Ts_pad[:-2])
+        res[:, 4] = (H_an - H_an_up - q_an + r * h_an_a[:, 0] - r * h_an_s[:, 1]) / self.H_scale
+        res[:, 5] = (H_ca - H_ca_up - q_ca + 0.5 * r * h_ca_c[:, 0]) / self.H_scale
+        res[:, 6] = (into_solid - V * j * self.dA - q_an - q_ca + conduction) / self.H_scale
+        return res
+
+    def jacobian(self, Z, V, res0):
+        """Banded Jacobian (solve_banded layout) by colored finite differences."""
+        N = self.N
+        ab = np.zeros((2 * _BAND + 1, N * N_VAR))
+        h = 1e-7 * np.maximum(np.abs(Z), self.typical)
+        nodes = np.arange(N)
+        for m in range(N_VAR):
+            for color in range(3):
+                p = nodes[color::3]
+                Zp = Z.copy()
+                Zp[p, m] += h[p, m]
+                dres = self.residual(Zp, V) - res0
+                col = N_VAR * p + m
+                for shift in (-1, 0, 1):
+                    q = p + shift
+                    ok = (q >= 0) & (q < N)
+                    rows = N_VAR * q[ok, None] + np.arange(N_VAR)
+                    ab[_BAND + rows - col[ok, None], np.broadcast_to(col[ok, None], rows.shape)] = \
+                        dres[q[ok]] / h[p[ok], m][:, None]
+        return ab
+
+    def initial_guess(self, V, j=None):
+        """Uniform current density (lumped model at V unless given) and linear depletion."""
+        T_mean = 0.5 * (self.T_an_in + self.T_ca_in)
+        feed = self.feed()
+        if j is None:
+            j = float(solve_current(V, T_mean, feed, self.params, self.P))
+            j = min(max(j, 1e-3), 0.9 * float(max_current_density(feed, self.params)))
+        s = (np.arange(self.N) + 1) / self.N
+        r_cum = j * self.area * s / (2 * F)
+        Z = np.empty((self.N, N_VAR))
+        Z[:, 0] = self.n_an_in[0] - r_cum
+        Z[:, 1] = self.n_an_in[1] + r_cum
+        Z[:, 2] = self.n_ca_in[0] - 0.5 * (r_cum[::-1] if self.counter else r_cum)
+        Z[:, 3] = j
+        Z[:, 4] = self.T_an_in
+        Z[:, 5] = self.T_ca_in
+        Z[:, 6] = T_mean
+        return Z
+
+    def feed(self):
+        """Lumped CellFeed of the inlet flows (for initial guesses)."""
+        n_an_tot = self.n_an
+        return CellFeed(self.n_an_in[0] / n_an_tot, self.n_an_in[1] / n_an_tot,
+                        self.n_ca_in[0] / self.n_ca, 2 * F * self.n_an_in[0] / self.area,
+                        4 * F * self.n_ca / self.area)
+
+    def _max_step(self, Z, dZ):
+        """Largest step fraction keeping flows positive, j below the limiting current and T > 200 K."""
+        alpha = 1.0
+        for m, bound in ((0, 0.0), (1, 0.0), (2, 0.0), (4, 200.0), (5, 200.0), (6, 200.0)):
+            dec = dZ[:, m] < 0
+            if dec.any():
+                alpha = min(alpha, 0.9 * np.min((Z[dec, m] - bound) / -dZ[dec, m]))
+        inc = dZ[:, 3] > 0
+        if inc.any():
+            alpha = min(alpha, 0.9 * np.min((self.j_max - Z[inc, 3]) / dZ[inc, 3]))
+        return alpha
+
+    def solve(self, V, Z, tol, max_iter):
+        """Damped Newton iteration with banded linear solves."""
+        res = self.residual(Z, V)
+        norm = np.linalg.norm(res)
+        for iteration in range(1, max_iter + 1):
+            ab = self.jacobian(Z, V, res)
+            dZ = solve_banded((_BAND, _BAND), ab, -res.ravel()).reshape(Z.shape)
+            alpha = self._max_step(Z, dZ)
+            # 잔차가 줄어들 때까지 step 축소
+            for _ in range(20):
+                Z_new = Z + alpha * dZ
+                res_new = self.residual(Z_new, V)
+                norm_new = np.linalg.norm(res_new)
+                if np.isfinite(norm_new) and norm_new < max(norm, 1e-14) * (1 - 1e-4 * alpha):
+                    break
+                alpha *= 0.5
+            Z, res, norm = Z_new, res_new, norm_new
+            if np.max(np.abs(alpha * dZ) / self.typical) <= tol:
+                return Z, True, iteration
+        return Z, False, max_iter
+
+
+def sofc_channel(T_an_in, T_ca_in, x_an, m_an, x_ca, m_ca, V=None, util=None, I=None, gas=None,
+                 P=one_atm, N=200, flow='co', geometry=ChannelParams(), params=CellParams(),
+                 tol=1e-9, max_iter=50, util_tol=1e-8, Z0=None):
+    """
+    1-D co-/counter-flow SOFC cell at a given voltage, fuel utilization or current.
+
+    Parameters:
+    T_an_in, T_ca_in (float): Fuel / air inlet temperatures (K).
+    x_an, x_ca: Fuel / air inlet mole fractions (array in gas species order, or dict).
+    m_an, m_ca (float): Fuel / air mass flow rates of the cell (kg/s).
+    V, util, I (float): Exactly one of cell voltage (V), H2 utilization or current (A).
+    gas (Cantera.Solution, optional): Gas object for properties (default shared gri30).
+    P (float): Pressure (Pa).
+    N (int): Number of nodes along the channel.
+    flow (str): 'co' or 'counter' (air enters at the fuel outlet end).
+    geometry (ChannelParams): Cell geometry and heat transfer.
+    params (CellParams): Electrochemical parameters.
+    tol (float): Newton tolerance on the scaled update.
+    max_iter (int): Maximum Newton iterations per voltage.
+    util_tol (float): Relative tolerance on the current for util / I targets.
+    Z0 (array, optional): Initial node states (N, 7), e.g. 'Z' of a previous result.
+
+    Returns:
+    dict: Node profiles 'x' (cm), 'j' (A/cm^2), 'E' (V), 'T_s', 'T_an', 'T_ca' (K),
+          'x_H2', 'x_H2O', 'x_O2'; totals 'V', 'I' (A), 'W' = V I (W), 'util';
+          outlets 'T_an_out', 'T_ca_out'; 'Z' (node states), 'converged',
+          'iterations' (Newton, summed) and 'voltage_iterations'.
+    """
+    if sum(x is not None for x in (V, util, I)) != 1:
+        raise ValueError("Give exactly one of V, util and I.")
+    if gas is None:
+        gas = get_gas('gri30.yaml')
+    channel = _Channel(gas, T_an_in, T_ca_in, x_an, m_an, x_ca, m_ca, P, N, flow, geometry, params)
+    I_fuel = 2 * F * channel.n_an_in[0]  # current at 100 % H2 utilization
+
+    def solve_at(V, Z):
+        Z, ok, iterations = channel.solve(V, Z, tol, max_iter)
+        return Z, ok, iterations, Z[:, 3].sum() * channel.dA
+
+    if V is not None:
+        Z = channel.initial_guess(V) if Z0 is None else np.array(Z0, dtype=float)
+        Z, converged, iterations, current = solve_at(V, Z)
+        voltage_iterations = 0
+    else:
+        I_target = util * I_fuel if util is not None else I
+        # 집중 모델로 초기 전압 추정 후 전압에 대한 secant 반복
+        T_mean = 0.5 * (T_an_in + T_ca_in)
+        j_target = I_target / channel.area
+        V0 = float(operating_point(T_mean, channel.feed(), params, P, j=j_target)['V'])
+        if not np.isfinite(V0):
+            V0 = 0.5
+        Z = channel.initial_guess(V0, j_target) if Z0 is None else np.array(Z0, dtype=float)
+        Z, ok, iterations, current = solve_at(V0, Z)
+        V_prev, g_prev = V0, current / I_target - 1
+        V = V0 - 0.01 * np.sign(-g_prev) if g_prev else V0
+        converged = ok and abs(g_prev) <= util_tol
+        voltage_iterations = 1
+        if converged:
+            V = V0
+        while not converged and voltage_iterations < max_iter:
+            Z, ok, n_it, current = solve_at(V, Z)
+            iterations += n_it
+            voltage_iterations += 1
+            g = current / I_target - 1
+            if ok and abs(g) <= util_tol:
+                converged = True
+                break
+            if g == g_prev:
+                break
+            V, V_prev, g_prev = V - g * (V - V_prev) / (g - g_prev), V, g
+        current = Z[:, 3].sum() * channel.dA
+
+    if not converged:
+        warnings.warn("sofc_channel did not converge.")
+
+    nH2, nH2O, nO2, j, Ta, Tc, Ts = Z.T
+    n_an_tot = nH2 + nH2O + channel.n_an_in[2:].sum()
+    x_O2 = nO2 / (nO2 + channel.n_ca_in[1:].sum())
+    return {
+        'x': (np.arange(N) + 0.5) * geometry.length / N,
+        'j': j,
+        'E': nernst_potential(Ts, nH2 / n_an_tot, nH2O / n_an_tot, x_O2, P),
+        'T_s': Ts,
+        'T_an': Ta,
+        'T_ca': Tc,
+        'x_H2': nH2 / n_an_tot,
+        'x_H2O': nH2O / n_an_tot,
+        'x_O2': x_O2,
+        'V': V,
+        'I': current,
+        'W': V * current,
+        'util': current / I_fuel,
+        'T_an_out': Ta[-1],
+        'T_ca_out': Tc[0] if flow == 'counter' else Tc[-1],
+        'Z': Z,
+        'converged': converged,
+        'iterations': iterations,
+        'voltage_iterations': voltage_iterations,
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    x_an = {'H2': 0.97, 'H2O': 0.03}
+    x_ca = {'O2': 0.21, 'N2': 0.79}
+    for flow in ('co', 'counter'):
+        t0 = time.time()
+        out = sofc_channel(1023.15, 1023.15, x_an, 1.0e-6, x_ca, 1.2e-4, util=0.75, flow=flow)
+        print(f"{flow:8s} V = {out['V']:.4f} V, W = {out['W']:.2f} W, "
+              f"T_s max {out['T_s'].max():.1f} K, j {out['j'].min():.3f}-{out['j'].max():.3f} A/cm^2, "
+              f"{time.time() - t0:.2f} s")
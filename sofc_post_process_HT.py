@@ -1,6 +1,8 @@
 import numpy as np
 import cantera as ct
 import csv
+from mechanism import new_gas
+from nasa_props import nasa_coefficients, mixture_properties, normalize_mass_fractions
 
 # Constants (adjusted for SOFC specifics)
 MASS = 1.0  # Example mass value (kg), replace with actual SOFC mass
@@ -11,8 +13,50 @@ bore = 0.1  # Bore size in meters
 stroke = 0.1  # Stroke length in meters
 con_len = 0.15  # Connecting rod length in meters
 
+_sub_phases = {}  # species names -> thermo-only phase used by the SolutionArray path
+
+def species_columns(gas, xspi):
+    """
+    Map the species columns of the integrator output to gas species indices.
+
+    Parameters:
+    gas (Cantera.Solution): Gas object defining the species.
+    xspi (list): Species names (or gas indices) of the columns out1[:, 5:].
+
+    Returns:
+    tuple: (gas species indices, out1 column indices), species unknown to gas are skipped.
+    """
+    mapping = {}
+    for i, species in enumerate(xspi):
+        if isinstance(species, str):
+            if species not in gas.species_names:
+                continue
+            species = gas.species_index(species)
+        mapping[int(species)] = 5 + i  # a repeated species keeps its last column
+    gas_index = np.array(list(mapping.keys()), dtype=int)
+    out_cols = np.array(list(mapping.values()), dtype=int)
+    return gas_index, out_cols
+
 # Function to calculate thermodynamic properties
-def post_process_SOFC(t1, out1, gas, xspi):
+def post_process_SOFC(t1, out1, gas, xspi, method='nasa'):
+    """
+    Post-process a cycle trajectory into thermodynamic properties and cycle statistics.
+
+    Only the species columns present in out1 are used; no dense
+    (len_cycle, n_species) array is built.
+
+    Parameters:
+    t1 (array): Time vector.
+    out1 (array): Integrator output, rows = samples, columns = [theta, V, T, k, Q, species...].
+    gas (Cantera.Solution): Gas object defining the species.
+    xspi (list): Species names (or gas indices) of the columns out1[:, 5:].
+    method (str): 'nasa' evaluates all rows at once with the NASA-7 engine,
+                  'solutionarray' uses a Cantera SolutionArray of the mapped species,
+                  'loop' sets the gas state row by row.
+
+    Returns:
+    tuple: CAD_sim, cycle_props, cycle_stats
+    """
     # Initialize output structures
     CAD_sim = out1[:, 0] * (180 / np.pi)
     V_sim = out1[:, 1]
@@ -21,54 +65,87 @@ def post_process_SOFC(t1, out1, gas, xspi):
     Q_sim = out1[:, 4]
 
     len_cycle = len(out1)
-    avg_MW = np.zeros(len_cycle)
-    avg_R = np.zeros(len_cycle)
-    p_sim = np.zeros(len_cycle)
-    u_sim = np.zeros(len_cycle)
-    h_sim = np.zeros(len_cycle)
-    s_sim = np.zeros(len_cycle)
-
-    # Ensure species data length matches gas.n_species
-    species_data = np.zeros((len_cycle, gas.n_species))
-    for i, species in enumerate(xspi):
-        if species in gas.species_names:
-            species_index = gas.species_names.index(species)
-            species_data[:, species_index] = out1[:, 5 + i]
+
+    # Species columns present in the output, and where they live in the gas
+    gas_index, out_cols = species_columns(gas, xspi)
+    Y_sim = out1[:, out_cols]
 
     # Calculate mixture properties
-    for i in range(len_cycle):
-        gas.Y = species_data[i, :]
-        avg_MW[i] = gas.mean_molecular_weight
-        avg_R[i] = ct.gas_constant / avg_MW[i]
-        gas.TP = T_sim[i], (1e5 * (avg_R[i] * T_sim[i] / v_sim[i]))  # Pressure in Pa
-        p_sim[i] = gas.P / 1e5  # Convert to bar
-        u_sim[i] = gas.u
-        h_sim[i] = gas.h
-        s_sim[i] = gas.s
-
-    # Calculate performance metrics
-    peakp_sim = np.max(p_sim)
+    # The state pressure is 1e5 * R * T / v, i.e. the density is 1e5 / v
+    if method == 'nasa':
+        coeffs = nasa_coefficients(gas, gas_index)
+        Y = normalize_mass_fractions(Y_sim)
+        avg_R = ct.gas_constant * (Y / coeffs['MW']).sum(axis=1)
+        p_sim = avg_R * T_sim / v_sim
+        props = mixture_properties(coeffs, T_sim, 1e5 * p_sim, Y, normalize=False)
+        u_sim = props['u']
+        h_sim = props['h']
+        s_sim = props['s']
+    elif method == 'solutionarray':
+        names = tuple(gas.species_name(int(i)) for i in gas_index)
+        if names not in _sub_phases:
+            _sub_phases[names] = ct.Solution(thermo='ideal-gas', species=[gas.species(sp) for sp in names])
+        states = ct.SolutionArray(_sub_phases[names], len_cycle)
+        states.TDY = T_sim, 1e5 / v_sim, Y_sim
+        p_sim = states.P / 1e5  # Convert to bar
+        u_sim = states.int_energy_mass
+        h_sim = states.enthalpy_mass
+        s_sim = states.entropy_mass
+    elif method == 'loop':
+        avg_MW = np.zeros(len_cycle)
+        avg_R = np.zeros(len_cycle)
+        p_sim = np.zeros(len_cycle)
+        u_sim = np.zeros(len_cycle)
+        h_sim = np.zeros(len_cycle)
+        s_sim = np.zeros(len_cycle)
+        y_row = np.zeros(gas.n_species)
+        for i in range(len_cycle):
+            y_row[gas_index] = Y_sim[i]
+            gas.Y = y_row
+            avg_MW[i] = gas.mean_molecular_weight
+            avg_R[i] = ct.gas_constant / avg_MW[i]
+            gas.TP = T_sim[i], (1e5 * (avg_R[i] * T_sim[i] / v_sim[i]))  # Pressure in Pa
+            p_sim[i] = gas.P / 1e5  # Convert to bar
+            u_sim[i] = gas.u
+            h_sim[i] = gas.h
+            s_sim[i] = gas.s
+    else:
+        raise ValueError(f"Unknown post-processing method '{method}'.")
+
+    # Output structures
+    cycle_props = np.column_stack((p_sim, V_sim, v_sim, T_sim, u_sim, h_sim, s_sim, Q_sim))
+    cycle_stats = cycle_statistics(CAD_sim, p_sim, u_sim, Q_sim)
+
+    return CAD_sim, cycle_props, cycle_stats
+
+def cycle_statistics(CAD_sim, p_sim, u_sim, Q_sim):
+    """
+    Cycle performance metrics from the per-sample property arrays.
+
+    Returns:
+    list: [gmep (bar), gross_eff, peak_p (bar), angle_of_peak_p (CAD),
+           max_rate_rise (bar/CAD), angle_of_max_rate_rise (CAD), gross_power (W)]
+    """
     peakp_index = np.argmax(p_sim)
+    peakp_sim = p_sim[peakp_index]
     aop_sim = CAD_sim[peakp_index]
 
-    maxraterise_sim = np.max(np.gradient(p_sim))
-    aomaxraterise_sim = CAD_sim[np.argmax(np.gradient(p_sim))]
+    dp_sim = np.gradient(p_sim, CAD_sim)  # bar/CAD
+    maxrr_index = np.argmax(dp_sim)
+    maxraterise_sim = dp_sim[maxrr_index]
+    aomaxraterise_sim = CAD_sim[maxrr_index]
 
     gross_work_sim = (u_sim[0] - u_sim[-1]) * MASS - Q_sim[-1]
     gmep_sim = (gross_work_sim / (np.pi * (bore / 2)**2 * stroke)) / 1e5  # in bar
     gross_eff_sim = gross_work_sim / (LHV * MASS)
     gross_power_sim = gross_work_sim * (RPM / 60 / 2) * n_cyl
 
-    # Output structures
-    cycle_props = np.column_stack((p_sim, V_sim, v_sim, T_sim, u_sim, h_sim, s_sim, Q_sim))
-    cycle_stats = [gmep_sim, gross_eff_sim, peakp_sim, aop_sim, maxraterise_sim, aomaxraterise_sim, gross_power_sim]
-
-    return CAD_sim, cycle_props, cycle_stats
+    return [gmep_sim, gross_eff_sim, peakp_sim, aop_sim, maxraterise_sim, aomaxraterise_sim, gross_power_sim]
 
 # Example usage
 def main():
     # Initialize Cantera gas object
-    gas = ct.Solution("gri30.yaml")  # Replace with appropriate SOFC mechanism file
+    gas = new_gas("gri30.yaml")  # Replace with appropriate SOFC mechanism file
 
     # Load input data (example values)
     t1 = np.linspace(0, 1, 100)  # Time vector
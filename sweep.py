@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 29 14:03:51 2026
+
+@author: 82108
+"""
+
+# Parallel parameter sweeps over the design-point models.
+# A sweep is a model name plus a list of keyword-argument dicts (see grid()
+# and zip_points()). Points are sent in chunks to a process pool whose
+# workers parse the mechanism once at startup (mechanism.get_gas), and
+# finished chunks are written to one CSV file as they complete, so 1e4-1e5
+# point maps need neither hand-written loops nor the whole map in memory.
+# Rows carry the point index, the (flattened) inputs, the outputs and an
+# 'error' column; a failing point does not stop the sweep. With a
+# result_cache.ResultCache, points computed by earlier sweeps are read back
+# instead of recomputed.
+
+import csv
+import importlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from mechanism import get_gas
+from result_cache import default_cache
+
+# name -> (module, function, names of tuple outputs or None for dict outputs)
+MODELS = {
+    'sofc_map_gen': ('sofc_map_gen', 'sofc_map_gen', None),
+    'SOFC_model': ('sys_ver2', 'SOFC_model', None),
+    'sofc_model': ('SOFC', 'sofc_model', ('W_tot', 'T_fc', 'eff_cell')),
+}
+
+
+def grid(**axes):
+    """
+    Cartesian product of parameter axes.
+
+    Example: grid(T_initial=[800, 900], rv=np.linspace(8, 12, 5)) gives 10 points.
+
+    Returns:
+    list: One keyword-argument dict per point.
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def zip_points(**columns):
+    """
+    Points from equal-length parameter lists (one point per position).
+
+    Returns:
+    list: One keyword-argument dict per point.
+    """
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All parameter lists must have the same length.")
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _flatten(prefix, value, row):
+    """Add value to row, splitting dicts into prefix_key and arrays into prefix_0, prefix_1, ..."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{key}", item, row)
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        for i, item in enumerate(np.ravel(value)):
+            row[f"{prefix}_{i}"] = item.item() if isinstance(item, np.generic) else item
+    elif isinstance(value, np.generic):
+        row[prefix] = value.item()
+    else:
+        row[prefix] = value
+
+
+def _resolve(model):
+    """Model function and output names for a MODELS key or a 'module:function' string."""
+    if model in MODELS:
+        module, function, outputs = MODELS[model]
+    else:
+        module, _, function = model.partition(':')
+        outputs = None
+    return getattr(importlib.import_module(module), function), outputs
+
+
+def _init_worker(mechanisms):
+    """Pool initializer: parse the mechanisms once and build this process's gas objects."""
+    for name in mechanisms:
+        get_gas(name)
+
+
+def _run_chunk(model, chunk, fixed, cache=None, mechanisms=()):
+    """Evaluate (index, point) pairs; returns one flat row dict per point."""
+    function, outputs = _resolve(model)
+    if cache is not None:
+        function = cache.cached(function, mechanisms=mechanisms)
+    rows = []
+    for index, point in chunk:
+        row = {'index': index}
+        for key, value in point.items():
+            _flatten(key, value, row)
+        try:
+            result = function(**fixed, **point)
+        except Exception as exc:  # record the failure, keep sweeping
+            row['error'] = f"{type(exc).__name__}: {exc}"
+            rows.append(row)
+            continue
+        if isinstance(result, dict):
+            for key, value in result.items():
+                _flatten(key, value, row)
+        else:
+            if not isinstance(result, tuple):
+                result = (result,)
+            names = outputs or [f"out_{i}" for i in range(len(result))]
+            for key, value in zip(names, result):
+                _flatten(key, value, row)
+        row['error'] = ''
+        rows.append(row)
+    return rows
+
+
+def run_sweep(model, points, output=None, fixed=None, max_workers=None, chunk_size=None,
+              mechanisms=('gri30.yaml',), collect=None, cache=None, verbose=True):
+    """
+    Evaluate a model over a list of points on a process pool.
+
+    Parameters:
+    model (str): Key of MODELS ('sofc_map_gen', 'SOFC_model', 'sofc_model') or
+                 'module:function' of any importable function of keyword arguments.
+    points (list): Keyword-argument dicts, e.g. from grid() or zip_points().
+    output (str, optional): CSV file receiving the rows as chunks complete
+                            (in completion order; sort by 'index' if needed).
+                            The columns are those of the first successful row.
+    fixed (dict, optional): Keyword arguments shared by all points.
+    max_workers (int, optional): Pool size (default os.cpu_count()); 0 runs serially
+                                 in this process.
+    chunk_size (int, optional): Points per task; default spreads the points over
+                                about 8 tasks per worker.
+    mechanisms (tuple): Mechanism files each worker loads at startup.
+    collect (bool, optional): Also return the rows; default is True without output.
+    cache (ResultCache or bool, optional): Result cache keyed on the point, the
+                                           mechanism files and the code version;
+                                           True uses result_cache.default_cache().
+    verbose (bool): Print progress.
+
+    Returns:
+    list or None: Rows sorted by 'index' if collected.
+
+    Raises:
+    ValueError: With output, a row has columns that the CSV header lacks
+                (e.g. a model returning a longer array or an extra key);
+                the rows written so far are kept.
+    """
+    fixed = dict(fixed or {})
+    if collect is None:
+        collect = output is None
+    _resolve(model)  # fail early on an unknown model
+    if cache is True:
+        cache = default_cache()
+    elif cache is False:
+        cache = None
+
+    n = len(points)
+    workers = os.cpu_count() if max_workers is None else max_workers
+    if chunk_size is None:
+        chunk_size = max(1, int(np.ceil(n / (8 * max(workers, 1)))))
+    indexed = list(enumerate(points))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, n, chunk_size)]
+
+    collected = []
+    writer = None
+    pending = []  # rows finished before the CSV header is known
+    f = open(output, 'w', newline='') if output is not None else None
+    done = 0
+    errors = 0
+
+    def consume(rows):
+        nonlocal writer, done, errors
+        done += len(rows)
+        errors += sum(1 for row in rows if row['error'])
+        if collect:
+            collected.extend(rows)
+        if verbose:
+            print(f"{done}/{n} points done ({errors} errors)")
+        if f is None:
+            return
+        if writer is None:
+            pending.extend(rows)
+            good = [row for row in pending if not row['error']]
+            if not good and done < n:
+                return
+            # 헤더: 입력, 출력, error 순서 (첫 성공 행 기준)
+            fields = list((good or pending)[0])
+            fields.remove('error')
+            fields.append('error')
+            writer = csv.DictWriter(f, fieldnames=fields, restval='')
+            writer.writeheader()
+            rows = pending
+        for row in rows:
+            extra = [key for key in row if key not in writer.fieldnames]
+            if extra:
+                raise ValueError(f"Point {row['index']} has columns {extra} that are not in the "
+                                 f"header of {output}.")
+        writer.writerows(rows)
+        f.flush()
+
+    try:
+        if workers == 0:
+            _init_worker(mechanisms)
+            for chunk in chunks:
+                consume(_run_chunk(model, chunk, fixed, cache, mechanisms))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(tuple(mechanisms),)) as pool:
+                futures = [pool.submit(_run_chunk, model, chunk, fixed, cache, tuple(mechanisms)) for chunk in chunks]
+                for future in as_completed(futures):
+                    consume(future.result())
+    finally:
+        if f is not None:
+            f.close()
+
+    if collect:
+        return sorted(collected, key=lambda row: row['index'])
+    return None
+
+
+# Example usage
+if __name__ == "__main__":
+    points = grid(T_initial=[800, 900, 1000], rv=np.linspace(8, 12, 5), RPM=[1500, 1800])
+    run_sweep('sofc_map_gen', points, output='sofc_map.csv')
+    print("Map saved to sofc_map.csv")
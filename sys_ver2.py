@@ -7,8 +7,9 @@ Created on Wed Dec 25 13:51:22 2024
 
 import cantera as ct
 import numpy as np
+from mechanism import get_gas
 
-def SOFC_model(m_H2, m_H2O, T_in, P_in, x_ca_in):
+def SOFC_model(m_H2, m_H2O, T_in, P_in, x_ca_in, gas=None):
     """
     Simulates the operation of a Solid Oxide Fuel Cell (SOFC).
 
@@ -23,13 +24,16 @@ def SOFC_model(m_H2, m_H2O, T_in, P_in, x_ca_in):
         Inlet pressure (Pa).
     x_ca_in : list
         Cathode gas composition (mole fractions).
+    gas : Cantera.Solution, optional
+        Gas object to use; defaults to the shared GRI-Mech 3.0 gas.
 
     Returns:
     dict
         Results including power, efficiency, and outlet conditions.
     """
     # Load SOFC gas mixture
-    gas = ct.Solution('gri30.yaml')
+    if gas is None:
+        gas = get_gas('gri30.yaml')
     N = gas.n_species
 
     # Species indices
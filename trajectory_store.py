@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 26 10:18:44 2026
+
+@author: 82108
+"""
+
+# Streaming binary store for cycle trajectories.
+# Rows [t, theta, V, T, k, Q, Y...] are appended in float64 chunks to a
+# standard .npy file while the integrator advances. The .npy header is
+# written with room to spare and rewritten with the row count at every
+# flush, so the file stays loadable with np.load at any time. Parameters,
+# column and species names go to a JSON sidecar (<path>.json).
+# load_trajectory() memory-maps the file back, so t1 and out1 are views
+# into the file and post_process_SOFC reads only the columns it touches.
+
+import json
+import os
+
+import numpy as np
+
+HEADER_BYTES = 128  # total .npy preamble (magic + header), a multiple of 64
+_DTYPE = np.dtype('<f8')
+_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+def npy_header(shape, descr=_DTYPE.str):
+    """Fixed-size .npy (version 1.0) preamble for a C-ordered array of the given shape."""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (descr, tuple(shape))
+    pad = HEADER_BYTES - len(_MAGIC) - 2 - len(header) - 1
+    if pad < 0:
+        raise ValueError("Array shape does not fit in the reserved .npy header.")
+    header = (header + ' ' * pad + '\n').encode('latin1')
+    return _MAGIC + len(header).to_bytes(2, 'little') + header
+
+
+def _to_builtin(value):
+    """JSON fallback for NumPy scalars and arrays."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable.")
+
+
+def metadata_path(path):
+    """Path of the JSON sidecar of a trajectory file."""
+    return path + '.json'
+
+
+class TrajectoryWriter:
+    """
+    Append-only .npy trajectory file.
+
+    Parameters:
+    path (str): Output file (conventionally *.npy).
+    species (list): Species names of the Y columns.
+    params (dict or NamedTuple, optional): Run parameters stored in the sidecar
+                                           (e.g. SystemParams, mechanism name).
+    chunk_rows (int): Rows buffered in memory between writes.
+    resume (bool): Continue an existing file instead of overwriting it
+                   (see truncate() to drop rows past a checkpoint).
+
+    Use as a context manager, or call close(); rows are
+    [t, theta, V, T, k, Q, Y_1 ... Y_NSP].
+    """
+
+    def __init__(self, path, species, params=None, chunk_rows=4096, resume=False):
+        self.path = path
+        self.species = list(species)
+        self.columns = ['t', 'theta', 'V', 'T', 'k', 'Q'] + self.species
+        self.n_columns = len(self.columns)
+        if params is not None and hasattr(params, '_asdict'):
+            params = params._asdict()
+        self.params = dict(params or {})
+        self.n_rows = 0
+        self.closed = False
+
+        self._buffer = np.empty((chunk_rows, self.n_columns), dtype=_DTYPE)
+        self._fill = 0
+        self._row_bytes = self.n_columns * _DTYPE.itemsize
+        if resume and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            self.n_rows = (os.path.getsize(path) - HEADER_BYTES) // self._row_bytes
+            self.truncate(self.n_rows)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(npy_header((0, self.n_columns)))
+        self._write_metadata(complete=False)
+
+    def append(self, t, x):
+        """Append one state x at time t."""
+        if self._fill == len(self._buffer):
+            self.flush()
+        row = self._buffer[self._fill]
+        row[0] = t
+        row[1:] = x
+        self._fill += 1
+
+    def extend(self, t, X):
+        """Append states X (n, n_columns - 1) at times t (n,)."""
+        t = np.atleast_1d(t)
+        X = np.atleast_2d(X)
+        start = 0
+        while start < len(t):
+            if self._fill == len(self._buffer):
+                self.flush()
+            n = min(len(t) - start, len(self._buffer) - self._fill)
+            block = self._buffer[self._fill:self._fill + n]
+            block[:, 0] = t[start:start + n]
+            block[:, 1:] = X[start:start + n]
+            self._fill += n
+            start += n
+
+    def flush(self):
+        """Write the buffered rows and update the row count in the header."""
+        if self._fill:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(self._buffer[:self._fill].tobytes())
+            self.n_rows += self._fill
+            self._fill = 0
+        self._file.seek(0)
+        self._file.write(npy_header((self.n_rows, self.n_columns)))
+        self._file.flush()
+
+    def truncate(self, n_rows):
+        """
+        Keep only the first n_rows written rows (e.g. those of a checkpoint).
+
+        Raises:
+        ValueError: Fewer than n_rows rows have been written.
+        """
+        self.flush()
+        if n_rows > self.n_rows:
+            raise ValueError(f"Cannot keep {n_rows} rows of {self.path}: only {self.n_rows} written.")
+        self.n_rows = n_rows
+        self._file.truncate(HEADER_BYTES + self.n_rows * self._row_bytes)
+        self.flush()
+
+    def close(self):
+        """Flush the remaining rows and finalize the header and sidecar."""
+        if self.closed:
+            return
+        self.flush()
+        self._file.close()
+        self._write_metadata(complete=True)
+        self.closed = True
+
+    def _write_metadata(self, complete):
+        meta = {
+            'columns': self.columns,
+            'species': self.species,
+            'params': self.params,
+            'dtype': _DTYPE.str,
+            'rows': self.n_rows,
+            'complete': complete,
+        }
+        with open(metadata_path(self.path), 'w') as f:
+            json.dump(meta, f, indent=1, default=_to_builtin)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_trajectory(path, mmap_mode='r'):
+    """
+    Read a trajectory file back without copying.
+
+    The row count is taken from the file size, so files of interrupted runs
+    are readable up to their last flush.
+
+    Parameters:
+    path (str): Trajectory file written by TrajectoryWriter.
+    mmap_mode (str or None): np.memmap mode; None loads into memory.
+
+    Returns:
+    tuple: t1 (n,), out1 (n, 5 + NSP) views of the file, and the sidecar metadata
+           dict ('species' is the xspi argument of post_process_SOFC).
+    """
+    with open(metadata_path(path)) as f:
+        meta = json.load(f)
+    with open(path, 'rb') as f:
+        np.lib.format.read_magic(f)
+        shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+    n_columns = shape[1]
+    n_rows = (os.path.getsize(path) - offset) // (n_columns * dtype.itemsize)
+
+    if mmap_mode is None:
+        data = np.fromfile(path, dtype=dtype, count=n_rows * n_columns,
+                           offset=offset).reshape(n_rows, n_columns)
+    elif n_rows == 0:
+        data = np.empty((0, n_columns), dtype=dtype)
+    else:
+        data = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=offset,
+                         shape=(n_rows, n_columns))
+    meta['rows'] = n_rows
+    return data[:, 0], data[:, 1:], meta